@@ -0,0 +1,62 @@
+"""
+Benchmark for join cohort scoring.
+
+Fills a ``JoinCohort`` with a day of ordinary joins plus a raid of fresh,
+batch-created accounts, and measures how long ranking the whole cohort takes.
+
+Run from the repository root:
+    python -m benchmarks.bench_cohort
+"""
+
+import random
+import time
+import timeit
+
+from utils.cohort import DISCORD_EPOCH_MS, JoinCohort
+
+JOINS = 50_000
+RAID = 500
+ITERATIONS = 20
+
+
+def snowflake(created_at: float) -> int:
+    """Build a user ID created at a given time."""
+    return (int(created_at * 1000) - DISCORD_EPOCH_MS) << 22 | random.getrandbits(22)
+
+
+def build() -> JoinCohort:
+    """Build a cohort of ordinary joins followed by a raid."""
+    random.seed(0)
+    now = time.time()
+    cohort = JoinCohort(JOINS + RAID)
+    for number in range(JOINS):
+        joined = now - 86_400 + number * 86_400 / JOINS
+        created = joined - random.uniform(30, 3_000) * 86_400
+        cohort.add(
+            snowflake(created), f"member_{number:x}", joined, random.random() < 0.7
+        )
+    raid_created = now - 3_600
+    for number in range(RAID):
+        cohort.add(
+            snowflake(raid_created + number),
+            f"raid{random.randint(10_000, 99_999)}",
+            now - 120 + number * 0.2,
+            False,
+        )
+    return cohort
+
+
+def main():
+    """Run the benchmark and print the results."""
+    cohort = build()
+    since = time.time() - 86_400
+
+    seconds = timeit.timeit(lambda: cohort.suspects(since, 20), number=ITERATIONS)
+    suspects = cohort.suspects(since, 20)
+    raiders = sum(suspect.name.startswith("raid") for suspect in suspects)
+    print(f"Ranking {len(cohort):,} joins: {seconds / ITERATIONS * 1000:.2f} ms")
+    print(f"Raid accounts among the top {len(suspects)}: {raiders}")
+
+
+if __name__ == "__main__":
+    main()
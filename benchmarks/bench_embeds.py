@@ -0,0 +1,94 @@
+"""
+Benchmark for building reaction embeds.
+
+Compares building the "Reaction Added" embed by hand, the way the listeners
+used to, with rendering it from an ``EmbedTemplate``. Both go through the
+public ``discord.Embed`` API, so they should cost about the same; this checks
+that the template's validation and overflow handling add little overhead.
+Reports the time and the number of allocated blocks per embed.
+
+Run from the repository root:
+    python -m benchmarks.bench_embeds
+"""
+
+import timeit
+import tracemalloc
+
+import discord
+
+from utils.embeds import EmbedTemplate
+
+ITERATIONS = 50_000
+
+REACTION_ADDED = EmbedTemplate(
+    "Reaction Added",
+    discord.Color.green(),
+    ("Message", "Channel", "Emoji", "User"),
+    timestamp=True,
+)
+
+JUMP_URL = "https://discord.com/channels/1/2/3"
+CHANNEL = "<#222222222222222222>"
+USER = "<@111111111111111111>"
+EMOJI = "👍"
+
+
+def build_from_scratch() -> discord.Embed:
+    """Build the embed the way the listeners did before templates."""
+    embed = discord.Embed(
+        title="Reaction Added",
+        description=f"{USER} added a reaction.",
+        color=discord.Color.green(),
+        timestamp=discord.utils.utcnow(),
+    )
+    embed.add_field(
+        name="Message", value=f"[Jump to message]({JUMP_URL})", inline=False
+    )
+    embed.add_field(name="Channel", value=CHANNEL, inline=False)
+    embed.add_field(name="Emoji", value=str(EMOJI), inline=False)
+    embed.add_field(name="User", value=USER, inline=False)
+    return embed
+
+
+def build_from_template() -> discord.Embed:
+    """Render the embed from the template."""
+    return REACTION_ADDED.render(
+        f"{USER} added a reaction.",
+        f"[Jump to message]({JUMP_URL})",
+        CHANNEL,
+        EMOJI,
+        USER,
+    )
+
+
+def allocations(func) -> float:
+    """Count the memory blocks allocated per call of ``func``."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [func() for _ in range(1000)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return blocks / 1000
+
+
+def main():
+    """Run the benchmark and print the results."""
+    assert (
+        build_from_scratch().to_dict().keys() == build_from_template().to_dict().keys()
+    )
+
+    for name, func in (
+        ("from scratch", build_from_scratch),
+        ("template", build_from_template),
+    ):
+        seconds = min(timeit.repeat(func, number=ITERATIONS, repeat=5))
+        print(
+            f"{name:>12}: {seconds / ITERATIONS * 1e6:6.2f} us/embed, "
+            f"{allocations(func):5.1f} blocks/embed"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark for the redaction stage.
+
+Measures the time ``redact`` adds per message on a mix of typical chat
+messages, and compares it with calling ``redact`` once for each of the three
+consumers (log, content store, embed), which is what redacting at every use
+site would cost.
+
+Run from the repository root:
+    python -m benchmarks.bench_redaction
+"""
+
+import timeit
+
+from utils.redaction import redact
+
+ITERATIONS = 20_000
+
+MESSAGES = [
+    "gm everyone",
+    "lol that's exactly what I said yesterday, check the pins",
+    "<@111111111111111111> can you look at <#222222222222222222> when you get a sec?",
+    "join us at https://discord.gg/abcDEF1 for the tournament!",
+    "mail me at someone.example@example.com or call +1 (555) 123-4567",
+    "oops MTExMTExMTExMTExMTExMTEx.GAbCdE.aBcDeFgHiJkLmNoPqRsTuVwXyZ0123456789 "
+    "is my token, ignore it",
+    "the server at 192.168.100.200 has been down since 2024 01 15 2025",
+    "Patch notes for 2.4.1:\n"
+    + "\n".join(f"- fixed issue #{number} with the queue" for number in range(20)),
+]
+
+
+def once_per_event():
+    """Redact every sample message once and share the result."""
+    for message in MESSAGES:
+        redact(message)
+
+
+def once_per_consumer():
+    """Redact every sample message separately for each of three consumers."""
+    for message in MESSAGES:
+        for _ in range(3):
+            redact(message)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    for message in MESSAGES:
+        print(f"  {redact(message)[:76]!r}")
+    print()
+
+    for name, func in (
+        ("once per event", once_per_event),
+        ("per consumer", once_per_consumer),
+    ):
+        seconds = min(timeit.repeat(func, number=ITERATIONS, repeat=5))
+        per_message = seconds / ITERATIONS / len(MESSAGES)
+        print(f"{name:>14}: {per_message * 1e6:6.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
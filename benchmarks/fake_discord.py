@@ -0,0 +1,321 @@
+"""
+Fake Discord HTTP API for load tests.
+
+A small aiohttp server that answers the REST calls the notification path
+makes: logging in, reading the application, and creating messages. It can be
+configured to behave like Discord under load:
+
+- per-channel rate limits (``limit`` requests every ``per`` seconds), with
+  Discord's ``X-RateLimit-*`` headers and 429 responses carrying
+  ``retry_after``
+- added latency, with jitter
+- injected 5xx responses
+
+Every accepted message is recorded with the time it arrived, so load
+scenarios can measure end-to-end delivery (see
+``benchmarks.load_notifications``).
+
+The gateway is not emulated. To send the bot's HTTP calls to the fake server,
+set ``DISCORD_API_BASE`` to ``http://<host>:<port>/api/v10``.
+
+Run from the repository root:
+    python -m benchmarks.fake_discord --port 8080 --limit 5 --per 5 --error-rate 0.05
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import typing
+
+from aiohttp import web
+
+API_PREFIX = "/api/v10"
+
+# Snowflakes handed out by the server start from here
+FIRST_ID = 1_100_000_000_000_000_000
+
+BOT_USER = {
+    "id": "1000000000000000001",
+    "username": "fake-bot",
+    "discriminator": "0",
+    "global_name": None,
+    "avatar": None,
+    "bot": True,
+}
+
+
+def respond(
+    data: dict, status: int = 200, headers: typing.Optional[dict] = None
+) -> web.Response:
+    """Build a JSON response the way Discord sends it.
+
+    discord.py only decodes bodies whose content type is exactly
+    ``application/json``, without the charset aiohttp adds by default.
+
+    Args:
+        data (dict): The JSON body.
+        status (int): The HTTP status.
+        headers (dict | None): Additional headers.
+
+    Returns:
+        web.Response: The response.
+    """
+    return web.Response(
+        body=json.dumps(data).encode("utf-8"),
+        status=status,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+    )
+
+
+class FakeDiscordConfig(typing.NamedTuple):
+    """How the fake server behaves."""
+
+    # Requests allowed per channel every ``per`` seconds; 0 disables limits
+    limit: int = 5
+    per: float = 5.0
+    # Whether successful responses carry the rate limit headers; without
+    # them clients only learn about the limit from 429 responses
+    announce_limits: bool = True
+    # Added to every response, in seconds
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Fraction of message creations answered with a 5xx
+    error_rate: float = 0.0
+    error_statuses: typing.Tuple[int, ...] = (500, 502, 503)
+
+
+class Delivery(typing.NamedTuple):
+    """A message accepted by the fake server."""
+
+    channel_id: int
+    received_at: float
+    payload: dict
+
+
+class Bucket:
+    """A fixed-window rate limit of one channel."""
+
+    __slots__ = ("reset_at", "remaining")
+
+    def __init__(self) -> None:
+        """Initialize an expired bucket."""
+        self.reset_at = 0.0
+        self.remaining = 0
+
+
+class FakeDiscord:
+    """The state and request handlers of the fake server."""
+
+    def __init__(self, config: FakeDiscordConfig = FakeDiscordConfig()) -> None:
+        """Initialize the fake server.
+
+        Args:
+            config (FakeDiscordConfig): How the server behaves.
+        """
+        self.config = config
+        self.ids = itertools.count(FIRST_ID)
+        # channel ID -> rate limit bucket
+        self.buckets: typing.Dict[int, Bucket] = {}
+        self.deliveries: typing.List[Delivery] = []
+        self.counts = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    def app(self) -> web.Application:
+        """Build the aiohttp application.
+
+        Returns:
+            web.Application: The application serving the fake API.
+        """
+        app = web.Application()
+        app.router.add_get(f"{API_PREFIX}/users/@me", self.current_user)
+        app.router.add_get(f"{API_PREFIX}/oauth2/applications/@me", self.application)
+        app.router.add_post(
+            f"{API_PREFIX}/channels/{{channel_id}}/messages", self.create_message
+        )
+        return app
+
+    async def delay(self) -> None:
+        """Wait for the configured latency."""
+        config = self.config
+        if config.latency or config.jitter:
+            await asyncio.sleep(config.latency + random.uniform(0, config.jitter))
+
+    def take(self, channel_id: int) -> typing.Tuple[bool, dict]:
+        """Count a request against the rate limit of a channel.
+
+        Args:
+            channel_id (int): The ID of the channel.
+
+        Returns:
+            tuple[bool, dict]: Whether the request is allowed, and the
+                rate limit headers of the response.
+        """
+        config = self.config
+        if not config.limit:
+            return True, {}
+
+        now = time.monotonic()
+        bucket = self.buckets.get(channel_id)
+        if bucket is None:
+            bucket = self.buckets[channel_id] = Bucket()
+        if now >= bucket.reset_at:
+            bucket.reset_at = now + config.per
+            bucket.remaining = config.limit
+
+        allowed = bucket.remaining > 0
+        if allowed:
+            bucket.remaining -= 1
+            if not config.announce_limits:
+                return True, {}
+        headers = {
+            "X-RateLimit-Limit": str(config.limit),
+            "X-RateLimit-Remaining": str(bucket.remaining),
+            "X-RateLimit-Reset-After": f"{bucket.reset_at - now:.3f}",
+            "X-RateLimit-Bucket": f"channel-{channel_id}",
+        }
+        return allowed, headers
+
+    async def current_user(self, request: web.Request) -> web.Response:
+        """Answer ``GET /users/@me``, used to log in."""
+        await self.delay()
+        return respond(BOT_USER)
+
+    async def application(self, request: web.Request) -> web.Response:
+        """Answer ``GET /oauth2/applications/@me``, read after logging in."""
+        await self.delay()
+        return respond(
+            {
+                "id": BOT_USER["id"],
+                "name": BOT_USER["username"],
+                "description": "",
+                "icon": None,
+                "bot_public": False,
+                "bot_require_code_grant": False,
+                "owner": BOT_USER,
+                "verify_key": "",
+                "flags": 0,
+            }
+        )
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        """Answer ``POST /channels/{channel_id}/messages``."""
+        self.counts["requests"] += 1
+        channel_id = int(request.match_info["channel_id"])
+        await self.delay()
+
+        allowed, headers = self.take(channel_id)
+        if not allowed:
+            self.counts["rate_limited"] += 1
+            retry_after = float(headers["X-RateLimit-Reset-After"])
+            headers["Retry-After"] = str(max(1, round(retry_after)))
+            return respond(
+                {
+                    "message": "You are being rate limited.",
+                    "retry_after": retry_after,
+                    "global": False,
+                },
+                status=429,
+                headers=headers,
+            )
+
+        if random.random() < self.config.error_rate:
+            self.counts["errors"] += 1
+            return respond(
+                {"message": "Injected server error", "code": 0},
+                status=random.choice(self.config.error_statuses),
+                headers=headers,
+            )
+
+        # Messages with files are sent as multipart, with the JSON in a field
+        if request.content_type.startswith("multipart/"):
+            form = await request.post()
+            payload = json.loads(form["payload_json"])
+        else:
+            payload = await request.json()
+        self.deliveries.append(Delivery(channel_id, time.perf_counter(), payload))
+
+        return respond(
+            {
+                "id": str(next(self.ids)),
+                "channel_id": str(channel_id),
+                "type": 0,
+                "content": payload.get("content") or "",
+                "author": BOT_USER,
+                "embeds": payload.get("embeds") or [],
+                "attachments": [],
+                "mentions": [],
+                "mention_roles": [],
+                "mention_everyone": False,
+                "pinned": False,
+                "tts": False,
+                "timestamp": "2024-01-01T00:00:00+00:00",
+                "edited_timestamp": None,
+            },
+            headers=headers,
+        )
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Serve the fake API in the running event loop.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on, 0 for any free port.
+
+        Returns:
+            web.AppRunner: The runner, to clean up when done.
+        """
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        return runner
+
+
+def api_base(runner: web.AppRunner) -> str:
+    """Return the API base URL of a started fake server.
+
+    Args:
+        runner (web.AppRunner): The runner returned by ``FakeDiscord.start``.
+
+    Returns:
+        str: The value to use as ``DISCORD_API_BASE``.
+    """
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}{API_PREFIX}"
+
+
+def main():
+    """Run the fake server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--limit", type=int, default=FakeDiscordConfig.limit)
+    parser.add_argument("--per", type=float, default=FakeDiscordConfig.per)
+    parser.add_argument(
+        "--hide-limits",
+        action="store_true",
+        help="only reveal rate limits through 429 responses",
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeDiscord(
+        FakeDiscordConfig(
+            limit=args.limit,
+            per=args.per,
+            announce_limits=not args.hide_limits,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+        )
+    )
+    print(f"DISCORD_API_BASE=http://{args.host}:{args.port}{API_PREFIX}")
+    web.run_app(fake.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Load test of the notification path against the fake Discord API.
+
+Each scenario starts ``benchmarks.fake_discord`` in-process, points discord.py
+at it, and pushes events through the same path the cogs use: the event
+pipeline, the Discord sink, the outbox journal and its per-channel workers,
+and discord.py's HTTP client with its rate limit handling. It then reports
+the delivery throughput and the latency from ``emit`` until the message
+reached the server.
+
+The bot's usual environment (``.env``) is needed, since the outbox reads its
+pacing and retry settings from ``config``.
+
+Run from the repository root:
+    python -m benchmarks.load_notifications [scenario ...]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+import discord
+
+from benchmarks.fake_discord import FakeDiscord, FakeDiscordConfig, api_base
+from utils.outbox import Outbox
+from utils.pipeline import Event, Pipeline
+from utils.sinks import DiscordSink
+
+# Destination channels of the scenarios get IDs from here on
+FIRST_CHANNEL_ID = 1_200_000_000_000_000_000
+
+
+class Scenario(typing.NamedTuple):
+    """A scripted load on the notification path."""
+
+    description: str
+    messages: int
+    channels: int
+    server: FakeDiscordConfig
+    # Events emitted per second, 0 for all at once
+    rate: float = 0.0
+    timeout: float = 120.0
+
+
+SCENARIOS = {
+    "steady": Scenario(
+        "Unlimited server, events spread over 10 channels",
+        messages=200,
+        channels=10,
+        server=FakeDiscordConfig(limit=0),
+    ),
+    "rate_limited": Scenario(
+        "Discord's 5 messages per 5 seconds per channel, one burst",
+        messages=60,
+        channels=4,
+        server=FakeDiscordConfig(limit=5, per=5.0),
+    ),
+    "hidden_limits": Scenario(
+        "The same limits, only revealed through 429 responses",
+        messages=60,
+        channels=4,
+        server=FakeDiscordConfig(limit=5, per=5.0, announce_limits=False),
+    ),
+    "flaky": Scenario(
+        "50-150 ms latency and 5% server errors, events at 40 per second",
+        messages=200,
+        channels=10,
+        server=FakeDiscordConfig(limit=0, latency=0.05, jitter=0.1, error_rate=0.05),
+        rate=40.0,
+    ),
+}
+
+
+class LoadBot(discord.Client):
+    """A client that only uses the HTTP API; load tests have no gateway."""
+
+    async def wait_until_ready(self) -> None:
+        """Return at once, there is no gateway to wait for."""
+
+    def get_channel(self, channel_id: int) -> discord.PartialMessageable:
+        """Return a channel that can be sent to without being cached.
+
+        Args:
+            channel_id (int): The ID of the channel.
+
+        Returns:
+            discord.PartialMessageable: The channel.
+        """
+        return self.get_partial_messageable(channel_id)
+
+
+def percentile(values: typing.List[float], fraction: float) -> float:
+    """Return a percentile of a list of values.
+
+    Args:
+        values (list[float]): The values.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The value below which ``fraction`` of the values fall.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(name: str, scenario: Scenario) -> None:
+    """Run a scenario and print its results.
+
+    Args:
+        name (str): The name of the scenario.
+        scenario (Scenario): The scenario.
+    """
+    fake = FakeDiscord(scenario.server)
+    runner = await fake.start()
+    discord.http.Route.BASE = api_base(runner)
+
+    bot = LoadBot(intents=discord.Intents.none())
+    await bot.login("fake-token")
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(bot, os.path.join(directory, "outbox.sqlite3"))
+        pipeline = Pipeline()
+        pipeline.add_sink(DiscordSink(outbox))
+        pipeline.start()
+
+        # sequence number -> time the event was emitted
+        emitted: typing.Dict[int, float] = {}
+        started = time.perf_counter()
+        for sequence in range(scenario.messages):
+            channel_id = FIRST_CHANNEL_ID + sequence % scenario.channels
+            embed = discord.Embed(title="Load test", description=str(sequence))
+            emitted[sequence] = time.perf_counter()
+            pipeline.emit(
+                Event(
+                    "load.test",
+                    "Load test message %d",
+                    sequence,
+                    channel_id=channel_id,
+                    embed=embed,
+                )
+            )
+            if scenario.rate:
+                await asyncio.sleep(1 / scenario.rate)
+
+        deadline = started + scenario.timeout
+        while len(fake.deliveries) < scenario.messages:
+            if time.perf_counter() > deadline:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        await pipeline.close()
+        await outbox.close()
+    await bot.close()
+    await runner.cleanup()
+
+    latencies = [
+        delivery.received_at
+        - emitted[int(delivery.payload["embeds"][0]["description"])]
+        for delivery in fake.deliveries
+    ]
+    print(f"{name}: {scenario.description}")
+    print(
+        f"  delivered {len(latencies)}/{scenario.messages} in {elapsed:.2f}s "
+        f"({len(latencies) / elapsed:.1f} messages/s), "
+        f"{fake.counts['requests']} requests, "
+        f"{fake.counts['rate_limited']} rate limited, "
+        f"{fake.counts['errors']} server errors"
+    )
+    if latencies:
+        print(
+            "  latency p50 {:.3f}s  p95 {:.3f}s  p99 {:.3f}s  max {:.3f}s  mean {:.3f}s".format(
+                percentile(latencies, 0.50),
+                percentile(latencies, 0.95),
+                percentile(latencies, 0.99),
+                max(latencies),
+                statistics.mean(latencies),
+            )
+        )
+
+
+async def main():
+    """Run the scenarios named on the command line, or all of them."""
+    names = sys.argv[1:] or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            print(f"Unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}.")
+            continue
+        await run(name, SCENARIOS[name])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,32 +8,64 @@ as extensions (cogs) and can respond to events in real-time.
 Features include:
 - Asynchronous loading of extensions
 - Logging of events and actions
-- Graceful shutdown on user interruption
+- Durable delivery of notifications through a local outbox
+- An event pipeline feeding the log, notification, history and metrics sinks
+- Rules to ignore, sample or reroute events before any work is done on them
+- Hourly or daily digests instead of one notification per low-priority event
+- Ban list sync across the guilds in ``BAN_SYNC_GUILD_IDS``
+- Graceful shutdown on SIGINT or SIGTERM that delivers or keeps every queued
+  notification
 
 To run the bot, ensure that the BOT_TOKEN is set in the configuration.
 """
 
 import asyncio
+import signal
+import time
 
 import discord
 from discord.ext import commands
 
 import config
 from logger_init import logger
+from utils.names import NameCache
+from utils.outbox import Outbox
+from utils.pipeline import Pipeline
+from utils.rules import Rules
+from utils.sinks import DigestSink, DiscordSink, LogSink, MetricsSink, SQLiteSink
+from utils.storage import data_path
+
+if config.DISCORD_API_BASE:
+    discord.http.Route.BASE = config.DISCORD_API_BASE
 
 intents = discord.Intents.all()
 bot = commands.Bot(command_prefix="!", intents=intents)
+bot.outbox = Outbox(bot, data_path("outbox.sqlite3"))
+bot.rules = Rules.load(config.RULES_FILE)
+bot.names = NameCache(data_path("names.json"))
+bot.metrics = MetricsSink()
+bot.pipeline = Pipeline()
+bot.pipeline.add_sink(LogSink())
+bot.pipeline.add_sink(DiscordSink(bot.outbox, bot.rules))
+bot.pipeline.add_sink(DigestSink(bot.outbox, bot.rules))
+bot.pipeline.add_sink(SQLiteSink(data_path("events.sqlite3")))
+bot.pipeline.add_sink(bot.metrics)
 
 
 async def load_extensions():
     """Load all the cogs/extensions asynchronously."""
     extensions = [
+        "cogs.bans_events",
         "cogs.channels_events",
+        "cogs.cohort_events",
         "cogs.guilds_events",
         "cogs.messages_events",
         "cogs.members_events",
+        "cogs.memory_events",
+        "cogs.polls_events",
         "cogs.reactions_events",
         "cogs.roles_events",
+        "cogs.snapshot_events",
     ]
 
     for ext in extensions:
@@ -48,13 +80,63 @@ async def on_ready():
     await load_extensions()
 
 
+async def shutdown():
+    """Stop taking events, deliver what is queued and persist the rest.
+
+    The cogs are unloaded first, which removes their listeners and reports
+    their pending batches. The pipeline and the outbox then get until
+    ``SHUTDOWN_TIMEOUT_SECONDS`` to catch up. Events the pipeline has not
+    handled by then are journaled by the outbox anyway, and messages not
+    delivered stay in the journal; both are sent on the next start. The connection
+    to Discord is closed last, since delivery needs it.
+    """
+    logger.info("Bot is shutting down...")
+    deadline = time.monotonic() + config.SHUTDOWN_TIMEOUT_SECONDS
+
+    for ext in list(bot.extensions):
+        try:
+            await bot.unload_extension(ext)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to unload extension %s", ext)
+
+    await bot.pipeline.close(max(deadline - time.monotonic(), 0))
+    pending = await bot.outbox.drain(max(deadline - time.monotonic(), 0))
+    await bot.outbox.close()
+    await bot.names.close()
+    await bot.close()
+
+    logger.info(
+        "Shutdown complete, %d message(s) kept for delivery on the next start.",
+        pending,
+    )
+    for handler in logger.handlers:
+        handler.flush()
+
+
 async def main():
-    """Run the bot and handle any shutdowns or reloads."""
+    """Run the bot until it is interrupted or terminated, then shut down."""
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stopping.set)
+        except NotImplementedError:
+            # Windows: Ctrl+C still raises KeyboardInterrupt
+            pass
+
+    bot.outbox.start()
+    bot.pipeline.start()
+    bot.names.start()
+    running = asyncio.create_task(bot.start(config.BOT_TOKEN))
+    stopped = asyncio.create_task(stopping.wait())
     try:
-        await bot.start(config.BOT_TOKEN)
-    except KeyboardInterrupt:
-        logger.info("Bot is shutting down...")
-        await bot.close()
+        await asyncio.wait({running, stopped}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        stopped.cancel()
+        await shutdown()
+    if running.done() and not running.cancelled():
+        # Surface a failed login or a crash of the client
+        running.result()
 
 
 if __name__ == "__main__":
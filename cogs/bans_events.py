@@ -0,0 +1,266 @@
+"""
+Bans Events Cog for the Discord bot.
+
+This cog keeps the bans of the guilds in ``BAN_SYNC_GUILD_IDS`` in sync (see
+``utils.bans``). When it loads, it fetches the bans of every synced guild
+once, bans the users banned anywhere else in the guilds that lack them, and
+reports the reconciliation. From then on the ban lists are kept current from
+the ban and unban events, and every ban or unban is propagated to the other
+guilds. The last known lists are stored, so a reconciliation after a restart
+propagates the unbans made while the bot was away instead of undoing them,
+and changes still queued at shutdown are applied on the next start.
+
+The `!bansync` command (bot owner only) fetches the ban lists again and
+reconciles them on demand.
+"""
+
+import asyncio
+import typing
+
+import discord
+from discord.ext import commands
+
+import config
+from logger_init import logger
+from utils.bans import BanExecutor, BanSet, BanStore, fetch_bans, plan
+from utils.embeds import EmbedTemplate
+from utils.pipeline import Event
+from utils.rendering import fit_message, message_kwargs
+from utils.storage import data_path
+
+BAN_SYNC = EmbedTemplate("Ban Sync", discord.Color.dark_red(), timestamp=True)
+
+RECONCILE_BAN = "Ban sync: banned in another synced guild"
+RECONCILE_UNBAN = "Ban sync: unbanned in another synced guild"
+
+# A synced guild, its number of bans, and the bans and unbans queued for it
+Result = typing.Tuple[discord.Guild, int, int, int]
+
+
+class BansEvents(commands.Cog):
+    """Cog for synchronising bans across guilds."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the BansEvents cog.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+        """
+        self.bot = bot
+        # guild ID -> banned user IDs, only for synced guilds whose bans were fetched
+        self.sets: typing.Dict[int, BanSet] = {}
+        self.store = BanStore(data_path("bans.sqlite3"))
+        self.executor = BanExecutor(bot, self.store, self.applied)
+        self.task: typing.Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        """Resume the last run's changes and reconcile without holding up other cogs."""
+        if config.BAN_SYNC_GUILD_IDS:
+            resumed = self.executor.resume()
+            if resumed:
+                logger.info("Ban sync: resuming %d change(s).", resumed)
+            self.task = asyncio.create_task(self.reconcile_and_report())
+
+    async def cog_unload(self) -> None:
+        """Stop the reconciliation and the executor and close the store."""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        await self.executor.close()
+        self.store.close()
+
+    def record(self, guild_id: int, user_id: int, banned: bool) -> None:
+        """Record a ban or an unban in the known lists, in memory and on disk.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            banned (bool): Whether the user is now banned.
+        """
+        bans = self.sets.get(guild_id)
+        if bans is None:
+            return
+        if banned:
+            bans.add(user_id)
+        else:
+            bans.discard(user_id)
+        self.store.record(guild_id, user_id, banned)
+
+    def applied(self, guild_id: int, user_id: int, banned: bool) -> None:
+        """Record a change the executor applied, before its event arrives.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            banned (bool): Whether the user is now banned.
+        """
+        self.record(guild_id, user_id, banned)
+
+    async def reconcile(self, refresh: bool = False) -> typing.List[Result]:
+        """Fetch the missing ban lists and queue the changes each guild needs.
+
+        The fetched lists are compared with the last known ones, so bans
+        lifted since then are propagated instead of added back (see
+        ``utils.bans.plan``).
+
+        Args:
+            refresh (bool): Fetch every ban list again, not only missing ones.
+
+        Returns:
+            list[Result]: Every synced guild with its number of bans and the
+                numbers of bans and unbans queued for it.
+        """
+        guilds = []
+        current: typing.Dict[int, BanSet] = {}
+        for guild_id in config.BAN_SYNC_GUILD_IDS:
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                logger.warning("Ban sync: guild %s is not available.", guild_id)
+                continue
+            if refresh or guild.id not in self.sets:
+                try:
+                    current[guild.id] = await fetch_bans(guild)
+                except discord.HTTPException as error:
+                    logger.error(
+                        "Ban sync: cannot fetch the bans of %s: %s", guild, error
+                    )
+                    continue
+            else:
+                current[guild.id] = self.sets[guild.id]
+            guilds.append(guild)
+
+        changes = plan(current, self.store.load())
+        for guild_id, bans in current.items():
+            if bans is not self.sets.get(guild_id):
+                self.sets[guild_id] = bans
+                self.store.replace(guild_id, bans)
+
+        # Unbans still being propagated must not be undone
+        unbanning = self.executor.unbanning()
+        for guild_id, (to_ban, to_unban) in changes.items():
+            for user_id in to_ban:
+                if user_id in unbanning:
+                    continue
+                if not self.executor.is_pending(guild_id, user_id, True):
+                    self.executor.queue(guild_id, user_id, True, RECONCILE_BAN)
+            for user_id in to_unban:
+                if not self.executor.is_pending(guild_id, user_id, False):
+                    self.executor.queue(guild_id, user_id, False, RECONCILE_UNBAN)
+
+        return [
+            (guild, len(self.sets[guild.id]), *map(len, changes[guild.id]))
+            for guild in guilds
+        ]
+
+    def report(self, results: typing.List[Result]) -> discord.Embed:
+        """Build the report of a reconciliation.
+
+        Args:
+            results (list[Result]): What ``reconcile`` returned.
+
+        Returns:
+            discord.Embed: The report.
+        """
+        return BAN_SYNC.render(
+            f"Reconciled the ban lists of {len(results)} guild(s). "
+            f"{self.executor.backlog()} change(s) are waiting to be applied.",
+            extra=[
+                (guild.name, f"{bans} ban(s), {banning} to add, {unbanning} to lift")
+                for guild, bans, banning, unbanning in results
+            ],
+        )
+
+    async def reconcile_and_report(self) -> None:
+        """Reconcile the ban lists once the bot is ready and report the result."""
+        await self.bot.wait_until_ready()
+        results = await self.reconcile()
+
+        queued = sum(banning + unbanning for _, _, banning, unbanning in results)
+        destination = self.bot.rules.route(
+            "ban.sync", config.MEMBERS_UPDATES_CHANNEL_ID
+        )
+        if destination is None or not queued:
+            return
+
+        self.bot.pipeline.emit(
+            Event(
+                "ban.sync",
+                "Ban sync queued %d change(s) across %d guild(s)",
+                queued,
+                len(results),
+                channel_id=destination,
+                embed=self.report(results),
+            )
+        )
+
+    def propagate(self, guild: discord.Guild, user: discord.User, ban: bool) -> None:
+        """Queue a ban or an unban in every other synced guild that needs it.
+
+        Args:
+            guild (discord.Guild): The guild the change was made in.
+            user (discord.User): The user who was banned or unbanned.
+            ban (bool): True for a ban, False for an unban.
+        """
+        if guild.id not in self.sets:
+            return
+        self.record(guild.id, user.id, ban)
+
+        action = "banned" if ban else "unbanned"
+        for guild_id, other in self.sets.items():
+            if guild_id == guild.id or self.executor.is_pending(guild_id, user.id, ban):
+                continue
+            # Changes this cog made come back as events and stop here, unless
+            # the opposite change is still queued and has to be replaced
+            if (user.id in other) == ban and not self.executor.is_pending(
+                guild_id, user.id, not ban
+            ):
+                continue
+            self.executor.queue(
+                guild_id, user.id, ban, f"Ban sync: {action} in {guild.name}"
+            )
+
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild: discord.Guild, user: discord.User):
+        """Event listener for when a member is banned.
+
+        Args:
+            guild (discord.Guild): The guild from which the member was banned.
+            user (discord.User): The user who was banned.
+        """
+        self.propagate(guild, user, True)
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        """Event listener for when a member is unbanned.
+
+        Args:
+            guild (discord.Guild): The guild from which the member was unbanned.
+            user (discord.User): The user who was unbanned.
+        """
+        self.propagate(guild, user, False)
+
+    @commands.command(name="bansync")
+    @commands.is_owner()
+    async def bansync(self, ctx: commands.Context):
+        """Fetch the ban lists of the synced guilds again and reconcile them.
+
+        Usage: !bansync
+
+        Args:
+            ctx (commands.Context): The context of the command.
+        """
+        if not config.BAN_SYNC_GUILD_IDS:
+            await ctx.send("Ban sync is off, set BAN_SYNC_GUILD_IDS to turn it on.")
+            return
+
+        embed = self.report(await self.reconcile(refresh=True))
+        await ctx.send(**message_kwargs(*fit_message(embed.to_dict())))
+
+
+async def setup(bot):
+    """Set up the BansEvents cog.
+
+    Args:
+        bot (commands.Bot): The instance of the Discord bot.
+    """
+    await bot.add_cog(BansEvents(bot))
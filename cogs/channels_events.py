@@ -4,12 +4,32 @@ Channels Events Cog for the Discord bot.
 This cog handles events related to channel creation, deletion, and updates 
 within a guild. It logs details of each channel event and sends notifications 
 to a specified channel, providing comprehensive information about the changes.
+
+Listeners only emit events; logging and delivery happen in the sinks of the
+event pipeline (see ``utils.pipeline``).
 """
 
+import typing
+
 import discord
 from discord.ext import commands
 import config
 from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.names import CHANNEL
+from utils.permissions import describe_overwrite
+from utils.pipeline import Event
+
+CHANNEL_CREATED = EmbedTemplate(
+    "Channel Created", discord.Color.green(), ("Category",), inline=True
+)
+CHANNEL_DELETED = EmbedTemplate(
+    "Channel Deleted", discord.Color.red(), ("Category",), inline=True
+)
+CHANNEL_UPDATED = EmbedTemplate("Channel Updated", discord.Color.orange())
+
+# Attributes reported per overwrite target instead of as opaque mappings
+OVERWRITE_ATTRIBUTES = {"overwrites", "changed_roles"}
 
 
 class ChannelsEvents(commands.Cog):
@@ -23,6 +43,29 @@ class ChannelsEvents(commands.Cog):
         """
         self.bot = bot
 
+    async def cog_load(self) -> None:
+        """Record the names of the channels of every guild."""
+        for guild in self.bot.guilds:
+            self.remember_channels(guild)
+
+    def remember_channels(self, guild: discord.Guild) -> None:
+        """Record the names of the channels of a guild.
+
+        Args:
+            guild (discord.Guild): The guild.
+        """
+        for channel in guild.channels:
+            self.bot.names.remember(CHANNEL, channel.id, channel.name)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Event listener for when the bot joins a guild.
+
+        Args:
+            guild (discord.Guild): The guild that was joined.
+        """
+        self.remember_channels(guild)
+
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
         """Event listener for when a new channel is created.
@@ -30,28 +73,30 @@ class ChannelsEvents(commands.Cog):
         Args:
             channel (discord.abc.GuildChannel): The channel that was created.
         """
-        logger.info("Created %s, category: %s", channel.name, channel.category)
+        self.bot.names.remember(CHANNEL, channel.id, channel.name)
 
-        embed = discord.Embed(
-            title="Channel Created",
-            description=f"Channel **{channel.mention}** was created.",
-            color=discord.Color.green(),
+        destination = self.bot.rules.route(
+            "channel.create", config.CHANNELS_UPDATES_CHANNEL_ID, channel_id=channel.id
         )
+        if destination is None:
+            return
 
-        category_name = channel.category.name if channel.category else "No Category"
-        embed.add_field(name="Category", value=category_name)
-
-        # Retrieve the channel to send the update
-        channel_updates_channel = self.bot.get_channel(
-            config.CHANNELS_UPDATES_CHANNEL_ID
+        category_name = self.bot.names.name(CHANNEL, channel.category_id, "No Category")
+        embed = CHANNEL_CREATED.render(
+            f"Channel **{channel.mention}** was created.", category_name
         )
-        if channel_updates_channel:
-            await channel_updates_channel.send(embed=embed)
-            logger.info("Notification sent for channel creation.")
-        else:
-            logger.warning(
-                "Channel with ID %s not found.", config.CHANNELS_UPDATES_CHANNEL_ID
+
+        self.bot.pipeline.emit(
+            Event(
+                "channel.create",
+                "Created %s, category: %s",
+                channel.name,
+                channel.category,
+                guild_id=channel.guild.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
@@ -60,28 +105,58 @@ class ChannelsEvents(commands.Cog):
         Args:
             channel (discord.abc.GuildChannel): The channel that was deleted.
         """
-        logger.info("Deleted %s, category: %s", channel.name, channel.category)
+        self.bot.names.forget(CHANNEL, channel.id)
 
-        embed = discord.Embed(
-            title="Channel Deleted",
-            description=f"Channel **{channel.name}** was deleted.",
-            color=discord.Color.red(),
+        destination = self.bot.rules.route(
+            "channel.delete", config.CHANNELS_UPDATES_CHANNEL_ID, channel_id=channel.id
         )
+        if destination is None:
+            return
 
-        category_name = channel.category.name if channel.category else "No Category"
-        embed.add_field(name="Category", value=category_name)
-
-        # Retrieve the channel to send the update
-        channel_updates_channel = self.bot.get_channel(
-            config.CHANNELS_UPDATES_CHANNEL_ID
+        category_name = self.bot.names.name(CHANNEL, channel.category_id, "No Category")
+        embed = CHANNEL_DELETED.render(
+            f"Channel **{channel.name}** was deleted.", category_name
         )
-        if channel_updates_channel:
-            await channel_updates_channel.send(embed=embed)
-            logger.info("Notification sent for channel deletion.")
-        else:
-            logger.warning(
-                "Channel with ID %s not found.", config.CHANNELS_UPDATES_CHANNEL_ID
+
+        self.bot.pipeline.emit(
+            Event(
+                "channel.delete",
+                "Deleted %s, category: %s",
+                channel.name,
+                channel.category,
+                guild_id=channel.guild.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
+
+    @staticmethod
+    def overwrite_changes(
+        before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ) -> typing.List[str]:
+        """Describe the permission overwrites changed by a channel update.
+
+        Args:
+            before (discord.abc.GuildChannel): The channel before the update.
+            after (discord.abc.GuildChannel): The channel after the update.
+
+        Returns:
+            list[str]: One line per changed overwrite.
+        """
+        before_pairs = {
+            target: tuple(value.value for value in overwrite.pair())
+            for target, overwrite in before.overwrites.items()
+        }
+        after_pairs = {
+            target: tuple(value.value for value in overwrite.pair())
+            for target, overwrite in after.overwrites.items()
+        }
+        return [
+            f"Overwrite for {target.mention} "
+            + describe_overwrite(before_pairs.get(target), after_pairs.get(target))
+            for target in before_pairs.keys() | after_pairs.keys()
+            if before_pairs.get(target) != after_pairs.get(target)
+        ]
 
     @commands.Cog.listener()
     async def on_guild_channel_update(
@@ -93,6 +168,14 @@ class ChannelsEvents(commands.Cog):
             before (discord.abc.GuildChannel): The channel before the update.
             after (discord.abc.GuildChannel): The channel after the update.
         """
+        self.bot.names.remember(CHANNEL, after.id, after.name)
+
+        destination = self.bot.rules.route(
+            "channel.update", config.CHANNELS_UPDATES_CHANNEL_ID, channel_id=after.id
+        )
+        if destination is None:
+            return
+
         changes = []
 
         # Get all attribute names
@@ -102,7 +185,9 @@ class ChannelsEvents(commands.Cog):
         all_attributes = [
             attr
             for attr in all_attributes
-            if not callable(getattr(before, attr, None)) and not attr.startswith("_")
+            if not callable(getattr(before, attr, None))
+            and not attr.startswith("_")
+            and attr not in OVERWRITE_ATTRIBUTES
         ]
 
         # Compare each attribute
@@ -113,31 +198,26 @@ class ChannelsEvents(commands.Cog):
                 changes.append(
                     f"{attr} changed from '{before_value}' to '{after_value}'"
                 )
+        changes.extend(self.overwrite_changes(before, after))
 
         # Output the changes
         if changes:
-            logger.info("Channel '%s' was updated:", before.mention)
-            embed = discord.Embed(
-                title="Channel Updated",
-                description=f"Channel **{before.mention}** was updated.",
-                color=discord.Color.orange(),  # Color to signify an update
+            embed = CHANNEL_UPDATED.render(
+                f"Channel **{before.mention}** was updated.",
+                extra=[("Change Detected", change) for change in changes],
             )
 
-            for change in changes:
-                embed.add_field(name="Change Detected", value=change, inline=False)
-                logger.info("  - %s", change)
-
-            # Retrieve the channel to send the update
-            channel_updates_channel = self.bot.get_channel(
-                config.CHANNELS_UPDATES_CHANNEL_ID
-            )
-            if channel_updates_channel:
-                await channel_updates_channel.send(embed=embed)
-                logger.info("Notification sent for channel update.")
-            else:
-                logger.warning(
-                    "Channel with ID %s not found.", config.CHANNELS_UPDATES_CHANNEL_ID
+            self.bot.pipeline.emit(
+                Event(
+                    "channel.update",
+                    "Channel '%s' was updated:\n%s",
+                    before.mention,
+                    "\n".join(f"  - {change}" for change in changes),
+                    guild_id=after.guild.id,
+                    channel_id=destination,
+                    embed=embed,
                 )
+            )
         else:
             logger.info(
                 "Channel '%s' was updated, but no significant changes were detected.",
@@ -0,0 +1,184 @@
+"""
+Cohort Events Cog for the Discord bot.
+
+This cog keeps the recent joins of every guild in a ``JoinCohort`` (see
+``utils.cohort``) and scores them together, so that during a raid moderators
+can judge the whole wave of joins at once. The cohort is seeded from the
+member cache when the cog loads, so a restart does not lose the joins of the
+last ``COHORT_WINDOW_HOURS``.
+
+The `!suspects` command ranks the recent joins by risk.
+"""
+
+import time
+import typing
+
+import discord
+from discord.ext import commands
+
+import config
+from utils.cohort import JoinCohort, Suspect
+from utils.embeds import EmbedTemplate
+from utils.rendering import fit_message, message_kwargs
+
+SUSPECTS = EmbedTemplate("Join Suspects", discord.Color.dark_red(), timestamp=True)
+
+# Signals worth naming next to a suspect, with the value they need to reach
+NOTABLE = {"no_avatar": 1.0, "digits": 0.3, "shared_prefix": 0.2}
+
+
+def format_age(days: float) -> str:
+    """Render the age of an account.
+
+    Args:
+        days (float): The age in days.
+
+    Returns:
+        str: The age in minutes, hours or days.
+    """
+    if days < 1 / 24:
+        return f"{days * 1440:.0f}m"
+    if days < 1:
+        return f"{days * 24:.0f}h"
+    return f"{days:.0f}d"
+
+
+def describe_suspect(suspect: Suspect) -> str:
+    """Render a suspect as one line of the report.
+
+    Args:
+        suspect (Suspect): The scored join.
+
+    Returns:
+        str: The score, the member and the signals behind the score.
+    """
+    reasons = [f"account {format_age(suspect.account_age_days)} old"]
+    if suspect.burst:
+        reasons.append(f"{suspect.burst} other joins within a minute")
+    reasons.extend(
+        name.replace("_", " ")
+        for name, threshold in NOTABLE.items()
+        if suspect.signals[name] >= threshold
+    )
+    return (
+        f"`{suspect.score * 100:3.0f}` <@{suspect.user_id}> "
+        f"{discord.utils.escape_markdown(suspect.name)}: {', '.join(reasons)}"
+    )
+
+
+class CohortEvents(commands.Cog):
+    """Cog for scoring cohorts of joins."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the CohortEvents cog.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+        """
+        self.bot = bot
+        # guild ID -> recent joins
+        self.cohorts: typing.Dict[int, JoinCohort] = {}
+
+    async def cog_load(self) -> None:
+        """Seed the cohort of every guild from the member cache."""
+        for guild in self.bot.guilds:
+            self.seed(guild)
+
+    def seed(self, guild: discord.Guild) -> None:
+        """Record the cached members that joined within the cohort window.
+
+        Args:
+            guild (discord.Guild): The guild.
+        """
+        since = time.time() - config.COHORT_WINDOW_HOURS * 3600
+        recent = sorted(
+            (
+                member
+                for member in guild.members
+                if member.joined_at and member.joined_at.timestamp() >= since
+            ),
+            key=lambda member: member.joined_at,
+        )
+        cohort = self.cohorts[guild.id] = JoinCohort()
+        for member in recent:
+            self.record(cohort, member)
+
+    @staticmethod
+    def record(cohort: JoinCohort, member: discord.Member) -> None:
+        """Add a member to a cohort.
+
+        Args:
+            cohort (JoinCohort): The cohort of the member's guild.
+            member (discord.Member): The member who joined.
+        """
+        joined_at = member.joined_at.timestamp() if member.joined_at else time.time()
+        cohort.add(member.id, member.name, joined_at, member.avatar is not None)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Event listener for when the bot joins a guild.
+
+        Args:
+            guild (discord.Guild): The guild that was joined.
+        """
+        self.seed(guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        """Event listener for when a member joins a guild.
+
+        Args:
+            member (discord.Member): The member who joined.
+        """
+        cohort = self.cohorts.get(member.guild.id)
+        if cohort is None:
+            cohort = self.cohorts[member.guild.id] = JoinCohort()
+        self.record(cohort, member)
+
+    @commands.command(name="suspects")
+    @commands.guild_only()
+    @commands.has_permissions(kick_members=True)
+    async def suspects(
+        self,
+        ctx: commands.Context,
+        limit: int = 20,
+        hours: int = config.COHORT_WINDOW_HOURS,
+    ):
+        """Rank the recent joins of the guild by risk.
+
+        Usage: !suspects [limit] [hours]
+
+        Args:
+            ctx (commands.Context): The context of the command.
+            limit (int): The number of suspects to list.
+            hours (int): How far back to look.
+        """
+        cohort = self.cohorts.get(ctx.guild.id)
+        if cohort is None or not len(cohort):
+            await ctx.send("No recent joins recorded.")
+            return
+
+        started = time.perf_counter()
+        ranked = cohort.suspects(time.time() - hours * 3600, max(1, min(limit, 100)))
+        elapsed = (time.perf_counter() - started) * 1000
+        if not ranked:
+            await ctx.send(f"Nobody joined in the last {hours} hours.")
+            return
+
+        embed = SUSPECTS.render(
+            "\n".join(describe_suspect(suspect) for suspect in ranked),
+            footer=(
+                f"Top {len(ranked)} of the joins in the last {hours} hours, "
+                f"{len(cohort)} kept, scored in {elapsed:.1f} ms"
+            ),
+        )
+        await ctx.send(**message_kwargs(*fit_message(embed.to_dict())))
+
+
+async def setup(bot):
+    """Set up the CohortEvents cog.
+
+    Args:
+        bot (commands.Bot): The instance of the Discord bot.
+    """
+    await bot.add_cog(CohortEvents(bot))
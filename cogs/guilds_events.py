@@ -4,12 +4,72 @@ Guilds Events Cog for the Discord bot.
 This cog handles events related to the creation and deletion of invites 
 within a guild. It logs details of each invite event and sends notifications 
 to a specified channel, providing comprehensive information about the changes.
+
+It also keeps a per-guild cache of invite use counts, seeded once at startup
+and kept current from invite events, so that member joins can be attributed
+to the invite they used with one debounced invite fetch per burst of joins.
 """
 
+import asyncio
+import time
+import typing
+
 import discord
 from discord.ext import commands
 import config
 from logger_init import logger
+from utils.embeds import EmbedTemplate, format_time
+from utils.pipeline import Event
+
+INVITE_CREATED = EmbedTemplate(
+    "Invite Created",
+    discord.Color.blue(),  # Use blue to indicate creation
+    (
+        "Inviter",
+        "Channel",
+        "Max Age",
+        "Max Uses",
+        "Temporary Membership",
+        "Uses",
+        "URL",
+    ),
+)
+INVITE_DELETED = EmbedTemplate("Invite Deleted", discord.Color.red(), ("Channel",))
+
+# How long an invite deleted one use before its limit may still explain a
+# join, on top of the debounce window, in seconds; deleted by hand or expired,
+# it must not be credited to a later, unrelated join
+EXHAUSTED_GRACE_SECONDS = 5
+
+
+class TrackedInvite:
+    """Cached state of a single invite."""
+
+    __slots__ = ("code", "uses", "max_uses", "inviter")
+
+    def __init__(self, invite: discord.Invite) -> None:
+        """Initialize the cached state from an invite.
+
+        Args:
+            invite (discord.Invite): The invite to track.
+        """
+        self.code = invite.code
+        self.uses = invite.uses or 0
+        self.max_uses = invite.max_uses or 0
+        self.inviter = invite.inviter.mention if invite.inviter else "Unknown"
+
+
+class JoinBatch:
+    """Members who joined a guild within one debounce window."""
+
+    __slots__ = ("members", "result", "task")
+
+    def __init__(self) -> None:
+        """Initialize an empty batch."""
+        self.members: typing.List[int] = []
+        # Resolves to the invites used during the window, one entry per use
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: typing.Optional[asyncio.Task] = None
 
 
 class GuildsEvents(commands.Cog):
@@ -22,6 +82,166 @@ class GuildsEvents(commands.Cog):
             bot (commands.Bot): The instance of the Discord bot.
         """
         self.bot = bot
+        # guild ID -> invite code -> cached invite
+        self.invites: typing.Dict[int, typing.Dict[str, TrackedInvite]] = {}
+        # guild ID -> invites deleted one use before their limit, with the
+        # monotonic time of the deletion
+        self.exhausted: typing.Dict[
+            int, typing.List[typing.Tuple[float, TrackedInvite]]
+        ] = {}
+        # guild ID -> joins waiting for the next invite fetch
+        self.batches: typing.Dict[int, JoinBatch] = {}
+
+    async def cog_load(self) -> None:
+        """Seed the invite cache of every guild the bot is in."""
+        for guild in self.bot.guilds:
+            await self.seed_invites(guild)
+
+    async def cog_unload(self) -> None:
+        """Stop the pending invite fetches; their joins are reported unattributed."""
+        tasks = [batch.task for batch in self.batches.values() if batch.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def seed_invites(self, guild: discord.Guild) -> None:
+        """Fetch the invites of a guild and cache their use counts.
+
+        Args:
+            guild (discord.Guild): The guild to seed.
+        """
+        try:
+            invites = await guild.invites()
+        except discord.HTTPException as error:
+            logger.warning("Could not fetch invites of %s: %s", guild, error)
+            return
+
+        self.invites[guild.id] = {
+            invite.code: TrackedInvite(invite) for invite in invites
+        }
+        logger.info("Cached %d invites for %s.", len(invites), guild)
+
+    async def attribute_join(
+        self, member: discord.Member
+    ) -> typing.Tuple[typing.Optional[TrackedInvite], bool]:
+        """Find the invite a member most likely joined with.
+
+        Joins arriving within ``config.INVITE_DEBOUNCE_SECONDS`` of each other
+        share a single invite fetch. When several invites were used during the
+        same window, they are matched to members in join order and the result
+        is flagged as uncertain.
+
+        Args:
+            member (discord.Member): The member who joined.
+
+        Returns:
+            tuple[TrackedInvite | None, bool]: The invite used, if found, and
+                whether the attribution is certain.
+        """
+        guild = member.guild
+        batch = self.batches.get(guild.id)
+        if batch is None:
+            batch = self.batches[guild.id] = JoinBatch()
+            batch.task = asyncio.create_task(self.resolve_batch(guild, batch))
+
+        index = len(batch.members)
+        batch.members.append(member.id)
+
+        used = await batch.result
+        invite = used[index] if index < len(used) else None
+        certain = (
+            len(used) == len(batch.members)
+            and len({tracked.code for tracked in used}) <= 1
+        )
+        return invite, certain
+
+    async def resolve_batch(self, guild: discord.Guild, batch: JoinBatch) -> None:
+        """Wait for the join burst to settle, then fetch and diff the invites once.
+
+        Args:
+            guild (discord.Guild): The guild the members joined.
+            batch (JoinBatch): The joins to attribute.
+        """
+        used: typing.List[TrackedInvite] = []
+        try:
+            await asyncio.sleep(config.INVITE_DEBOUNCE_SECONDS)
+            # Joins from now on wait for the next fetch
+            del self.batches[guild.id]
+            used = await self.diff_invites(guild)
+        except Exception as error:  # pylint: disable=broad-except
+            logger.warning("Could not attribute joins in %s: %s", guild, error)
+        finally:
+            # Also when cancelled, or the joins waiting on the batch never return
+            if self.batches.get(guild.id) is batch:
+                del self.batches[guild.id]
+            if not batch.result.done():
+                batch.result.set_result(used)
+
+    async def diff_invites(self, guild: discord.Guild) -> typing.List[TrackedInvite]:
+        """Fetch the invites of a guild and work out which ones were used.
+
+        Args:
+            guild (discord.Guild): The guild to check.
+
+        Returns:
+            list[TrackedInvite]: The invites used since the last fetch, one
+                entry per use.
+        """
+        cached = self.invites.get(guild.id)
+        if cached is None:
+            # Without a baseline every use would look new
+            await self.seed_invites(guild)
+            return []
+
+        fresh = {invite.code: TrackedInvite(invite) for invite in await guild.invites()}
+
+        used = []
+        for code, tracked in fresh.items():
+            previous = cached.get(code)
+            increase = tracked.uses - (previous.uses if previous else 0)
+            used.extend([tracked] * max(increase, 0))
+
+        # Invites deleted on reaching their limit were used one last time
+        used.extend(self.recently_exhausted(guild.id))
+        self.exhausted.pop(guild.id, None)
+
+        self.invites[guild.id] = fresh
+        return used
+
+    def recently_exhausted(self, guild_id: int) -> typing.List[TrackedInvite]:
+        """Return the invites of a guild deleted one use before their limit lately.
+
+        Older deletions are forgotten: they were not caused by a join of the
+        current batch.
+
+        Args:
+            guild_id (int): The ID of the guild.
+
+        Returns:
+            list[TrackedInvite]: The invites, oldest deletion first.
+        """
+        oldest = time.monotonic() - (
+            config.INVITE_DEBOUNCE_SECONDS + EXHAUSTED_GRACE_SECONDS
+        )
+        recent = [
+            (deleted_at, tracked)
+            for deleted_at, tracked in self.exhausted.get(guild_id, [])
+            if deleted_at >= oldest
+        ]
+        if recent:
+            self.exhausted[guild_id] = recent
+        else:
+            self.exhausted.pop(guild_id, None)
+        return [tracked for _, tracked in recent]
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Event listener for when the bot joins a guild.
+
+        Args:
+            guild (discord.Guild): The guild that was joined.
+        """
+        await self.seed_invites(guild)
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite: discord.Invite):
@@ -30,79 +250,60 @@ class GuildsEvents(commands.Cog):
         Args:
             invite (discord.Invite): The invite that was created.
         """
-        logger.info(
-            "Invite created: %s by %s for %s",
-            invite.code,
-            invite.inviter,
-            invite.channel,
-        )
+        if invite.guild:
+            self.invites.setdefault(invite.guild.id, {})[invite.code] = TrackedInvite(
+                invite
+            )
 
-        # Create an embed for the invite creation
-        embed = discord.Embed(
-            title="Invite Created",
-            description=f"An invite code **{invite.code}** was created.",
-            color=discord.Color.blue(),  # Use blue to indicate creation
-        )
-        embed.add_field(
-            name="Inviter",
-            value=invite.inviter.mention if invite.inviter else "Unknown",
-            inline=False,
-        )
-        embed.add_field(
-            name="Channel",
-            value=invite.channel.mention if invite.channel else "Unknown",
-            inline=False,
+        destination = self.bot.rules.route(
+            "invite.create",
+            config.GUILDS_UPDATES_CHANNEL_ID,
+            channel_id=invite.channel.id if invite.channel else None,
+            user=invite.inviter,
         )
+        if destination is None:
+            return
 
         max_age_value = f"{invite.max_age} seconds" if invite.max_age else "Never"
-        embed.add_field(name="Max Age", value=max_age_value, inline=False)
-
         max_uses_value = str(invite.max_uses) if invite.max_uses > 0 else "Unlimited"
-        embed.add_field(name="Max Uses", value=max_uses_value, inline=False)
-
-        embed.add_field(
-            name="Temporary Membership",
-            value="Yes" if invite.temporary else "No",
-            inline=False,
-        )
-        embed.add_field(name="Uses", value=str(invite.uses), inline=False)
-        embed.add_field(name="URL", value=invite.url, inline=False)
 
+        # Optional fields, only shown when the invite has them
+        extra = []
         if invite.target_type:
-            embed.add_field(
-                name="Target Type", value=str(invite.target_type), inline=False
-            )
-
+            extra.append(("Target Type", invite.target_type))
         if invite.target_user:
-            embed.add_field(
-                name="Target User",
-                value=invite.target_user.mention if invite.target_user else "None",
-                inline=False,
-            )
-
+            extra.append(("Target User", invite.target_user.mention))
         if invite.target_application:
-            embed.add_field(
-                name="Target Application",
-                value=invite.target_application.name,
-                inline=False,
-            )
-
+            extra.append(("Target Application", invite.target_application.name))
         if invite.expires_at:
-            embed.add_field(
-                name="Expires At",
-                value=invite.expires_at.strftime("%Y-%m-%d %H:%M:%S"),
-                inline=False,
-            )
+            extra.append(("Expires At", format_time(invite.expires_at)))
 
-        # Retrieve the channel to send the update
-        invite_channel = self.bot.get_channel(config.GUILDS_UPDATES_CHANNEL_ID)
-        if invite_channel:
-            await invite_channel.send(embed=embed)
-            logger.info("Notification sent for invite creation.")
-        else:
-            logger.warning(
-                "Channel with ID %s not found.", config.GUILDS_UPDATES_CHANNEL_ID
+        # Create an embed for the invite creation
+        embed = INVITE_CREATED.render(
+            f"An invite code **{invite.code}** was created.",
+            invite.inviter.mention if invite.inviter else "Unknown",
+            invite.channel.mention if invite.channel else "Unknown",
+            max_age_value,
+            max_uses_value,
+            "Yes" if invite.temporary else "No",
+            invite.uses,
+            invite.url,
+            extra=extra,
+        )
+
+        self.bot.pipeline.emit(
+            Event(
+                "invite.create",
+                "Invite created: %s by %s for %s",
+                invite.code,
+                invite.inviter,
+                invite.channel,
+                guild_id=invite.guild.id if invite.guild else None,
+                actor_id=invite.inviter.id if invite.inviter else None,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite):
@@ -111,29 +312,41 @@ class GuildsEvents(commands.Cog):
         Args:
             invite (discord.Invite): The invite that was deleted.
         """
-        logger.info("Invite deleted: %s for %s", invite.code, invite.channel)
+        if invite.guild:
+            tracked = self.invites.get(invite.guild.id, {}).pop(invite.code, None)
+            if tracked and tracked.max_uses and tracked.uses + 1 >= tracked.max_uses:
+                # Drops the stale entries, so the list stays short without joins
+                self.recently_exhausted(invite.guild.id)
+                self.exhausted.setdefault(invite.guild.id, []).append(
+                    (time.monotonic(), tracked)
+                )
 
-        # Create an embed for the invite deletion
-        embed = discord.Embed(
-            title="Invite Deleted",
-            description=f"An invite code **{invite.code}** was deleted.",
-            color=discord.Color.red(),
+        destination = self.bot.rules.route(
+            "invite.delete",
+            config.GUILDS_UPDATES_CHANNEL_ID,
+            channel_id=invite.channel.id if invite.channel else None,
         )
-        embed.add_field(
-            name="Channel",
-            value=invite.channel.mention if invite.channel else "Unknown",
-            inline=False,
+        if destination is None:
+            return
+
+        # Create an embed for the invite deletion
+        embed = INVITE_DELETED.render(
+            f"An invite code **{invite.code}** was deleted.",
+            invite.channel.mention if invite.channel else "Unknown",
         )
 
-        # Retrieve the channel to send the update
-        invite_channel = self.bot.get_channel(config.GUILDS_UPDATES_CHANNEL_ID)
-        if invite_channel:
-            await invite_channel.send(embed=embed)
-            logger.info("Notification sent for invite deletion.")
-        else:
-            logger.warning(
-                "Channel with ID %s not found.", config.GUILDS_UPDATES_CHANNEL_ID
+        self.bot.pipeline.emit(
+            Event(
+                "invite.delete",
+                "Invite deleted: %s for %s",
+                invite.code,
+                invite.channel,
+                guild_id=invite.guild.id if invite.guild else None,
+                actor_id=invite.inviter.id if invite.inviter else None,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
 
 async def setup(bot):
@@ -4,13 +4,31 @@ Members Events Cog for the Discord bot.
 This cog handles events related to members in the Discord server, including 
 joining, leaving, updating their profiles, banning, and unbanning. It logs these 
 events and sends notifications to a specified channel.
+
+Listeners only emit events; logging and delivery happen in the sinks of the
+event pipeline (see ``utils.pipeline``).
 """
 
 import discord
 from discord.ext import commands
 
 import config
-from logger_init import logger
+from utils.embeds import EmbedTemplate, format_time
+from utils.names import USER
+from utils.pipeline import Event
+
+MEMBER_JOINED = EmbedTemplate(
+    "Welcome!", discord.Color.green(), ("Invite", "Invited By"), inline=True
+)
+MEMBER_LEFT = EmbedTemplate(
+    "Member Left", discord.Color.red(), ("User ID", "Joined"), timestamp=True
+)
+MEMBER_UPDATED = EmbedTemplate("Member Updated", discord.Color.blue(), timestamp=True)
+USER_UPDATED = EmbedTemplate(
+    "User Updated", discord.Color.blue(), footer="Member update", timestamp=True
+)
+MEMBER_BANNED = EmbedTemplate("Member Banned", discord.Color.red(), ("User ID",))
+MEMBER_UNBANNED = EmbedTemplate("Member Unbanned", discord.Color.green(), ("User ID",))
 
 
 class MembersEvents(commands.Cog):
@@ -31,28 +49,48 @@ class MembersEvents(commands.Cog):
         Args:
             member (discord.Member): The member who joined the server.
         """
-        logger.info("Member joined: %s (%s)", member, member.id)
+        self.bot.names.remember(USER, member.id, str(member))
+
+        # Attribute the join to an invite from the cached invite uses
+        invite_code, inviter = "Unknown", "Unknown"
+        guilds_cog = self.bot.get_cog("GuildsEvents")
+        if guilds_cog:
+            invite, certain = await guilds_cog.attribute_join(member)
+            if invite:
+                invite_code = invite.code if certain else f"{invite.code} (likely)"
+                inviter = invite.inviter
+
+        # Checked after the attribution, which keeps the invite cache current
+        destination = self.bot.rules.route(
+            "member.join", config.MEMBERS_UPDATES_CHANNEL_ID, user=member
+        )
+        if destination is None:
+            return
 
         # Create a welcome message
-        embed = discord.Embed(
-            title="Welcome!",
-            description=f"Welcome to {member.guild.name}, {member.mention}! "
+        embed = MEMBER_JOINED.render(
+            f"Welcome to {member.guild.name}, {member.mention}! "
             "We're glad to have you here.",
-            color=discord.Color.green(),
+            invite_code,
+            inviter,
+            # Add member's profile picture as a thumbnail
+            thumbnail=member.avatar.url if member.avatar else None,
         )
 
-        # Add member's profile picture as a thumbnail
-        if member.avatar:
-            embed.set_thumbnail(url=member.avatar.url)
-
         # Send the welcome message to the specified channel
-        welcome_channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-        if welcome_channel:
-            await welcome_channel.send(embed=embed)
-        else:
-            logger.warning(
-                "Channel with ID %d not found.", config.MEMBERS_UPDATES_CHANNEL_ID
+        self.bot.pipeline.emit(
+            Event(
+                "member.join",
+                "Member joined: %s (%s) with invite %s",
+                member,
+                member.id,
+                invite_code,
+                guild_id=member.guild.id,
+                actor_id=member.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
@@ -61,39 +99,37 @@ class MembersEvents(commands.Cog):
         Args:
             member (discord.Member): The member who left the server.
         """
-        # Log the event
-        logger.info(
-            "Member %s (%d) has left the guild %s.",
-            member.name,
-            member.id,
-            member.guild.name,
+        self.bot.names.remember(USER, member.id, str(member))
+
+        destination = self.bot.rules.route(
+            "member.remove", config.MEMBERS_UPDATES_CHANNEL_ID, user=member
         )
+        if destination is None:
+            return
 
         # Prepare the embed
-        embed = discord.Embed(
-            title="Member Left",
-            description=f"{member.mention} has left the server.",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow(),
-        )
-        if member.avatar:
-            embed.set_thumbnail(url=member.avatar.url)
-        embed.add_field(name="User ID", value=str(member.id), inline=False)
-        embed.add_field(
-            name="Joined",
-            value=member.joined_at.strftime("%Y-%m-%d %H:%M:%S"),
-            inline=False,
+        embed = MEMBER_LEFT.render(
+            f"{member.mention} has left the server.",
+            member.id,
+            format_time(member.joined_at),
+            thumbnail=member.avatar.url if member.avatar else None,
+            footer=f"Member left | {member.guild.name}",
         )
-        embed.set_footer(text=f"Member left | {member.guild.name}")
 
         # Send the embed to the specified channel
-        channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-        if channel:
-            await channel.send(embed=embed)
-        else:
-            logger.warning(
-                "Members updates channel not found. Please check the channel ID."
+        self.bot.pipeline.emit(
+            Event(
+                "member.remove",
+                "Member %s (%d) has left the guild %s.",
+                member.name,
+                member.id,
+                member.guild.name,
+                guild_id=member.guild.id,
+                actor_id=member.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -103,6 +139,14 @@ class MembersEvents(commands.Cog):
             before (discord.Member): The member's profile before the update.
             after (discord.Member): The member's profile after the update.
         """
+        self.bot.names.remember(USER, after.id, str(after))
+
+        destination = self.bot.rules.route(
+            "member.update", config.MEMBERS_UPDATES_CHANNEL_ID, user=after
+        )
+        if destination is None:
+            return
+
         changes = []
 
         # Compare nickname
@@ -128,16 +172,8 @@ class MembersEvents(commands.Cog):
 
         # Compare timeout
         if before.timed_out_until != after.timed_out_until:
-            before_timeout = (
-                before.timed_out_until.strftime("%Y-%m-%d %H:%M:%S")
-                if before.timed_out_until
-                else "None"
-            )
-            after_timeout = (
-                after.timed_out_until.strftime("%Y-%m-%d %H:%M:%S")
-                if after.timed_out_until
-                else "None"
-            )
+            before_timeout = format_time(before.timed_out_until)
+            after_timeout = format_time(after.timed_out_until)
             changes.append(
                 f"**Timeout:**\nBefore: {before_timeout} ➔ After: {after_timeout}"
             )
@@ -164,26 +200,30 @@ class MembersEvents(commands.Cog):
         # Log changes if any
         if changes:
             # Prepare the embed
-            embed = discord.Embed(
-                title="Member Updated",
-                description=f"{before.mention} was updated.",
-                color=discord.Color.blue(),
-                timestamp=discord.utils.utcnow(),
-            )
-            embed.set_thumbnail(
-                url=after.avatar.url if after.avatar else after.default_avatar.url
-            )
-
             # Add each change as a separate field
-            for i, change in enumerate(changes, 1):
-                embed.add_field(name=f"Change {i}", value=change, inline=False)
-
-            embed.set_footer(text=f"Member update | {before.guild.name}")
+            embed = MEMBER_UPDATED.render(
+                f"{before.mention} was updated.",
+                extra=[(f"Change {i}", change) for i, change in enumerate(changes, 1)],
+                thumbnail=(
+                    after.avatar.url if after.avatar else after.default_avatar.url
+                ),
+                footer=f"Member update | {before.guild.name}",
+            )
 
             # Send the message to the specified channel
-            channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-            if channel:
-                await channel.send(embed=embed)
+            self.bot.pipeline.emit(
+                Event(
+                    "member.update",
+                    "Member updated: %s (%s), %d change(s)",
+                    after,
+                    after.id,
+                    len(changes),
+                    guild_id=after.guild.id,
+                    actor_id=after.id,
+                    channel_id=destination,
+                    embed=embed,
+                )
+            )
 
     @commands.Cog.listener()
     async def on_user_update(self, before: discord.User, after: discord.User):
@@ -193,6 +233,14 @@ class MembersEvents(commands.Cog):
             before (discord.User): The user's profile before the update.
             after (discord.User): The user's profile after the update.
         """
+        self.bot.names.remember(USER, after.id, str(after))
+
+        destination = self.bot.rules.route(
+            "user.update", config.MEMBERS_UPDATES_CHANNEL_ID, user=after
+        )
+        if destination is None:
+            return
+
         changes = []
 
         # Compare the username (global name)
@@ -223,26 +271,29 @@ class MembersEvents(commands.Cog):
         # Log changes if any
         if changes:
             # Prepare the embed
-            embed = discord.Embed(
-                title="User Updated",
-                description=f"{before.mention} was updated.",
-                color=discord.Color.blue(),
-                timestamp=discord.utils.utcnow(),
-            )
-            embed.set_thumbnail(
-                url=after.avatar.url if after.avatar else after.default_avatar.url
-            )
-
             # Add each change as a separate field
-            for i, change in enumerate(changes, 1):
-                embed.add_field(name=f"Change {i}", value=change, inline=False)
-
-            embed.set_footer(text=f"Member update")
+            embed = USER_UPDATED.render(
+                f"{before.mention} was updated.",
+                extra=[(f"Change {i}", change) for i, change in enumerate(changes, 1)],
+                thumbnail=(
+                    after.avatar.url if after.avatar else after.default_avatar.url
+                ),
+            )
 
             # Send the message to the specified channel
-            channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-            if channel:
-                await channel.send(embed=embed)
+            self.bot.pipeline.emit(
+                Event(
+                    "user.update",
+                    "User updated: %s (%s), %d change(s)",
+                    after,
+                    after.id,
+                    len(changes),
+                    guild_id=None,
+                    actor_id=after.id,
+                    channel_id=destination,
+                    embed=embed,
+                )
+            )
 
     @commands.Cog.listener()
     async def on_member_ban(self, guild: discord.Guild, user: discord.User):
@@ -252,27 +303,34 @@ class MembersEvents(commands.Cog):
             guild (discord.Guild): The guild from which the member was banned.
             user (discord.User): The user who was banned.
         """
-        logger.info("User unbanned: %s (%s) from %s", user, user.id, guild)
+        self.bot.names.remember(USER, user.id, str(user))
 
-        embed = discord.Embed(
-            title="Member Banned",
-            description="{} has been banned from {}.".format(user, guild.name),
-            color=discord.Color.red(),
+        destination = self.bot.rules.route(
+            "member.ban", config.MEMBERS_UPDATES_CHANNEL_ID, user=user
+        )
+        if destination is None:
+            return
+
+        embed = MEMBER_BANNED.render(
+            "{} has been banned from {}.".format(user, guild.name),
+            user.id,
+            thumbnail=user.avatar.url if user.avatar else None,
         )
-        embed.add_field(name="User ID", value=user.id, inline=False)
-        if user.avatar:
-            embed.set_thumbnail(
-                url=user.avatar.url if user.avatar else discord.Embed.Empty
-            )
 
         # Send the embed to the specified channel
-        ban_channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-        if ban_channel:
-            await ban_channel.send(embed=embed)
-        else:
-            logger.warning(
-                "Ban updates channel not found. Please check the channel ID."
+        self.bot.pipeline.emit(
+            Event(
+                "member.ban",
+                "User banned: %s (%s) from %s",
+                user,
+                user.id,
+                guild,
+                guild_id=guild.id,
+                actor_id=user.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_member_unban(self, guild: discord.Guild, user: discord.User):
@@ -282,27 +340,34 @@ class MembersEvents(commands.Cog):
             guild (discord.Guild): The guild from which the member was unbanned.
             user (discord.User): The user who was unbanned.
         """
-        logger.info("User unbanned: %s (%s) from %s", user, user.id, guild)
+        self.bot.names.remember(USER, user.id, str(user))
 
-        embed = discord.Embed(
-            title="Member Unbanned",
-            description=f"{user} has been unbanned from {guild.name}.",
-            color=discord.Color.green(),
+        destination = self.bot.rules.route(
+            "member.unban", config.MEMBERS_UPDATES_CHANNEL_ID, user=user
+        )
+        if destination is None:
+            return
+
+        embed = MEMBER_UNBANNED.render(
+            f"{user} has been unbanned from {guild.name}.",
+            user.id,
+            thumbnail=user.avatar.url if user.avatar else None,
         )
-        embed.add_field(name="User ID", value=user.id, inline=False)
-        if user.avatar:
-            embed.set_thumbnail(
-                url=user.avatar.url if user.avatar else discord.Embed.Empty
-            )
 
         # Send the embed to the specified channel
-        unban_channel = self.bot.get_channel(config.MEMBERS_UPDATES_CHANNEL_ID)
-        if unban_channel:
-            await unban_channel.send(embed=embed)
-        else:
-            logger.warning(
-                "Unban updates channel not found. Please check the channel ID."
+        self.bot.pipeline.emit(
+            Event(
+                "member.unban",
+                "User unbanned: %s (%s) from %s",
+                user,
+                user.id,
+                guild,
+                guild_id=guild.id,
+                actor_id=user.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
 
 async def setup(bot: commands.Bot):
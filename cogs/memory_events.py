@@ -0,0 +1,238 @@
+"""
+Memory Events Cog for the Discord bot.
+
+This cog watches the memory footprint of the bot. Every
+``MEMORY_CHECK_MINUTES`` it logs the resident set size and, while
+tracemalloc is enabled (``MEMORY_TRACE_FRAMES``), compares an allocation
+snapshot with the previous one. When the RSS grew by more than
+``MEMORY_GROWTH_WARN_MB`` since the last check, it logs a warning with the
+allocation sites and the object types that grew the most and the sizes of
+every cache, and with ``MEMORY_TRIM`` enabled it releases the memory that
+can be rebuilt.
+
+The `!memory` command (bot owner only) shows the same report on demand.
+"""
+
+import asyncio
+import tracemalloc
+import typing
+
+import discord
+from discord.ext import commands, tasks
+
+import config
+from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.memory import (
+    MIB,
+    count_objects,
+    library_caches,
+    owned_caches,
+    rss_bytes,
+    trim,
+)
+from utils.rendering import fit_message, message_kwargs
+
+MEMORY_REPORT = EmbedTemplate(
+    "Memory Report",
+    discord.Color.blurple(),
+    ("Resident Set Size", "Traced Allocations", "discord.py Caches", "Bot Caches"),
+    timestamp=True,
+)
+
+# Allocations of the interpreter's own machinery are not interesting
+TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+# Allocation sites listed in reports and warnings
+TOP_SITES = 8
+
+# Object types listed in reports and warnings
+TOP_TYPES = 8
+
+
+def format_sizes(sizes: typing.Dict[str, int]) -> str:
+    """Render cache sizes, largest first.
+
+    Args:
+        sizes (dict[str, int]): The number of entries of every cache.
+
+    Returns:
+        str: One line per cache.
+    """
+    return "\n".join(
+        f"{name}: {size:,}"
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1])
+    )
+
+
+class MemoryEvents(commands.Cog):
+    """Cog for reporting the memory footprint and catching leaks."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the MemoryEvents cog.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+        """
+        self.bot = bot
+        self.started_tracing = False
+        # RSS and allocation snapshot of the previous check
+        self.last_rss = rss_bytes()
+        self.previous: typing.Optional[tracemalloc.Snapshot] = None
+        # Object counts by type of the previous check
+        self.counts: typing.Optional[typing.Counter[str]] = None
+        self.watch.change_interval(minutes=config.MEMORY_CHECK_MINUTES)
+
+    async def cog_load(self) -> None:
+        """Start tracing allocations and the periodic check."""
+        if config.MEMORY_TRACE_FRAMES and not tracemalloc.is_tracing():
+            tracemalloc.start(config.MEMORY_TRACE_FRAMES)
+            self.started_tracing = True
+        self.watch.start()
+
+    async def cog_unload(self) -> None:
+        """Stop the periodic check and the tracing this cog started."""
+        self.watch.cancel()
+        if self.started_tracing:
+            tracemalloc.stop()
+        self.previous = None
+        self.counts = None
+
+    async def growth(self) -> typing.List[str]:
+        """Take an allocation snapshot and compare it with the previous one.
+
+        Returns:
+            list[str]: The allocation sites that grew the most, empty while
+                tracemalloc is off or on the first snapshot.
+        """
+        if not tracemalloc.is_tracing():
+            return []
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        previous, self.previous = self.previous, snapshot
+        if previous is None:
+            return []
+
+        # Comparing large snapshots is slow, keep it off the event loop
+        stats = await asyncio.to_thread(snapshot.compare_to, previous, "lineno")
+        return [
+            f"{stat.size_diff / 1024:+,.0f} KiB ({stat.count_diff:+,}) "
+            f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}"
+            for stat in stats[:TOP_SITES]
+            if stat.size_diff > 0
+        ]
+
+    def type_growth(self) -> typing.List[str]:
+        """Count the objects by type and compare with the previous count.
+
+        Returns:
+            list[str]: The object types whose number grew the most, empty on
+                the first count.
+        """
+        counts = count_objects()
+        previous, self.counts = self.counts, counts
+        if previous is None:
+            return []
+        return [
+            f"{grown:+,} {name} ({counts[name]:,})"
+            for name, grown in (counts - previous).most_common(TOP_TYPES)
+        ]
+
+    def traced(self) -> str:
+        """Describe the memory traced by tracemalloc.
+
+        Returns:
+            str: The current and peak traced memory, or why there is none.
+        """
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is off (MEMORY_TRACE_FRAMES=0)"
+        current, peak = tracemalloc.get_traced_memory()
+        return f"{current / MIB:,.1f} MiB (peak {peak / MIB:,.1f} MiB)"
+
+    @tasks.loop(minutes=30)
+    async def watch(self):
+        """Log the memory footprint and warn when it grew too much."""
+        rss = rss_bytes()
+        grown = rss - self.last_rss
+        self.last_rss = rss
+        sites = await self.growth()
+        types = self.type_growth()
+
+        logger.info(
+            "Memory: RSS %.1f MiB (%+.1f MiB since the last check), traced %s.",
+            rss / MIB,
+            grown / MIB,
+            self.traced(),
+        )
+        if grown < config.MEMORY_GROWTH_WARN_MB * MIB:
+            return
+
+        logger.warning(
+            "Memory grew by %.1f MiB to %.1f MiB.\nLargest growth:\n%s\n"
+            "Growing object types:\n%s\ndiscord.py caches:\n%s\nBot caches:\n%s",
+            grown / MIB,
+            rss / MIB,
+            "\n".join(sites) or "(not traced)",
+            "\n".join(types) or "(first check)",
+            format_sizes(library_caches(self.bot)),
+            format_sizes(owned_caches(self.bot)),
+        )
+        if config.MEMORY_TRIM:
+            collected = trim(self.bot)
+            self.last_rss = rss_bytes()
+            logger.info(
+                "Trimmed caches: %d unreachable objects, RSS now %.1f MiB.",
+                collected,
+                self.last_rss / MIB,
+            )
+
+    @watch.before_loop
+    async def before_watch(self):
+        """Wait until the bot is ready before the first check."""
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="memory")
+    @commands.is_owner()
+    async def memory(self, ctx: commands.Context):
+        """Show the memory footprint of the bot.
+
+        Usage: !memory
+
+        Args:
+            ctx (commands.Context): The context of the command.
+        """
+        sites = await self.growth()
+        types = self.type_growth()
+        embed = MEMORY_REPORT.render(
+            "Growth is measured since the previous check or report.",
+            f"{rss_bytes() / MIB:,.1f} MiB",
+            self.traced(),
+            format_sizes(library_caches(self.bot)),
+            format_sizes(owned_caches(self.bot)) or "None",
+            extra=[
+                (
+                    "Objects",
+                    "\n".join(
+                        f"{name}: {count:,}"
+                        for name, count in self.counts.most_common(TOP_TYPES)
+                    ),
+                ),
+                ("Largest Growth", "\n".join(sites) or "No earlier snapshot."),
+                ("Growing Types", "\n".join(types) or "No earlier count."),
+            ],
+        )
+        await ctx.send(**message_kwargs(*fit_message(embed.to_dict())))
+
+
+async def setup(bot):
+    """Set up the MemoryEvents cog.
+
+    Args:
+        bot (commands.Bot): The instance of the Discord bot.
+    """
+    await bot.add_cog(MemoryEvents(bot))
@@ -4,12 +4,54 @@ Messages Events Cog for the Discord bot.
 This cog handles events related to message edits and deletions, logging the
 details in a specified channel. It utilizes Discord's API to listen for
 message events and sends embedded messages to notify about edits and deletions.
+
+Message content is redacted once per event (see ``utils.redaction``) and the
+redacted text is shared by the log, the content store and the embed.
+Listeners only emit events; logging and delivery happen in the sinks of the
+event pipeline (see ``utils.pipeline``).
+
+Every edit is also recorded in the content store as a word-level delta, and
+the `!history` command rebuilds any stored revision of a message. Edits are
+queued and written in batches by a background task, from a worker thread, so
+edit storms do not block the gateway listeners.
 """
 
+import asyncio
+import datetime
+import re
+import sqlite3
+import typing
+
 import discord
 from discord.ext import commands
 import config
 from logger_init import logger
+from utils.content_store import ContentStore, Edit
+from utils.embeds import EmbedTemplate, format_time
+from utils.names import CHANNEL, USER
+from utils.pipeline import Event
+from utils.redaction import redact
+from utils.rendering import fit_message, message_kwargs, word_diff
+from utils.storage import data_path
+
+MESSAGE_EDITED = EmbedTemplate(
+    "Message Edited", discord.Color.orange(), ("Channel", "Author", "Changes")
+)
+MESSAGE_DELETED = EmbedTemplate(
+    "Message Deleted", discord.Color.red(), ("Channel", "Author", "Content")
+)
+MESSAGE_HISTORY = EmbedTemplate(
+    "Message History", discord.Color.blurple(), ("Channel", "Author", "Revisions")
+)
+MESSAGE_REVISION = EmbedTemplate(
+    "Message Revision", discord.Color.blurple(), ("Content", "Changes")
+)
+
+# A message ID, or the message ID at the end of a message link
+MESSAGE_REFERENCE = re.compile(r"(\d{15,20})/?$")
+
+# Largest number of edits written to the content store in one transaction
+EDIT_BATCH_SIZE = 100
 
 
 class MessagesEvents(commands.Cog):
@@ -22,6 +64,71 @@ class MessagesEvents(commands.Cog):
             bot (commands.Bot): The instance of the Discord bot.
         """
         self.bot = bot
+        self.store = ContentStore(data_path("content.sqlite3"))
+        # Edits waiting to be stored; None stops the writer
+        self.edits: asyncio.Queue = asyncio.Queue()
+        self.writer: typing.Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        """Start writing edits to the content store."""
+        self.writer = asyncio.create_task(self.write_edits())
+
+    async def cog_unload(self) -> None:
+        """Store the queued edits and close the content store."""
+        if self.writer:
+            self.edits.put_nowait(None)
+            await self.writer
+        self.store.close()
+
+    async def write_edits(self) -> None:
+        """Store the queued edits in batches until told to stop."""
+        while True:
+            batch = [await self.edits.get()]
+            while len(batch) < EDIT_BATCH_SIZE and not self.edits.empty():
+                batch.append(self.edits.get_nowait())
+
+            stop = None in batch
+            batch = [edit for edit in batch if edit is not None]
+            if batch:
+                try:
+                    await asyncio.to_thread(self.store.add_edits, batch)
+                except sqlite3.Error as error:
+                    logger.error("Could not store %d edit(s): %s", len(batch), error)
+            if stop:
+                return
+
+    def record_edit(
+        self,
+        before: discord.Message,
+        after: discord.Message,
+        before_content: str,
+        after_content: str,
+    ):
+        """Queue the new revision of an edited message for the content store.
+
+        The content before the edit is stored first if the message has no
+        history yet.
+
+        Args:
+            before (discord.Message): The message before it was edited.
+            after (discord.Message): The message after it was edited.
+            before_content (str): The redacted content before the edit.
+            after_content (str): The redacted content after the edit.
+        """
+        self.bot.names.remember(USER, after.author.id, str(after.author))
+
+        edited_at = after.edited_at or discord.utils.utcnow()
+        self.edits.put_nowait(
+            Edit(
+                after.id,
+                after.channel.id,
+                after.author.id,
+                before_content,
+                before.created_at.timestamp(),
+                after_content,
+                edited_at.timestamp(),
+            )
+        )
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
@@ -34,35 +141,41 @@ class MessagesEvents(commands.Cog):
         if before.content == after.content:
             return  # No change in content, no need to log
 
-        logger.info(
-            "Message edited by %s in channel %s: Before: '%s', After: '%s'",
-            before.author,
-            before.channel,
-            before.content,
-            after.content,
+        destination = self.bot.rules.route(
+            "message.edit",
+            config.MESSAGES_UPDATES_CHANNEL_ID,
+            channel_id=before.channel.id,
+            user=before.author,
         )
+        if destination is None:
+            return
 
-        embed = discord.Embed(
-            title="Message Edited",
-            description=f"A message by {before.author} was edited.",
-            color=discord.Color.orange(),
-        )
-        embed.add_field(name="Channel", value=before.channel.mention, inline=False)
-        embed.add_field(name="Author", value=before.author.mention, inline=False)
-        embed.add_field(
-            name="Before", value=before.content or "No content", inline=False
-        )
-        embed.add_field(name="After", value=after.content or "No content", inline=False)
+        before_content, after_content = redact(before.content), redact(after.content)
+
+        self.record_edit(before, after, before_content, after_content)
 
-        messages_updates_channel = self.bot.get_channel(
-            config.MESSAGES_UPDATES_CHANNEL_ID
+        # Show only the changed words instead of two full copies
+        embed = MESSAGE_EDITED.render(
+            f"A message by {before.author} was edited.",
+            before.channel.mention,
+            before.author.mention,
+            word_diff(before_content, after_content) or "No visible changes",
         )
-        if messages_updates_channel:
-            await messages_updates_channel.send(embed=embed)
-        else:
-            logger.warning(
-                "Channel with ID %d not found.", config.MESSAGES_UPDATES_CHANNEL_ID
+
+        self.bot.pipeline.emit(
+            Event(
+                "message.edit",
+                "Message edited by %s in channel %s: Before: '%s', After: '%s'",
+                before.author,
+                before.channel,
+                before_content,
+                after_content,
+                guild_id=before.guild.id if before.guild else None,
+                actor_id=before.author.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
@@ -75,32 +188,109 @@ class MessagesEvents(commands.Cog):
         if isinstance(message.channel, discord.DMChannel) or not message.content:
             return
 
-        logger.info(
-            "Message deleted by %s in channel %s: Content: '%s'",
-            message.author,
-            message.channel,
-            message.content,
+        destination = self.bot.rules.route(
+            "message.delete",
+            config.MESSAGES_UPDATES_CHANNEL_ID,
+            channel_id=message.channel.id,
+            user=message.author,
         )
+        if destination is None:
+            return
+
+        content = redact(message.content)
 
-        embed = discord.Embed(
-            title="Message Deleted",
-            description=f"A message by {message.author} was deleted.",
-            color=discord.Color.red(),
+        embed = MESSAGE_DELETED.render(
+            f"A message by {message.author} was deleted.",
+            message.channel.mention,
+            message.author.mention,
+            content,
         )
-        embed.add_field(name="Channel", value=message.channel.mention, inline=False)
-        embed.add_field(name="Author", value=message.author.mention, inline=False)
-        embed.add_field(name="Content", value=message.content, inline=False)
 
-        messages_updates_channel = self.bot.get_channel(
-            config.MESSAGES_UPDATES_CHANNEL_ID
+        self.bot.pipeline.emit(
+            Event(
+                "message.delete",
+                "Message deleted by %s in channel %s: Content: '%s'",
+                message.author,
+                message.channel,
+                content,
+                guild_id=message.guild.id if message.guild else None,
+                actor_id=message.author.id,
+                channel_id=destination,
+                embed=embed,
+            )
         )
-        if messages_updates_channel:
-            await messages_updates_channel.send(embed=embed)
+
+    @commands.command(name="history")
+    @commands.guild_only()
+    @commands.has_permissions(manage_messages=True)
+    async def history(
+        self,
+        ctx: commands.Context,
+        message: str,
+        revision: typing.Optional[int] = None,
+    ):
+        """Show the edit history of a message, or one of its revisions.
+
+        Usage: !history <message ID or link> [revision]
+
+        Args:
+            ctx (commands.Context): The context of the command.
+            message (str): The ID or link of the message.
+            revision (int | None): The revision to rebuild, if any.
+        """
+        match = MESSAGE_REFERENCE.search(message)
+        if not match:
+            await ctx.send("Please give a message ID or link.")
+            return
+
+        message_id = int(match.group(1))
+        info = self.store.message_info(message_id)
+        # Only messages of this guild's channels, without revealing others exist
+        if info is None or ctx.guild.get_channel_or_thread(info[0]) is None:
+            await ctx.send("No edit history is stored for that message.")
+            return
+        channel_id, author_id = info
+        revisions = self.store.revisions(message_id)
+
+        if revision is None:
+            lines = [
+                f"**#{stored.number}** — "
+                + format_time(
+                    datetime.datetime.fromtimestamp(
+                        stored.edited_at, datetime.timezone.utc
+                    )
+                )
+                + f" ({stored.size} characters)"
+                for stored in revisions
+            ]
+            # Resolved from the name cache, the message may be long gone
+            names = self.bot.names
+            embed = MESSAGE_HISTORY.render(
+                f"Message {message_id} has {len(revisions)} stored revision(s). "
+                "Use `!history <message> <revision>` to show one.",
+                names.mention(CHANNEL, channel_id),
+                names.mention(USER, author_id),
+                "\n".join(lines),
+            )
         else:
-            logger.warning(
-                "Channel with ID %d not found.", config.MESSAGES_UPDATES_CHANNEL_ID
+            content = self.store.get(message_id, revision)
+            if content is None:
+                await ctx.send(f"Revision {revision} of that message is not stored.")
+                return
+
+            previous = self.store.get(message_id, revision - 1) if revision else None
+            embed = MESSAGE_REVISION.render(
+                f"Revision {revision} of message {message_id}.",
+                content or "No content",
+                (
+                    word_diff(previous, content) or "No visible changes"
+                    if previous is not None
+                    else "Original content"
+                ),
             )
 
+        await ctx.send(**message_kwargs(*fit_message(embed.to_dict())))
+
 
 async def setup(bot):
     """Set up the MessagesEvents cog.
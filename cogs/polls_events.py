@@ -0,0 +1,383 @@
+"""
+Polls Events Cog for the Discord bot.
+
+This cog handles votes being added to and removed from polls. It keeps an
+incremental vote tally per poll in memory, so results never have to be
+refetched, and maintains one live summary message per poll in a specified
+channel. Summaries are emitted as ``poll.update`` events at a bounded rate
+rather than on every vote, and the outbox edits the poll's previous summary
+instead of sending a new one. Tallies are persisted periodically so they
+survive a restart.
+"""
+
+import asyncio
+import datetime
+import logging
+import typing
+
+import discord
+from discord.ext import commands, tasks
+
+import config
+from logger_init import logger
+from utils.embeds import EmbedTemplate, format_time
+from utils.pipeline import Event
+from utils.storage import data_path, load_json, save_json
+
+POLLS_FILE = data_path("polls.json")
+
+POLL_SUMMARY = EmbedTemplate(
+    "Poll Results",
+    discord.Color.blurple(),
+    ("Poll", "Channel", "Total Votes", "Ends"),
+    timestamp=True,
+)
+
+# How long a poll whose end is unknown is tracked, in seconds; the longest a
+# Discord poll can last
+DEFAULT_POLL_SECONDS = 32 * 24 * 60 * 60
+
+
+class PollTally:
+    """Running vote counts for a single poll.
+
+    Only the per-answer counts are kept, not the voters, so memory stays
+    proportional to the number of answers however many votes a poll gets.
+    """
+
+    __slots__ = (
+        "channel_id",
+        "guild_id",
+        "question",
+        "answers",
+        "counts",
+        "expires_at",
+        "deltas",
+        "seeded",
+        "dirty",
+    )
+
+    def __init__(self, channel_id: int, guild_id: typing.Optional[int]) -> None:
+        """Initialize an empty tally.
+
+        Args:
+            channel_id (int): The ID of the channel the poll was posted in.
+            guild_id (int | None): The ID of the guild the poll was posted in.
+        """
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.question = "Unknown poll"
+        # answer ID -> answer text
+        self.answers: typing.Dict[int, str] = {}
+        # answer ID -> vote count
+        self.counts: typing.Dict[int, int] = {}
+        self.expires_at: typing.Optional[float] = None
+        # answer ID -> votes added while the poll is being fetched
+        self.deltas: typing.Optional[typing.Dict[int, int]] = None
+        self.seeded = False
+        self.dirty = True
+
+    def seed(self, poll: discord.Poll) -> None:
+        """Fill in the question, answers and current counts from a fetched poll.
+
+        The votes recorded while the poll was being fetched are added to the
+        fetched counts.
+
+        Args:
+            poll (discord.Poll): The poll attached to the fetched message.
+        """
+        deltas = self.deltas or {}
+        self.question = poll.question
+        self.answers = {answer.id: answer.text for answer in poll.answers}
+        self.counts = {
+            answer.id: max(answer.vote_count + deltas.get(answer.id, 0), 0)
+            for answer in poll.answers
+        }
+        expires_at = poll.expires_at or discord.utils.utcnow() + datetime.timedelta(
+            seconds=DEFAULT_POLL_SECONDS
+        )
+        self.expires_at = expires_at.timestamp()
+        self.deltas = None
+        self.seeded = True
+        self.dirty = True
+
+    def vote(self, answer_id: int, delta: int) -> None:
+        """Apply a single vote being added or removed.
+
+        Args:
+            answer_id (int): The ID of the answer voted on.
+            delta (int): ``1`` for an added vote, ``-1`` for a removed one.
+        """
+        self.counts[answer_id] = max(self.counts.get(answer_id, 0) + delta, 0)
+        if self.deltas is not None:
+            self.deltas[answer_id] = self.deltas.get(answer_id, 0) + delta
+        self.dirty = True
+
+    def render(self, jump_url: str) -> discord.Embed:
+        """Build the summary embed for this poll.
+
+        Args:
+            jump_url (str): The URL of the poll message.
+
+        Returns:
+            discord.Embed: The summary embed.
+        """
+        total = sum(self.counts.values())
+        lines = []
+        for answer_id in self.answers or sorted(self.counts):
+            votes = self.counts.get(answer_id, 0)
+            share = votes / total if total else 0
+            text = self.answers.get(answer_id, f"Answer {answer_id}")
+            lines.append(f"**{text}** — {votes} ({share:.0%})")
+
+        expires_at = (
+            datetime.datetime.fromtimestamp(self.expires_at, datetime.timezone.utc)
+            if self.expires_at
+            else None
+        )
+        return POLL_SUMMARY.render(
+            f"**{self.question}**\n\n" + "\n".join(lines),
+            f"[Jump to poll]({jump_url})",
+            f"<#{self.channel_id}>",
+            total,
+            format_time(expires_at),
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize the tally for persistence.
+
+        Returns:
+            dict: The tally as JSON-serializable data.
+        """
+        return {
+            "channel_id": self.channel_id,
+            "guild_id": self.guild_id,
+            "question": self.question,
+            "answers": self.answers,
+            "counts": self.counts,
+            "expires_at": self.expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PollTally":
+        """Restore a tally persisted with :meth:`to_dict`.
+
+        Args:
+            data (dict): The persisted tally.
+
+        Returns:
+            PollTally: The restored tally.
+        """
+        tally = cls(data["channel_id"], data.get("guild_id"))
+        tally.question = data["question"]
+        # JSON object keys are always strings
+        tally.answers = {int(key): text for key, text in data["answers"].items()}
+        tally.counts = {int(key): count for key, count in data["counts"].items()}
+        tally.expires_at = data.get("expires_at") or (
+            discord.utils.utcnow().timestamp() + DEFAULT_POLL_SECONDS
+        )
+        tally.seeded = True
+        tally.dirty = False
+        return tally
+
+
+class PollsEvents(commands.Cog):
+    """Cog for managing poll-related events."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the PollsEvents cog.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+        """
+        self.bot = bot
+        # poll message ID -> tally
+        self.tallies: typing.Dict[int, PollTally] = {}
+        self.seeding: typing.Set[asyncio.Task] = set()
+        self.changed = False
+        self.update_summaries.change_interval(seconds=config.POLL_SUMMARY_SECONDS)
+        self.persist_tallies.change_interval(seconds=config.POLL_PERSIST_SECONDS)
+
+    async def cog_load(self) -> None:
+        """Restore persisted tallies and start the background tasks."""
+        for message_id, data in load_json(POLLS_FILE, {}).items():
+            self.tallies[int(message_id)] = PollTally.from_dict(data)
+        logger.info("Restored %d poll tallies.", len(self.tallies))
+
+        self.update_summaries.start()
+        self.persist_tallies.start()
+
+    async def cog_unload(self) -> None:
+        """Stop the background tasks and persist the tallies one last time."""
+        self.update_summaries.cancel()
+        self.persist_tallies.cancel()
+        await self.save()
+
+    def jump_url(self, message_id: int, tally: PollTally) -> str:
+        """Build the jump URL of a poll message.
+
+        Args:
+            message_id (int): The ID of the poll message.
+            tally (PollTally): The tally of the poll.
+
+        Returns:
+            str: The URL of the poll message.
+        """
+        guild = tally.guild_id or "@me"
+        return f"https://discord.com/channels/{guild}/{tally.channel_id}/{message_id}"
+
+    async def seed(self, message_id: int, tally: PollTally) -> None:
+        """Fetch a poll once to learn its question, answers and current counts.
+
+        Votes cast before the bot saw the poll are only known from this single
+        fetch; from then on the tally is kept current from vote events, and
+        votes seen during the fetch are added to its counts. If the fetch
+        fails, the tally keeps counting from the votes seen so far and is
+        tracked for the longest time a poll can last.
+
+        Args:
+            message_id (int): The ID of the poll message.
+            tally (PollTally): The tally to seed.
+        """
+        channel = self.bot.get_partial_messageable(
+            tally.channel_id, guild_id=tally.guild_id
+        )
+        tally.deltas = {}
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.HTTPException as error:
+            # Fall back to counting only the votes seen from now on
+            logger.warning("Could not fetch poll %s: %s", message_id, error)
+            message = None
+
+        now = discord.utils.utcnow().timestamp()
+        if message is None:
+            tally.expires_at = now + DEFAULT_POLL_SECONDS
+        elif message.poll:
+            tally.seed(message.poll)
+        else:
+            # Not a poll after all, nothing to report
+            tally.expires_at = now
+            tally.dirty = False
+        tally.deltas = None
+        tally.seeded = True
+        self.changed = True
+
+    def record(self, payload: discord.RawPollVoteActionEvent, delta: int) -> None:
+        """Apply a vote event to the tally of its poll.
+
+        Args:
+            payload (discord.RawPollVoteActionEvent): The vote event.
+            delta (int): ``1`` for an added vote, ``-1`` for a removed one.
+        """
+        tally = self.tallies.get(payload.message_id)
+        if tally is None:
+            tally = PollTally(payload.channel_id, payload.guild_id)
+            self.tallies[payload.message_id] = tally
+            task = asyncio.create_task(self.seed(payload.message_id, tally))
+            self.seeding.add(task)
+            task.add_done_callback(self.seeding.discard)
+
+        # The vote that reveals a poll is already in the fetched counts
+        tally.vote(payload.answer_id, delta)
+        self.changed = True
+
+    @commands.Cog.listener()
+    async def on_raw_poll_vote_add(self, payload: discord.RawPollVoteActionEvent):
+        """Event listener for when a vote is added to a poll.
+
+        Args:
+            payload (discord.RawPollVoteActionEvent): The vote event.
+        """
+        logger.debug(
+            "User %s voted for answer %s on poll %s",
+            payload.user_id,
+            payload.answer_id,
+            payload.message_id,
+        )
+        self.record(payload, 1)
+
+    @commands.Cog.listener()
+    async def on_raw_poll_vote_remove(self, payload: discord.RawPollVoteActionEvent):
+        """Event listener for when a vote is removed from a poll.
+
+        Args:
+            payload (discord.RawPollVoteActionEvent): The vote event.
+        """
+        logger.debug(
+            "User %s removed their vote for answer %s on poll %s",
+            payload.user_id,
+            payload.answer_id,
+            payload.message_id,
+        )
+        self.record(payload, -1)
+
+    @tasks.loop(seconds=15)
+    async def update_summaries(self):
+        """Emit the summary of every poll that got new votes."""
+        for message_id, tally in list(self.tallies.items()):
+            if not tally.dirty or not tally.seeded:
+                continue
+
+            tally.dirty = False
+            destination = self.bot.rules.route(
+                "poll.update",
+                config.POLLS_UPDATES_CHANNEL_ID,
+                channel_id=tally.channel_id,
+            )
+            if destination is None:
+                continue
+
+            self.bot.pipeline.emit(
+                Event(
+                    "poll.update",
+                    "Poll %s: %d vote(s)",
+                    message_id,
+                    sum(tally.counts.values()),
+                    guild_id=tally.guild_id,
+                    channel_id=destination,
+                    embed=tally.render(self.jump_url(message_id, tally)),
+                    key=f"poll:{message_id}",
+                    level=logging.DEBUG,
+                )
+            )
+
+    @update_summaries.before_loop
+    async def before_update_summaries(self):
+        """Wait until the bot is ready before updating summaries."""
+        await self.bot.wait_until_ready()
+
+    def trim(self) -> None:
+        """Drop the tallies of polls that ended and were reported."""
+        now = discord.utils.utcnow().timestamp()
+        for message_id, tally in list(self.tallies.items()):
+            # Keep expired polls until their final counts have been reported
+            if tally.expires_at and tally.expires_at < now and not tally.dirty:
+                del self.tallies[message_id]
+                self.changed = True
+
+    @tasks.loop(seconds=60)
+    async def persist_tallies(self):
+        """Drop expired polls and persist the tallies if anything changed."""
+        self.trim()
+        if self.changed:
+            await self.save()
+
+    async def save(self):
+        """Persist the tallies to the data directory."""
+        data = {
+            str(message_id): tally.to_dict()
+            for message_id, tally in self.tallies.items()
+        }
+        self.changed = False
+        await asyncio.to_thread(save_json, POLLS_FILE, data)
+        logger.debug("Persisted %d poll tallies.", len(data))
+
+
+async def setup(bot):
+    """Set up the PollsEvents cog.
+
+    Args:
+        bot (commands.Bot): The instance of the Discord bot.
+    """
+    await bot.add_cog(PollsEvents(bot))
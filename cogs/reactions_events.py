@@ -3,13 +3,112 @@ Reactions Events Cog for the Discord bot.
 
 This cog handles events related to reactions on messages, logging the
 details of added, removed, and cleared reactions in a specified channel.
+
+Added and removed reactions are aggregated per message over a short window
+and reported as one summary embed per message, so busy giveaway or poll
+messages cost one notification per interval instead of one per reaction.
+Every reaction is counted; rules apply to the summaries, as event kind
+``reaction.summary``, so a sampled or dropped summary never leaves a partial
+count. Summaries are emitted as events; logging and delivery happen in the
+sinks of the event pipeline (see ``utils.pipeline``).
 """
 
 import typing
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import config
 from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.pipeline import Event
+
+REACTIONS_SUMMARY = EmbedTemplate(
+    "Reactions Updated",
+    discord.Color.blurple(),
+    ("Message", "Channel", "Reactions", "Details"),
+    timestamp=True,
+)
+REACTIONS_CLEARED = EmbedTemplate(
+    "Reactions Cleared",
+    discord.Color.orange(),
+    ("Message", "Channel", "Cleared Reactions"),
+    timestamp=True,
+)
+
+
+class ReactionWindow:
+    """Reactions collected on a single message during one aggregation window."""
+
+    __slots__ = (
+        "jump_url",
+        "guild_id",
+        "channel_id",
+        "channel",
+        "counts",
+        "users",
+        "details",
+        "hidden",
+    )
+
+    def __init__(self, message: discord.Message) -> None:
+        """Initialize an empty window for a message.
+
+        Args:
+            message (discord.Message): The message the reactions belong to.
+        """
+        self.jump_url = message.jump_url
+        self.guild_id = message.guild.id if message.guild else None
+        self.channel_id = message.channel.id
+        self.channel = message.channel.mention
+        # emoji -> [added, removed]
+        self.counts: typing.Dict[str, typing.List[int]] = {}
+        self.users: typing.Set[int] = set()
+        self.details: typing.List[str] = []
+        self.hidden = 0
+
+    def record(self, emoji: str, user: discord.User, added: bool) -> None:
+        """Record a single reaction being added or removed.
+
+        Args:
+            emoji (str): The emoji of the reaction.
+            user (discord.User): The user who reacted.
+            added (bool): Whether the reaction was added or removed.
+        """
+        counts = self.counts.get(emoji)
+        if counts is None:
+            counts = self.counts[emoji] = [0, 0]
+        counts[0 if added else 1] += 1
+        self.users.add(user.id)
+
+        if len(self.details) < config.REACTION_DETAIL_LINES:
+            action = "added" if added else "removed"
+            self.details.append(f"{user.mention} {action} {emoji}")
+        else:
+            self.hidden += 1
+
+    def render(self) -> discord.Embed:
+        """Build the summary embed for this window.
+
+        Returns:
+            discord.Embed: The summary embed.
+        """
+        added = sum(counts[0] for counts in self.counts.values())
+        removed = sum(counts[1] for counts in self.counts.values())
+
+        details = "\n".join(self.details)
+        if self.hidden:
+            details += f"\n…and {self.hidden} more"
+
+        return REACTIONS_SUMMARY.render(
+            f"{added} reaction(s) added and {removed} removed "
+            f"by {len(self.users)} user(s).",
+            f"[Jump to message]({self.jump_url})",
+            self.channel,
+            "\n".join(
+                f"{emoji} +{counts[0]} / -{counts[1]}"
+                for emoji, counts in self.counts.items()
+            ),
+            details,
+        )
 
 
 class ReactionsEvents(commands.Cog):
@@ -22,6 +121,74 @@ class ReactionsEvents(commands.Cog):
             bot (commands.Bot): The instance of the Discord bot.
         """
         self.bot = bot
+        # message ID -> reactions collected since the last flush
+        self.windows: typing.Dict[int, ReactionWindow] = {}
+        self.flush_windows.change_interval(seconds=config.REACTION_WINDOW_SECONDS)
+
+    async def cog_load(self) -> None:
+        """Start the aggregation window when the cog is loaded."""
+        self.flush_windows.start()
+
+    async def cog_unload(self) -> None:
+        """Stop the aggregation window and report what is still pending."""
+        self.flush_windows.cancel()
+        await self.send_summaries()
+
+    def record(self, reaction: discord.Reaction, user: discord.User, added: bool):
+        """Add a reaction event to the window of its message.
+
+        Args:
+            reaction (discord.Reaction): The reaction that was added or removed.
+            user (discord.User): The user who reacted.
+            added (bool): Whether the reaction was added or removed.
+        """
+        message = reaction.message
+        window = self.windows.get(message.id)
+        if window is None:
+            window = self.windows[message.id] = ReactionWindow(message)
+        window.record(str(reaction.emoji), user, added)
+
+    @tasks.loop(seconds=60)
+    async def flush_windows(self):
+        """Send one summary per message at the end of each window."""
+        await self.send_summaries()
+
+    async def send_summaries(self):
+        """Send a summary embed for every message with pending reactions."""
+        if not self.windows:
+            return
+
+        windows, self.windows = self.windows, {}
+
+        for message_id, window in windows.items():
+            destination = self.bot.rules.route(
+                "reaction.summary",
+                config.REACTIONS_UPDATES_CHANNEL_ID,
+                channel_id=window.channel_id,
+            )
+            if destination is None:
+                continue
+
+            self.bot.pipeline.emit(
+                Event(
+                    "reaction.summary",
+                    "Reactions on message %s in channel %s: %s",
+                    message_id,
+                    window.channel,
+                    ", ".join(
+                        f"{emoji} +{counts[0]}/-{counts[1]}"
+                        for emoji, counts in window.counts.items()
+                    ),
+                    guild_id=window.guild_id,
+                    channel_id=destination,
+                    embed=window.render(),
+                )
+            )
+
+    @flush_windows.before_loop
+    async def before_flush_windows(self):
+        """Wait until the bot is ready before flushing windows."""
+        await self.bot.wait_until_ready()
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
@@ -35,30 +202,13 @@ class ReactionsEvents(commands.Cog):
         if user.bot:
             return
 
-        channel = reaction.message.channel
-
-        logger.info(
-            "User %s added a reaction %s in channel %s", user, reaction.emoji, channel
-        )
-
-        embed = discord.Embed(
-            title="Reaction Added",
-            description=f"{user.mention} added a reaction.",
-            color=discord.Color.green(),
-            timestamp=discord.utils.utcnow(),
-        )
-        embed.add_field(
-            name="Message",
-            value=f"[Jump to message]({reaction.message.jump_url})",
-            inline=False,
+        logger.debug(
+            "User %s added a reaction %s in channel %s",
+            user,
+            reaction.emoji,
+            reaction.message.channel,
         )
-        embed.add_field(name="Channel", value=channel.mention, inline=False)
-        embed.add_field(name="Emoji", value=str(reaction.emoji), inline=False)
-        embed.add_field(name="User", value=user.mention, inline=False)
-
-        update_channel = self.bot.get_channel(config.REACTIONS_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
+        self.record(reaction, user, added=True)
 
     @commands.Cog.listener()
     async def on_reaction_remove(self, reaction: discord.Reaction, user: discord.User):
@@ -72,30 +222,13 @@ class ReactionsEvents(commands.Cog):
         if user.bot:
             return
 
-        channel = reaction.message.channel
-
-        logger.info(
-            "User %s removed a reaction %s in channel %s", user, reaction.emoji, channel
-        )
-
-        embed = discord.Embed(
-            title="Reaction Removed",
-            description=f"{user.mention} removed a reaction.",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow(),
+        logger.debug(
+            "User %s removed a reaction %s in channel %s",
+            user,
+            reaction.emoji,
+            reaction.message.channel,
         )
-        embed.add_field(
-            name="Message",
-            value=f"[Jump to message]({reaction.message.jump_url})",
-            inline=False,
-        )
-        embed.add_field(name="Channel", value=channel.mention, inline=False)
-        embed.add_field(name="Emoji", value=str(reaction.emoji), inline=False)
-        embed.add_field(name="User", value=user.mention, inline=False)
-
-        update_channel = self.bot.get_channel(config.REACTIONS_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
+        self.record(reaction, user, added=False)
 
     @commands.Cog.listener()
     async def on_reaction_clear(
@@ -107,29 +240,33 @@ class ReactionsEvents(commands.Cog):
             message (discord.Message): The message from which reactions were cleared.
             reactions (typing.List[discord.Reaction]): The list of cleared reactions.
         """
-        channel = message.channel
+        destination = self.bot.rules.route(
+            "reaction.clear",
+            config.REACTIONS_UPDATES_CHANNEL_ID,
+            channel_id=message.channel.id,
+        )
+        if destination is None:
+            return
 
-        logger.info("Reactions cleared from message in channel  %s", channel)
+        channel = message.channel
 
-        embed = discord.Embed(
-            title="Reactions Cleared",
-            description="Reactions were cleared from a message.",
-            color=discord.Color.orange(),
-            timestamp=discord.utils.utcnow(),
-        )
-        embed.add_field(
-            name="Message", value=f"[Jump to message]({message.jump_url})", inline=False
-        )
-        embed.add_field(name="Channel", value=channel.mention, inline=False)
-        embed.add_field(
-            name="Cleared Reactions",
-            value=", ".join([str(reaction.emoji) for reaction in reactions]),
-            inline=False,
+        embed = REACTIONS_CLEARED.render(
+            "Reactions were cleared from a message.",
+            f"[Jump to message]({message.jump_url})",
+            channel.mention,
+            ", ".join([str(reaction.emoji) for reaction in reactions]),
         )
 
-        update_channel = self.bot.get_channel(config.REACTIONS_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
+        self.bot.pipeline.emit(
+            Event(
+                "reaction.clear",
+                "Reactions cleared from message in channel  %s",
+                channel,
+                guild_id=message.guild.id if message.guild else None,
+                channel_id=destination,
+                embed=embed,
+            )
+        )
 
 
 async def setup(bot):
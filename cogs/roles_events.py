@@ -4,13 +4,93 @@ Roles Events Cog for the Discord bot.
 This cog handles events related to role creation, deletion, and updates 
 within a guild. It logs details of each role event and sends notifications 
 to a specified channel, providing comprehensive information about the changes.
+
+Reordering one role makes Discord update every role whose position shifted.
+Updates that only move roles are collected per guild for
+``ROLE_REORDER_SECONDS`` and reported as one "Roles Reordered" message.
+
+Listeners only emit events; logging and delivery happen in the sinks of the
+event pipeline (see ``utils.pipeline``).
 """
 
+import asyncio
+import typing
+
 import discord
 from discord.ext import commands
 
 import config
-from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.names import ROLE
+from utils.permissions import (
+    DANGEROUS,
+    RoleMemberIndex,
+    describe_permissions,
+    flag_bits,
+    flag_name,
+    permission_diff,
+)
+from utils.pipeline import Event
+
+ROLE_CREATED = EmbedTemplate(
+    "Role Created",
+    discord.Color.green(),
+    ("Role Name", "Role ID", "Permissions", "Position"),
+    timestamp=True,
+)
+ROLE_DELETED = EmbedTemplate(
+    "Role Deleted", discord.Color.red(), ("Role Name", "Role ID"), timestamp=True
+)
+ROLE_UPDATED = EmbedTemplate(
+    "Role Updated",
+    discord.Color.orange(),
+    ("Role Name", "Role ID", "Changes"),
+    timestamp=True,
+)
+ROLES_REORDERED = EmbedTemplate(
+    "Roles Reordered",
+    discord.Color.orange(),
+    ("Before", "After"),
+    inline=True,
+    timestamp=True,
+)
+
+
+class RoleReorder:
+    """Position-only role updates of a guild within one debounce window."""
+
+    __slots__ = ("positions", "task")
+
+    def __init__(self) -> None:
+        """Initialize an empty reorder."""
+        # role ID -> [position before the window, latest position]
+        self.positions: typing.Dict[int, typing.List[int]] = {}
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def record(self, before: discord.Role, after: discord.Role) -> None:
+        """Record the move of a role, keeping its first known position.
+
+        Args:
+            before (discord.Role): The role before the update.
+            after (discord.Role): The role after the update.
+        """
+        positions = self.positions.get(after.id)
+        if positions is None:
+            self.positions[after.id] = [before.position, after.position]
+        else:
+            positions[1] = after.position
+
+    def moved(self) -> typing.Dict[int, typing.List[int]]:
+        """Return the roles whose position differs from before the window.
+
+        Returns:
+            dict[int, list[int]]: The old and new position of each moved role.
+        """
+        return {
+            role_id: positions
+            for role_id, positions in self.positions.items()
+            if positions[0] != positions[1]
+        }
 
 
 class RolesEvents(commands.Cog):
@@ -23,6 +103,166 @@ class RolesEvents(commands.Cog):
             bot (discord.ext.commands.Bot): The instance of the Discord bot.
         """
         self.bot = bot
+        self.members = RoleMemberIndex()
+        # guild ID -> role moves waiting to be reported
+        self.reorders: typing.Dict[int, RoleReorder] = {}
+
+    async def cog_load(self) -> None:
+        """Record the names and member counts of the roles of every guild."""
+        for guild in self.bot.guilds:
+            self.remember_roles(guild)
+            self.members.seed(guild)
+
+    async def cog_unload(self) -> None:
+        """Report the role moves that are still being collected."""
+        for guild_id, reorder in list(self.reorders.items()):
+            reorder.task.cancel()
+            self.report_reorder(guild_id, reorder)
+        self.reorders.clear()
+
+    def remember_roles(self, guild: discord.Guild) -> None:
+        """Record the names of the roles of a guild.
+
+        Args:
+            guild (discord.Guild): The guild.
+        """
+        for role in guild.roles:
+            self.bot.names.remember(ROLE, role.id, role.name)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Event listener for when the bot joins a guild.
+
+        Args:
+            guild (discord.Guild): The guild that was joined.
+        """
+        self.remember_roles(guild)
+        self.members.seed(guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        """Count the roles of a member that joined.
+
+        Args:
+            member (discord.Member): The member that joined.
+        """
+        self.members.add(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        """Stop counting the roles of a member that left.
+
+        Args:
+            member (discord.Member): The member that left.
+        """
+        self.members.remove(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Keep the role member counts current when roles are added or removed.
+
+        Args:
+            before (discord.Member): The member before the update.
+            after (discord.Member): The member after the update.
+        """
+        self.members.update(before, after)
+
+    def impact(self, before: discord.Role, after: discord.Role) -> str:
+        """Describe who gains dangerous permissions from a role update.
+
+        Args:
+            before (discord.Role): The role before the update.
+            after (discord.Role): The role after the update.
+
+        Returns:
+            str: The impact, or an empty string if nothing dangerous was granted.
+        """
+        granted, _ = permission_diff(before.permissions.value, after.permissions.value)
+        dangerous = granted & DANGEROUS
+        if not dangerous:
+            return ""
+        # Members who had a permission through another role gain nothing
+        gains = self.members.gaining(after, dangerous)
+        holders = self.members.count(after)
+        parts = []
+        for bit in flag_bits(dangerous):
+            count = gains[bit]
+            parts.append(
+                f"{count} member{'s' if count != 1 else ''} gain {flag_name(bit)}"
+            )
+        return ", ".join(parts) + f" ({holders} hold the role)"
+
+    def queue_reorder(self, before: discord.Role, after: discord.Role) -> None:
+        """Add a position-only update to the pending reorder of its guild.
+
+        Args:
+            before (discord.Role): The role before the update.
+            after (discord.Role): The role after the update.
+        """
+        guild_id = after.guild.id
+        reorder = self.reorders.get(guild_id)
+        if reorder is None:
+            reorder = self.reorders[guild_id] = RoleReorder()
+            reorder.task = asyncio.create_task(self.debounce_reorder(guild_id, reorder))
+        reorder.record(before, after)
+
+    async def debounce_reorder(self, guild_id: int, reorder: RoleReorder) -> None:
+        """Wait for the update storm to settle, then report it once.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            reorder (RoleReorder): The role moves to report.
+        """
+        await asyncio.sleep(config.ROLE_REORDER_SECONDS)
+        # Moves from now on start a new reorder
+        del self.reorders[guild_id]
+        self.report_reorder(guild_id, reorder)
+
+    def report_reorder(self, guild_id: int, reorder: RoleReorder) -> None:
+        """Emit one report for the roles moved during a debounce window.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            reorder (RoleReorder): The role moves to report.
+        """
+        moved = reorder.moved()
+        if not moved:
+            return
+
+        destination = self.bot.rules.route(
+            "role.reorder", config.ROLES_UPDATES_CHANNEL_ID
+        )
+        if destination is None:
+            return
+
+        # Highest role first, as in the server settings
+        orderings = []
+        for index in (0, 1):
+            ordered = sorted(moved, key=lambda role_id: -moved[role_id][index])
+            orderings.append(
+                "\n".join(
+                    f"{moved[role_id][index]}. <@&{role_id}>" for role_id in ordered
+                )
+            )
+
+        embed = ROLES_REORDERED.render(
+            f"{len(moved)} role{'s' if len(moved) != 1 else ''} changed position.",
+            *orderings,
+        )
+
+        self.bot.pipeline.emit(
+            Event(
+                "role.reorder",
+                "Roles reordered: %s",
+                ", ".join(
+                    f"{self.bot.names.name(ROLE, role_id)} {old} ➔ {new}"
+                    for role_id, (old, new) in moved.items()
+                ),
+                guild_id=guild_id,
+                channel_id=destination,
+                embed=embed,
+            )
+        )
 
     @commands.Cog.listener()
     async def on_guild_role_create(self, role: discord.Role):
@@ -31,21 +271,33 @@ class RolesEvents(commands.Cog):
         Args:
             role (discord.Role): The role that was created.
         """
-        embed = discord.Embed(
-            title="Role Created",
-            description="A new role has been created.",
-            color=discord.Color.green(),
-            timestamp=discord.utils.utcnow(),
+        self.bot.names.remember(ROLE, role.id, role.name)
+
+        destination = self.bot.rules.route(
+            "role.create", config.ROLES_UPDATES_CHANNEL_ID
         )
-        embed.add_field(name="Role Name", value=role.name, inline=False)
-        embed.add_field(name="Role ID", value=role.id, inline=False)
-        embed.add_field(name="Permissions", value=str(role.permissions), inline=False)
-        embed.add_field(name="Position", value=role.position, inline=False)
+        if destination is None:
+            return
 
-        update_channel = self.bot.get_channel(config.ROLES_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
-            logger.info("Role created: %s (ID: %s)", role.name, role.id)
+        embed = ROLE_CREATED.render(
+            "A new role has been created.",
+            role.name,
+            role.id,
+            role.permissions,
+            role.position,
+        )
+
+        self.bot.pipeline.emit(
+            Event(
+                "role.create",
+                "Role created: %s (ID: %s)",
+                role.name,
+                role.id,
+                guild_id=role.guild.id,
+                channel_id=destination,
+                embed=embed,
+            )
+        )
 
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
@@ -54,64 +306,118 @@ class RolesEvents(commands.Cog):
         Args:
             role (discord.Role): The role that was deleted.
         """
-        embed = discord.Embed(
-            title="Role Deleted",
-            description="A role has been deleted.",
-            color=discord.Color.red(),
-            timestamp=discord.utils.utcnow(),
+        self.bot.names.forget(ROLE, role.id)
+        self.members.drop(role)
+
+        destination = self.bot.rules.route(
+            "role.delete", config.ROLES_UPDATES_CHANNEL_ID
         )
-        embed.add_field(name="Role Name", value=role.name, inline=False)
-        embed.add_field(name="Role ID", value=role.id, inline=False)
+        if destination is None:
+            return
 
-        update_channel = self.bot.get_channel(config.ROLES_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
-            logger.info("Role deleted: %s (ID: %s)", role.name, role.id)
+        embed = ROLE_DELETED.render("A role has been deleted.", role.name, role.id)
 
-    @commands.Cog.listener()
-    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
-        """Event listener for when a role is updated.
+        self.bot.pipeline.emit(
+            Event(
+                "role.delete",
+                "Role deleted: %s (ID: %s)",
+                role.name,
+                role.id,
+                guild_id=role.guild.id,
+                channel_id=destination,
+                embed=embed,
+            )
+        )
+
+    def attribute_changes(self, before: discord.Role, after: discord.Role) -> list:
+        """Describe what changed in a role, apart from its position.
 
         Args:
             before (discord.Role): The role before the update.
             after (discord.Role): The role after the update.
+
+        Returns:
+            list[str]: One line per changed attribute.
         """
         changes = []
-
         if before.name != after.name:
             changes.append(f"Name changed from '{before.name}' to '{after.name}'")
         if before.permissions != after.permissions:
             changes.append(
-                f"Permissions changed from '{before.permissions}' to '{after.permissions}'"
+                "Permissions changed:\n"
+                + describe_permissions(
+                    before.permissions.value, after.permissions.value
+                )
             )
+            impact = self.impact(before, after)
+            if impact:
+                changes.append(f"⚠️ Impact: {impact}")
+        if before.color != after.color:
+            changes.append(f"Color changed from '{before.color}' to '{after.color}'")
+        if before.hoist != after.hoist:
+            changes.append(
+                "Now shown separately in the member list"
+                if after.hoist
+                else "No longer shown separately in the member list"
+            )
+        if before.mentionable != after.mentionable:
+            changes.append(
+                "Now mentionable by everyone"
+                if after.mentionable
+                else "No longer mentionable by everyone"
+            )
+        if before.display_icon != after.display_icon:
+            changes.append("Icon changed")
+        return changes
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Event listener for when a role is updated.
+
+        Args:
+            before (discord.Role): The role before the update.
+            after (discord.Role): The role after the update.
+        """
+        self.bot.names.remember(ROLE, after.id, after.name)
+
+        # Moves come in bursts, one update per shifted role; report them together
+        changes = self.attribute_changes(before, after)
+        if before.position != after.position and not changes:
+            self.queue_reorder(before, after)
+            return
+
+        destination = self.bot.rules.route(
+            "role.update", config.ROLES_UPDATES_CHANNEL_ID
+        )
+        if destination is None:
+            return
+
         if before.position != after.position:
             changes.append(
                 f"Position changed from '{before.position}' to '{after.position}'"
             )
+        if not changes:
+            changes.append("No significant changes detected.")
 
-        embed = discord.Embed(
-            title="Role Updated",
-            description=f"Role '{after.name}' was updated.",
-            color=discord.Color.orange(),
-            timestamp=discord.utils.utcnow(),
-        )
-        embed.add_field(name="Role Name", value=after.name, inline=False)
-        embed.add_field(name="Role ID", value=after.id, inline=False)
-        embed.add_field(
-            name="Changes",
-            value="\n".join(changes) if changes else "No significant changes detected.",
-            inline=False,
+        embed = ROLE_UPDATED.render(
+            f"Role '{after.name}' was updated.",
+            after.name,
+            after.id,
+            "\n".join(changes),
         )
 
-        update_channel = self.bot.get_channel(config.ROLES_UPDATES_CHANNEL_ID)
-        if update_channel:
-            await update_channel.send(embed=embed)
-            logger.info(
+        self.bot.pipeline.emit(
+            Event(
+                "role.update",
                 "Role updated: %s (ID: %s). Changes: %s",
                 after.name,
                 after.id,
-                ", ".join(changes) if changes else "No significant changes detected.",
+                ", ".join(changes),
+                guild_id=after.guild.id,
+                channel_id=destination,
+                embed=embed,
             )
+        )
 
 
 async def setup(bot):
@@ -0,0 +1,362 @@
+"""
+Snapshot Events Cog for the Discord bot.
+
+This cog keeps a snapshot of the structure of every guild (channels, their
+permission overwrites and roles) and reports anything that changed while the
+bot could not see it, such as edits made while it was offline, as one
+grouped drift report.
+
+The stored snapshot is kept current from the channel and role listeners. It
+is compared with the live guild when the cog loads, after every reconnect,
+and on demand with the `!snapshot` command.
+"""
+
+import typing
+
+import discord
+from discord.ext import commands
+
+import config
+from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.names import CHANNEL, ROLE, USER
+from utils.permissions import describe_overwrite, describe_permissions
+from utils.pipeline import Event
+from utils.rendering import fit_message, message_kwargs
+from utils.snapshot import (
+    CHANNELS,
+    ROLE_TARGET,
+    ROLES,
+    Drift,
+    Snapshot,
+    SnapshotStore,
+    channel_record,
+    diff_snapshots,
+    digest,
+    role_record,
+    root_hash,
+    take_snapshot,
+)
+from utils.storage import data_path
+
+SERVER_DRIFT = EmbedTemplate("Server Drift", discord.Color.gold(), timestamp=True)
+
+# Singular and plural labels of each kind in reports
+LABELS = {CHANNELS: ("Channel", "Channels"), ROLES: ("Role", "Roles")}
+
+
+class SnapshotEvents(commands.Cog):
+    """Cog for detecting structural drift of guilds."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        """Initialize the SnapshotEvents cog.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+        """
+        self.bot = bot
+        self.store = SnapshotStore(data_path("snapshots.sqlite3"))
+        # guild ID -> the snapshot currently stored
+        self.snapshots: typing.Dict[int, typing.Optional[Snapshot]] = {}
+
+    async def cog_load(self) -> None:
+        """Report what changed in every guild since the last run."""
+        for guild in self.bot.guilds:
+            self.snapshots[guild.id] = self.store.load(guild.id)
+        await self.check_all()
+
+    async def cog_unload(self) -> None:
+        """Close the snapshot store when the cog is unloaded."""
+        self.store.close()
+
+    def trim(self) -> None:
+        """Drop the snapshots of guilds the bot is no longer in.
+
+        They are loaded from the store again if the bot rejoins.
+        """
+        for guild_id in list(self.snapshots):
+            if self.bot.get_guild(guild_id) is None:
+                del self.snapshots[guild_id]
+
+    def object_name(self, kind: str, object_id: int, record: dict) -> str:
+        """Render a channel or role of a report.
+
+        Args:
+            kind (str): ``channels`` or ``roles``.
+            object_id (int): The ID of the object.
+            record (dict): The record of the object.
+
+        Returns:
+            str: The name of the object.
+        """
+        prefix = "#" if kind == CHANNELS else "@"
+        return f"{prefix}{record['name']} ({object_id})"
+
+    def describe_field(self, field: str, before, after) -> str:
+        """Render a changed field of a channel or role.
+
+        Args:
+            field (str): The name of the field.
+            before: The old value.
+            after: The new value.
+
+        Returns:
+            str: The change, in words.
+        """
+        names = self.bot.names
+        if field.startswith("overwrite:"):
+            target_id = int(field.split(":", 1)[1])
+            target_type = (after or before)[0]
+            target = names.name(ROLE if target_type == ROLE_TARGET else USER, target_id)
+            if after is None:
+                return f"overwrite for {target} removed"
+            change = describe_overwrite(before and before[1:], after[1:])
+            if before is None:
+                return f"overwrite for {target} added: {change}"
+            return f"overwrite for {target}: {change}"
+        if field == "permissions":
+            return "permissions: " + describe_permissions(before, after).replace(
+                "\n", "; "
+            )
+        if field == "category":
+            before = names.name(CHANNEL, before, "None")
+            after = names.name(CHANNEL, after, "None")
+        return f"{field}: {before!r} ➔ {after!r}"
+
+    def report(
+        self,
+        guild: discord.Guild,
+        drift: typing.Dict[str, Drift],
+        snapshot: Snapshot,
+    ) -> discord.Embed:
+        """Build the grouped drift report of a guild.
+
+        Args:
+            guild (discord.Guild): The guild.
+            drift (dict[str, Drift]): The differences for each kind of object.
+            snapshot (Snapshot): The current snapshot, used to name changed objects.
+
+        Returns:
+            discord.Embed: The report.
+        """
+        fields = []
+        counts = []
+        for kind, changes in drift.items():
+            singular, plural = LABELS[kind]
+            if changes.added:
+                fields.append(
+                    (
+                        f"{plural} Created",
+                        "\n".join(
+                            self.object_name(kind, object_id, record)
+                            for object_id, record in changes.added.items()
+                        ),
+                    )
+                )
+            if changes.removed:
+                fields.append(
+                    (
+                        f"{plural} Deleted",
+                        "\n".join(
+                            self.object_name(kind, object_id, record)
+                            for object_id, record in changes.removed.items()
+                        ),
+                    )
+                )
+            for change in changes.changed:
+                record = snapshot[kind][change.object_id][1]
+                fields.append(
+                    (
+                        f"{singular} Changed: "
+                        + self.object_name(kind, change.object_id, record),
+                        "\n".join(
+                            self.describe_field(field, before, after)
+                            for field, (before, after) in sorted(change.fields.items())
+                        ),
+                    )
+                )
+            total = len(changes.added) + len(changes.removed) + len(changes.changed)
+            if total:
+                label = singular if total == 1 else plural
+                counts.append(f"{total} {label.lower()}")
+
+        return SERVER_DRIFT.render(
+            f"The structure of **{guild.name}** differs from the last snapshot: "
+            + " and ".join(counts)
+            + " changed.",
+            extra=fields,
+        )
+
+    def check(self, guild: discord.Guild) -> typing.Optional[discord.Embed]:
+        """Compare a guild with its stored snapshot and store the new one.
+
+        Args:
+            guild (discord.Guild): The guild to check.
+
+        Returns:
+            discord.Embed | None: The drift report, if anything changed.
+        """
+        old = self.snapshots.get(guild.id)
+        new = take_snapshot(guild)
+        self.snapshots[guild.id] = new
+
+        if old is None:
+            self.store.save(guild.id, None, new)
+            logger.info("Took a first snapshot of %s (%s).", guild, root_hash(new))
+            return None
+        if root_hash(old) == root_hash(new):
+            return None
+
+        drift = diff_snapshots(old, new)
+        written = self.store.save(guild.id, old, new)
+        logger.info("Snapshot of %s updated, %d object(s) rewritten.", guild, written)
+        return self.report(guild, drift, new) if any(drift.values()) else None
+
+    async def check_all(self):
+        """Check every guild and report the ones that drifted."""
+        for guild in self.bot.guilds:
+            destination = self.bot.rules.route(
+                "guild.drift", config.GUILDS_UPDATES_CHANNEL_ID
+            )
+            embed = self.check(guild)
+            if embed is None or destination is None:
+                continue
+
+            self.bot.pipeline.emit(
+                Event(
+                    "guild.drift",
+                    "Structural drift detected in %s",
+                    guild,
+                    guild_id=guild.id,
+                    channel_id=destination,
+                    embed=embed,
+                )
+            )
+
+    def put(self, guild: discord.Guild, kind: str, object_id: int, record: dict):
+        """Update a single object of the stored snapshot.
+
+        Args:
+            guild (discord.Guild): The guild of the object.
+            kind (str): ``channels`` or ``roles``.
+            object_id (int): The ID of the object.
+            record (dict): The current record of the object.
+        """
+        snapshot = self.snapshots.get(guild.id)
+        if snapshot is None:
+            return
+        entry = (digest(record), record)
+        if snapshot[kind].get(object_id, (None,))[0] != entry[0]:
+            snapshot[kind][object_id] = entry
+            self.store.put(guild.id, kind, object_id, record)
+
+    def drop(self, guild: discord.Guild, kind: str, object_id: int):
+        """Remove a single object from the stored snapshot.
+
+        Args:
+            guild (discord.Guild): The guild of the object.
+            kind (str): ``channels`` or ``roles``.
+            object_id (int): The ID of the object.
+        """
+        snapshot = self.snapshots.get(guild.id)
+        if snapshot is not None and snapshot[kind].pop(object_id, None):
+            self.store.delete(guild.id, kind, object_id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Event listener for when the bot reconnects and its cache is rebuilt."""
+        await self.check_all()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Event listener for when the bot joins a guild.
+
+        Args:
+            guild (discord.Guild): The guild that was joined.
+        """
+        self.snapshots[guild.id] = self.store.load(guild.id)
+        self.check(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        """Keep the snapshot current when a channel is created.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel that was created.
+        """
+        self.put(channel.guild, CHANNELS, channel.id, channel_record(channel))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        """Keep the snapshot current when a channel is updated.
+
+        Args:
+            before (discord.abc.GuildChannel): The channel before the update.
+            after (discord.abc.GuildChannel): The channel after the update.
+        """
+        self.put(after.guild, CHANNELS, after.id, channel_record(after))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        """Keep the snapshot current when a channel is deleted.
+
+        Args:
+            channel (discord.abc.GuildChannel): The channel that was deleted.
+        """
+        self.drop(channel.guild, CHANNELS, channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        """Keep the snapshot current when a role is created.
+
+        Args:
+            role (discord.Role): The role that was created.
+        """
+        self.put(role.guild, ROLES, role.id, role_record(role))
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """Keep the snapshot current when a role is updated.
+
+        Args:
+            before (discord.Role): The role before the update.
+            after (discord.Role): The role after the update.
+        """
+        self.put(after.guild, ROLES, after.id, role_record(after))
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        """Keep the snapshot current when a role is deleted.
+
+        Args:
+            role (discord.Role): The role that was deleted.
+        """
+        self.drop(role.guild, ROLES, role.id)
+
+    @commands.command(name="snapshot")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def snapshot(self, ctx: commands.Context):
+        """Report the drift since the last snapshot and take a new one.
+
+        Usage: !snapshot
+
+        Args:
+            ctx (commands.Context): The context of the command.
+        """
+        embed = self.check(ctx.guild)
+        if embed is None:
+            await ctx.send("No drift since the last snapshot.")
+            return
+        await ctx.send(**message_kwargs(*fit_message(embed.to_dict())))
+
+
+async def setup(bot):
+    """Set up the SnapshotEvents cog.
+
+    Args:
+        bot (commands.Bot): The instance of the Discord bot.
+    """
+    await bot.add_cog(SnapshotEvents(bot))
@@ -3,10 +3,12 @@ Configuration module for loading environment variables and setting up bot settin
 
 This module loads environment variables from a .env file using the dotenv library.
 It retrieves bot settings such as the bot token, guild ID, and channel IDs for various updates.
-Additionally, it ensures that the logs directory exists for logging purposes.
+Additionally, it ensures that the logs directory exists for logging purposes and that
+the data directory exists for state persisted between restarts.
 """
 
 import os
+import typing
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -14,6 +16,8 @@ load_dotenv()
 
 # Bot Settings
 BOT_TOKEN: str = os.getenv("BOT_TOKEN")
+# Overrides the Discord REST API base URL, e.g. to point at benchmarks/fake_discord.py
+DISCORD_API_BASE: str = os.getenv("DISCORD_API_BASE", "")
 GUILD_ID: int = int(os.getenv("GUILD_ID"))
 DEFAULT_INVITE_CHANNEL_ID: int = int(os.getenv("DEFAULT_INVITE_CHANNEL_ID"))
 
@@ -24,7 +28,67 @@ MESSAGES_UPDATES_CHANNEL_ID: int = int(os.getenv("MESSAGES_UPDATES_CHANNEL_ID"))
 MEMBERS_UPDATES_CHANNEL_ID: int = int(os.getenv("MEMBERS_UPDATES_CHANNEL_ID"))
 REACTIONS_UPDATES_CHANNEL_ID: int = int(os.getenv("REACTIONS_UPDATES_CHANNEL_ID"))
 ROLES_UPDATES_CHANNEL_ID: int = int(os.getenv("ROLES_UPDATES_CHANNEL_ID"))
+POLLS_UPDATES_CHANNEL_ID: int = int(
+    os.getenv("POLLS_UPDATES_CHANNEL_ID", os.getenv("MESSAGES_UPDATES_CHANNEL_ID"))
+)
+
+# Reaction aggregation
+REACTION_WINDOW_SECONDS: int = int(os.getenv("REACTION_WINDOW_SECONDS", "60"))
+REACTION_DETAIL_LINES: int = int(os.getenv("REACTION_DETAIL_LINES", "10"))
+
+# Outbound delivery
+OUTBOX_SEND_INTERVAL: float = float(os.getenv("OUTBOX_SEND_INTERVAL", "0.2"))
+OUTBOX_RETRY_BASE_SECONDS: float = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "1"))
+OUTBOX_RETRY_MAX_SECONDS: float = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "300"))
+
+# Graceful shutdown: the longest time spent delivering queued notifications
+SHUTDOWN_TIMEOUT_SECONDS: float = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "20"))
+
+# Invite tracking
+INVITE_DEBOUNCE_SECONDS: float = float(os.getenv("INVITE_DEBOUNCE_SECONDS", "2"))
+
+# Role reorder debouncing
+ROLE_REORDER_SECONDS: float = float(os.getenv("ROLE_REORDER_SECONDS", "3"))
+
+# Poll tracking
+POLL_SUMMARY_SECONDS: int = int(os.getenv("POLL_SUMMARY_SECONDS", "15"))
+POLL_PERSIST_SECONDS: int = int(os.getenv("POLL_PERSIST_SECONDS", "60"))
+
+# Event pipeline
+PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+
+# Event filtering and sampling rules
+RULES_FILE: str = os.getenv("RULES_FILE", "rules.json")
+
+# Name cache
+NAMES_PERSIST_SECONDS: int = int(os.getenv("NAMES_PERSIST_SECONDS", "60"))
+
+# Join cohort scoring
+COHORT_CAPACITY: int = int(os.getenv("COHORT_CAPACITY", "50000"))
+COHORT_WINDOW_HOURS: int = int(os.getenv("COHORT_WINDOW_HOURS", "24"))
+COHORT_NEW_ACCOUNT_DAYS: int = int(os.getenv("COHORT_NEW_ACCOUNT_DAYS", "7"))
+
+# Ban sync: comma-separated IDs of the guilds that share their bans, empty to disable
+BAN_SYNC_GUILD_IDS: typing.List[int] = [
+    int(guild_id)
+    for guild_id in os.getenv("BAN_SYNC_GUILD_IDS", "").split(",")
+    if guild_id.strip()
+]
+BAN_SYNC_REQUESTS_PER_SECOND: float = float(
+    os.getenv("BAN_SYNC_REQUESTS_PER_SECOND", "1")
+)
+
+# Memory watchdog
+MEMORY_CHECK_MINUTES: int = int(os.getenv("MEMORY_CHECK_MINUTES", "30"))
+MEMORY_GROWTH_WARN_MB: int = int(os.getenv("MEMORY_GROWTH_WARN_MB", "50"))
+# Stack frames kept per allocation by tracemalloc, 0 turns tracing off
+MEMORY_TRACE_FRAMES: int = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+MEMORY_TRIM: bool = os.getenv("MEMORY_TRIM", "0") == "1"
 
 # Ensure logs directory exists
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
+
+# Ensure data directory exists
+DATA_DIR = "data"
+os.makedirs(DATA_DIR, exist_ok=True)
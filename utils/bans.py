@@ -0,0 +1,595 @@
+"""
+Ban list synchronisation for the Discord bot.
+
+The guilds listed in ``BAN_SYNC_GUILD_IDS`` share their bans: a user banned in
+one of them is banned in all of them, and an unban is propagated the same way.
+
+The bans of each guild are kept as a ``BanSet``, a sorted array of user IDs
+(8 bytes per ban), fetched once with a paginated ``guild.bans()`` and then
+kept current from the ban and unban events. Reconciling the guilds is a few
+set operations on the sorted arrays, so comparing guilds with tens of
+thousands of bans takes milliseconds and no API calls.
+
+The last known ban lists and the changes not applied yet are kept in a
+``BanStore`` (``data/bans.sqlite3``). Comparing a fetched list with the last
+known one tells a ban lifted while the bot was away, which is propagated,
+from a ban the guild never had, which is added.
+
+Changes are applied by a ``BanExecutor``, which bans up to ``BULK_BAN_SIZE``
+users per request with Discord's bulk ban endpoint and spaces its requests by
+``BAN_SYNC_REQUESTS_PER_SECOND``, so propagating 10,000 bans takes about 50
+requests instead of 10,000. Unbans go before queued bans. Changes Discord
+rejects are dropped; changes that fail on a server or network error stay
+queued and are retried with exponential backoff.
+"""
+
+import array
+import asyncio
+import bisect
+import random
+import sqlite3
+import typing
+
+import aiohttp
+import discord
+import numpy as np
+
+import config
+from logger_init import logger
+
+# Users per bulk ban request, Discord's maximum
+BULK_BAN_SIZE = 200
+
+# First and longest wait before retrying after a server or network error,
+# in seconds
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+# Errors after which a request may succeed if it is sent again
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+
+
+class BanSet:
+    """The banned user IDs of a guild, as a sorted array."""
+
+    __slots__ = ("ids",)
+
+    def __init__(self, user_ids: typing.Iterable[int] = ()) -> None:
+        """Build the set.
+
+        Args:
+            user_ids (Iterable[int]): The banned user IDs, in any order.
+        """
+        self.ids = array.array("Q", sorted(set(user_ids)))
+
+    def __len__(self) -> int:
+        """Return the number of bans."""
+        return len(self.ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        """Return whether a user is banned.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        index = bisect.bisect_left(self.ids, user_id)
+        return index < len(self.ids) and self.ids[index] == user_id
+
+    def add(self, user_id: int) -> None:
+        """Record a ban.
+
+        Args:
+            user_id (int): The ID of the banned user.
+        """
+        index = bisect.bisect_left(self.ids, user_id)
+        if index == len(self.ids) or self.ids[index] != user_id:
+            self.ids.insert(index, user_id)
+
+    def discard(self, user_id: int) -> None:
+        """Record an unban.
+
+        Args:
+            user_id (int): The ID of the unbanned user.
+        """
+        index = bisect.bisect_left(self.ids, user_id)
+        if index < len(self.ids) and self.ids[index] == user_id:
+            del self.ids[index]
+
+    def to_numpy(self) -> np.ndarray:
+        """Return a copy of the IDs as a NumPy array.
+
+        A copy, since the array cannot be resized while a view of it exists.
+
+        Returns:
+            np.ndarray: The sorted IDs, as unsigned 64-bit integers.
+        """
+        return np.array(self.ids, dtype=np.uint64)
+
+
+async def fetch_bans(guild: discord.Guild) -> BanSet:
+    """Fetch every ban of a guild, 1000 per request.
+
+    Args:
+        guild (discord.Guild): The guild.
+
+    Raises:
+        discord.Forbidden: If the bot may not see the bans of the guild.
+
+    Returns:
+        BanSet: The bans of the guild.
+    """
+    return BanSet([entry.user.id async for entry in guild.bans(limit=None)])
+
+
+# A ban (True) or an unban (False), with the reason shown in the audit log
+Change = typing.Tuple[bool, str]
+
+
+def _merge(arrays: typing.List[np.ndarray]) -> np.ndarray:
+    """Return the sorted union of arrays of IDs.
+
+    Args:
+        arrays (list[np.ndarray]): The arrays, possibly none.
+
+    Returns:
+        np.ndarray: The distinct IDs, sorted.
+    """
+    if not arrays:
+        return np.empty(0, dtype=np.uint64)
+    return np.unique(np.concatenate(arrays))
+
+
+def plan(
+    current: typing.Dict[int, BanSet], known: typing.Dict[int, BanSet]
+) -> typing.Dict[int, typing.Tuple[typing.List[int], typing.List[int]]]:
+    """Work out the bans and unbans that bring the guilds in line.
+
+    A user missing from a guild's list is banned there, unless some guild's
+    last known list had them and the current one does not: that ban was
+    lifted, so the user is unbanned everywhere instead. A user newly banned
+    anywhere wins over a lifted ban. Guilds without a last known list only
+    get bans added.
+
+    Args:
+        current (dict[int, BanSet]): The fetched bans of each guild.
+        known (dict[int, BanSet]): The last known bans of each guild.
+
+    Returns:
+        dict[int, tuple[list[int], list[int]]]: The users to ban and to
+            unban in each guild of ``current``, by guild ID.
+    """
+    arrays = {guild_id: bans.to_numpy() for guild_id, bans in current.items()}
+    lifted, added = [], []
+    for guild_id, ids in arrays.items():
+        if guild_id in known:
+            before = known[guild_id].to_numpy()
+            lifted.append(np.setdiff1d(before, ids, assume_unique=True))
+            added.append(np.setdiff1d(ids, before, assume_unique=True))
+    lifted = np.setdiff1d(_merge(lifted), _merge(added), assume_unique=True)
+    wanted = np.setdiff1d(_merge(list(arrays.values())), lifted, assume_unique=True)
+    return {
+        guild_id: (
+            np.setdiff1d(wanted, ids, assume_unique=True).tolist(),
+            np.intersect1d(ids, lifted, assume_unique=True).tolist(),
+        )
+        for guild_id, ids in arrays.items()
+    }
+
+
+class BanStore:
+    """SQLite-backed storage of the last known bans and the pending changes."""
+
+    def __init__(self, path: str) -> None:
+        """Open the store.
+
+        Args:
+            path (str): The path of the SQLite file.
+        """
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS bans (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID
+            """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                ban INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                PRIMARY KEY (guild_id, user_id)
+            )
+            """)
+        self.db.commit()
+
+    def close(self) -> None:
+        """Close the store."""
+        self.db.close()
+
+    def load(self) -> typing.Dict[int, BanSet]:
+        """Load the last known bans of every guild.
+
+        Returns:
+            dict[int, BanSet]: The bans of each guild, by guild ID.
+        """
+        users: typing.Dict[int, typing.List[int]] = {}
+        for guild_id, user_id in self.db.execute("SELECT guild_id, user_id FROM bans"):
+            users.setdefault(guild_id, []).append(user_id)
+        return {guild_id: BanSet(user_ids) for guild_id, user_ids in users.items()}
+
+    def replace(self, guild_id: int, bans: BanSet) -> None:
+        """Replace the known bans of a guild.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            bans (BanSet): The bans of the guild.
+        """
+        self.db.execute("DELETE FROM bans WHERE guild_id = ?", (guild_id,))
+        self.db.executemany(
+            "INSERT INTO bans (guild_id, user_id) VALUES (?, ?)",
+            ((guild_id, user_id) for user_id in bans.ids),
+        )
+        self.db.commit()
+
+    def record(self, guild_id: int, user_id: int, banned: bool) -> None:
+        """Record a single ban or unban.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            banned (bool): Whether the user is now banned.
+        """
+        if banned:
+            self.db.execute(
+                "INSERT OR IGNORE INTO bans (guild_id, user_id) VALUES (?, ?)",
+                (guild_id, user_id),
+            )
+        else:
+            self.db.execute(
+                "DELETE FROM bans WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id),
+            )
+        self.db.commit()
+
+    def pending(self) -> typing.List[typing.Tuple[int, int, bool, str]]:
+        """Load the changes not applied yet.
+
+        Returns:
+            list[tuple[int, int, bool, str]]: The guild ID, user ID, ban or
+                unban, and reason of every change, oldest first.
+        """
+        return [
+            (guild_id, user_id, bool(ban), reason)
+            for guild_id, user_id, ban, reason in self.db.execute(
+                "SELECT guild_id, user_id, ban, reason FROM pending ORDER BY rowid"
+            )
+        ]
+
+    def queue(self, guild_id: int, user_id: int, change: Change) -> None:
+        """Persist a queued change, replacing any earlier one of the user.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            change (Change): The ban or unban and its reason.
+        """
+        self.db.execute(
+            "INSERT OR REPLACE INTO pending (guild_id, user_id, ban, reason) "
+            "VALUES (?, ?, ?, ?)",
+            (guild_id, user_id, int(change[0]), change[1]),
+        )
+        self.db.commit()
+
+    def done(self, guild_id: int, user_ids: typing.Iterable[int]) -> None:
+        """Forget changes that were applied or rejected.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_ids (Iterable[int]): The IDs of the users.
+        """
+        self.db.executemany(
+            "DELETE FROM pending WHERE guild_id = ? AND user_id = ?",
+            ((guild_id, user_id) for user_id in user_ids),
+        )
+        self.db.commit()
+
+
+def is_transient(error: discord.HTTPException) -> bool:
+    """Return whether a failed request may succeed if it is sent again.
+
+    Args:
+        error (discord.HTTPException): The error of the request.
+
+    Returns:
+        bool: True for server errors and rate limits, False for rejections.
+    """
+    return error.status >= 500 or error.status == 429
+
+
+class BanExecutor:
+    """Rate-limited application of bans and unbans, bans in bulk."""
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        store: BanStore,
+        applied: typing.Callable[[int, int, bool], None],
+    ) -> None:
+        """Initialize the executor.
+
+        Args:
+            bot (discord.Client): The instance of the Discord bot.
+            store (BanStore): The store that keeps the changes across restarts.
+            applied (Callable[[int, int, bool], None]): Called with the guild
+                ID, the user ID and whether the user is now banned, for every
+                change Discord accepted.
+        """
+        self.bot = bot
+        self.store = store
+        self.applied = applied
+        # guild ID -> user ID -> reason; a user is in at most one of the two,
+        # a later change replaces the earlier one
+        self.bans: typing.Dict[int, typing.Dict[int, str]] = {}
+        self.unbans: typing.Dict[int, typing.Dict[int, str]] = {}
+        self.workers: typing.Dict[int, asyncio.Task] = {}
+        self.wakeups: typing.Dict[int, asyncio.Event] = {}
+
+    def resume(self) -> int:
+        """Queue the changes left in the store by the previous run.
+
+        Returns:
+            int: The number of changes queued.
+        """
+        changes = self.store.pending()
+        for guild_id, user_id, ban, reason in changes:
+            self.queue(guild_id, user_id, ban, reason, persist=False)
+        return len(changes)
+
+    def queue(
+        self, guild_id: int, user_id: int, ban: bool, reason: str, persist: bool = True
+    ) -> None:
+        """Queue a ban or an unban.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            ban (bool): True to ban the user, False to unban them.
+            reason (str): The reason shown in the audit log.
+            persist (bool): Write the change to the store.
+        """
+        queued, other = (self.bans, self.unbans) if ban else (self.unbans, self.bans)
+        other.get(guild_id, {}).pop(user_id, None)
+        queued.setdefault(guild_id, {})[user_id] = reason
+        if persist:
+            self.store.queue(guild_id, user_id, (ban, reason))
+
+        wakeup = self.wakeups.get(guild_id)
+        if wakeup is None:
+            wakeup = self.wakeups[guild_id] = asyncio.Event()
+        wakeup.set()
+
+        worker = self.workers.get(guild_id)
+        if worker is None or worker.done():
+            self.workers[guild_id] = asyncio.create_task(self.work(guild_id))
+
+    def is_pending(self, guild_id: int, user_id: int, ban: bool) -> bool:
+        """Return whether a change is already queued.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_id (int): The ID of the user.
+            ban (bool): True for a ban, False for an unban.
+
+        Returns:
+            bool: Whether the change is queued and not applied yet.
+        """
+        return user_id in (self.bans if ban else self.unbans).get(guild_id, {})
+
+    def unbanning(self) -> typing.Set[int]:
+        """Return the users with an unban queued in any guild.
+
+        Returns:
+            set[int]: The IDs of the users.
+        """
+        return {user_id for unbans in self.unbans.values() for user_id in unbans}
+
+    def backlog(self) -> int:
+        """Return the number of changes not applied yet.
+
+        Returns:
+            int: The number of queued changes.
+        """
+        return sum(map(len, self.bans.values())) + sum(map(len, self.unbans.values()))
+
+    async def work(self, guild_id: int) -> None:
+        """Apply the queued changes of a guild, unbans first, forever.
+
+        Args:
+            guild_id (int): The ID of the guild.
+        """
+        await self.bot.wait_until_ready()
+        wakeup = self.wakeups[guild_id]
+        bans = self.bans.setdefault(guild_id, {})
+        unbans = self.unbans.setdefault(guild_id, {})
+        delay = RETRY_BASE_SECONDS
+
+        while True:
+            wakeup.clear()
+            if not bans and not unbans:
+                await wakeup.wait()
+                continue
+
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                # Left in the store, the next start tries again
+                logger.warning(
+                    "Ban sync: guild %s is not available, postponing %d change(s).",
+                    guild_id,
+                    len(bans) + len(unbans),
+                )
+                bans.clear()
+                unbans.clear()
+                continue
+
+            if unbans:
+                user_id, reason = next(iter(unbans.items()))
+                del unbans[user_id]
+                finished = await self.unban(guild, user_id, reason)
+                if not finished:
+                    self.retry(guild_id, [user_id], False, reason)
+            else:
+                # Bans that share a reason go out together
+                reason = next(iter(bans.values()))
+                user_ids = [
+                    user_id for user_id, other in bans.items() if other == reason
+                ][:BULK_BAN_SIZE]
+                for user_id in user_ids:
+                    del bans[user_id]
+                finished = await self.ban(guild, user_ids, reason)
+                if not finished:
+                    self.retry(guild_id, user_ids, True, reason)
+
+            if finished:
+                delay = RETRY_BASE_SECONDS
+                await asyncio.sleep(1 / config.BAN_SYNC_REQUESTS_PER_SECOND)
+            else:
+                # Full jitter, like the outbox
+                wait = random.uniform(0, min(delay, RETRY_MAX_SECONDS))
+                logger.warning("Ban sync: retrying %s in %.1fs.", guild, wait)
+                await asyncio.sleep(wait)
+                delay *= 2
+
+    def retry(
+        self, guild_id: int, user_ids: typing.List[int], ban: bool, reason: str
+    ) -> None:
+        """Put changes that failed on a transient error back in the queue.
+
+        Users who got another change queued in the meantime keep that one.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_ids (list[int]): The IDs of the users.
+            ban (bool): True for bans, False for unbans.
+            reason (str): The reason shown in the audit log.
+        """
+        queued = (self.bans if ban else self.unbans).setdefault(guild_id, {})
+        for user_id in user_ids:
+            if not self.is_pending(guild_id, user_id, not ban):
+                queued.setdefault(user_id, reason)
+
+    def finish(self, guild_id: int, user_ids: typing.List[int]) -> None:
+        """Forget applied or rejected changes, unless a newer one was queued.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            user_ids (list[int]): The IDs of the users.
+        """
+        self.store.done(
+            guild_id,
+            [
+                user_id
+                for user_id in user_ids
+                if not self.is_pending(guild_id, user_id, True)
+                and not self.is_pending(guild_id, user_id, False)
+            ],
+        )
+
+    async def ban(
+        self, guild: discord.Guild, user_ids: typing.List[int], reason: str
+    ) -> bool:
+        """Ban users with a single request.
+
+        Args:
+            guild (discord.Guild): The guild.
+            user_ids (list[int]): The IDs of the users, at most ``BULK_BAN_SIZE``.
+            reason (str): The reason shown in the audit log.
+
+        Returns:
+            bool: False if the request failed on an error worth retrying.
+        """
+        try:
+            result = await guild.bulk_ban(
+                [discord.Object(id=user_id) for user_id in user_ids],
+                reason=reason,
+                delete_message_seconds=0,
+            )
+        except discord.HTTPException as error:
+            if is_transient(error):
+                logger.warning("Ban sync: failed to ban in %s: %s", guild, error)
+                return False
+            logger.error(
+                "Ban sync: Discord rejected banning %d user(s) in %s: %s",
+                len(user_ids),
+                guild,
+                error,
+            )
+            self.finish(guild.id, user_ids)
+            return True
+        except TRANSIENT_ERRORS as error:
+            logger.warning("Ban sync: failed to ban in %s: %s", guild, error)
+            return False
+
+        self.finish(guild.id, user_ids)
+        for user in result.banned:
+            self.applied(guild.id, user.id, True)
+        logger.info(
+            "Ban sync: banned %d user(s) in %s (%d failed).",
+            len(result.banned),
+            guild,
+            len(result.failed),
+        )
+        return True
+
+    async def unban(self, guild: discord.Guild, user_id: int, reason: str) -> bool:
+        """Unban a user. Discord has no bulk unban.
+
+        Args:
+            guild (discord.Guild): The guild.
+            user_id (int): The ID of the user.
+            reason (str): The reason shown in the audit log.
+
+        Returns:
+            bool: False if the request failed on an error worth retrying.
+        """
+        try:
+            await guild.unban(discord.Object(id=user_id), reason=reason)
+        except discord.NotFound:
+            # Not banned there, which is what we wanted
+            pass
+        except discord.HTTPException as error:
+            if is_transient(error):
+                logger.warning("Ban sync: failed to unban in %s: %s", guild, error)
+                return False
+            logger.error(
+                "Ban sync: Discord rejected unbanning %s in %s: %s",
+                user_id,
+                guild,
+                error,
+            )
+            self.finish(guild.id, [user_id])
+            return True
+        except TRANSIENT_ERRORS as error:
+            logger.warning("Ban sync: failed to unban in %s: %s", guild, error)
+            return False
+        self.finish(guild.id, [user_id])
+        self.applied(guild.id, user_id, False)
+        return True
+
+    async def close(self) -> None:
+        """Stop the workers.
+
+        Changes not applied yet stay in the store and are resumed on the next start.
+        """
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+        if self.backlog():
+            logger.info(
+                "Ban sync stopped with %d change(s) kept for the next start.",
+                self.backlog(),
+            )
@@ -0,0 +1,239 @@
+"""
+Join cohort scoring for the Discord bot.
+
+During a raid, moderators judge whole cohorts of joins rather than single
+``on_member_join`` events. ``JoinCohort`` keeps the recent joins of a guild
+in column-oriented NumPy arrays (a ring buffer of ``COHORT_CAPACITY`` joins)
+and scores all of them in one vectorized pass. Account creation times are
+derived from the snowflake IDs in bulk.
+
+Each join gets a risk score between 0 and 1 from these signals:
+
+- ``age``: how new the account was when it joined
+- ``burst``: how many joins arrived around the same time
+- ``created_together``: how many accounts in the cohort were created
+  around the same time, as batch-registered raid accounts are
+- ``no_avatar``: whether the account has the default avatar
+- ``digits``: the share of digits in the name, as in ``user48213``
+- ``shared_prefix``: how many other joins start their name the same way
+
+Scoring tens of thousands of joins takes a few milliseconds (see
+``benchmarks.bench_cohort``).
+"""
+
+import typing
+import zlib
+
+import numpy as np
+
+import config
+
+# Milliseconds since the Unix epoch at the Discord epoch (2015-01-01)
+DISCORD_EPOCH_MS = 1_420_070_400_000
+
+DAY = 86_400.0
+
+# Names that start the same way share a bucket
+PREFIX_LENGTH = 4
+
+# Weight of each signal in the score
+WEIGHTS = {
+    "age": 3.0,
+    "burst": 2.0,
+    "created_together": 2.0,
+    "no_avatar": 1.0,
+    "digits": 1.0,
+    "shared_prefix": 1.5,
+}
+
+# Seconds around a join (or an account creation) that count as "together"
+BURST_SECONDS = 60.0
+CREATED_TOGETHER_SECONDS = 3_600.0
+# Neighbours at which the burst and shared signals are at their maximum
+BURST_SATURATION = 10
+SHARED_SATURATION = 5
+
+
+class CohortScores(typing.NamedTuple):
+    """The signals of every scored join, aligned by position."""
+
+    # Positions of the scored joins in the columns
+    indexes: np.ndarray
+    # signal -> value between 0 and 1
+    signals: typing.Dict[str, np.ndarray]
+    account_age_days: np.ndarray
+    # Other joins within BURST_SECONDS
+    burst: np.ndarray
+
+
+class Suspect(typing.NamedTuple):
+    """A scored join."""
+
+    user_id: int
+    name: str
+    score: float
+    account_age_days: float
+    joined_at: float
+    burst: int
+    signals: typing.Dict[str, float]
+
+
+def created_at(user_ids: np.ndarray) -> np.ndarray:
+    """Derive the creation times of accounts from their snowflake IDs.
+
+    Args:
+        user_ids (np.ndarray): The IDs, as unsigned 64-bit integers.
+
+    Returns:
+        np.ndarray: The creation times, in seconds since the Unix epoch.
+    """
+    return ((user_ids >> np.uint64(22)).astype(np.float64) + DISCORD_EPOCH_MS) / 1000
+
+
+def neighbours(times: np.ndarray, radius: float) -> np.ndarray:
+    """Count, for every time, the other times within ``radius`` of it.
+
+    Args:
+        times (np.ndarray): The times.
+        radius (float): The distance, in seconds.
+
+    Returns:
+        np.ndarray: The number of other times within the distance.
+    """
+    # Searching with sorted values is several times faster than in time order
+    order = np.argsort(times)
+    ordered = times[order]
+    upper = np.searchsorted(ordered, ordered + radius, side="right")
+    lower = np.searchsorted(ordered, ordered - radius, side="left")
+    counts = np.empty(len(times), dtype=np.int64)
+    counts[order] = upper - lower - 1
+    return counts
+
+
+def name_prefix(name: str) -> int:
+    """Hash the start of a name, ignoring case.
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        int: The hash of the prefix.
+    """
+    return zlib.crc32(name[:PREFIX_LENGTH].casefold().encode("utf-8"))
+
+
+class JoinCohort:
+    """The recent joins of a guild, stored column by column."""
+
+    def __init__(self, capacity: int = config.COHORT_CAPACITY) -> None:
+        """Allocate the columns.
+
+        Args:
+            capacity (int): The number of joins kept; older ones are overwritten.
+        """
+        self.capacity = capacity
+        self.size = 0
+        # Index the next join is written to
+        self.head = 0
+        self.user_ids = np.zeros(capacity, dtype=np.uint64)
+        self.joined_at = np.zeros(capacity, dtype=np.float64)
+        self.has_avatar = np.zeros(capacity, dtype=bool)
+        self.digit_ratio = np.zeros(capacity, dtype=np.float32)
+        self.prefixes = np.zeros(capacity, dtype=np.uint32)
+        self.names: typing.List[str] = [""] * capacity
+
+    def __len__(self) -> int:
+        """Return the number of joins kept."""
+        return self.size
+
+    def add(self, user_id: int, name: str, joined_at: float, has_avatar: bool) -> None:
+        """Record a join.
+
+        Args:
+            user_id (int): The ID of the member.
+            name (str): The name of the member.
+            joined_at (float): When the member joined, in seconds since the epoch.
+            has_avatar (bool): Whether the member has a custom avatar.
+        """
+        index = self.head
+        self.user_ids[index] = user_id
+        self.joined_at[index] = joined_at
+        self.has_avatar[index] = has_avatar
+        self.digit_ratio[index] = (
+            sum(char.isdigit() for char in name) / len(name) if name else 0.0
+        )
+        self.prefixes[index] = name_prefix(name)
+        self.names[index] = name
+        self.head = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def score(self, since: float) -> CohortScores:
+        """Compute the signals of every join since a given time.
+
+        Args:
+            since (float): The earliest join scored, in seconds since the epoch.
+
+        Returns:
+            CohortScores: The signals of the scored joins.
+        """
+        indexes = np.flatnonzero(self.joined_at[: self.size] >= since)
+        joined = self.joined_at[indexes]
+        created = created_at(self.user_ids[indexes])
+
+        age_days = np.maximum(joined - created, 0.0) / DAY
+        burst = neighbours(joined, BURST_SECONDS)
+        _, inverse, counts = np.unique(
+            self.prefixes[indexes], return_inverse=True, return_counts=True
+        )
+        signals = {
+            "age": np.exp(-age_days / config.COHORT_NEW_ACCOUNT_DAYS),
+            "burst": np.minimum(burst / BURST_SATURATION, 1.0),
+            "created_together": np.minimum(
+                neighbours(created, CREATED_TOGETHER_SECONDS) / SHARED_SATURATION, 1.0
+            ),
+            "no_avatar": (~self.has_avatar[indexes]).astype(np.float64),
+            "digits": self.digit_ratio[indexes].astype(np.float64),
+            "shared_prefix": np.minimum((counts[inverse] - 1) / SHARED_SATURATION, 1.0),
+        }
+        return CohortScores(indexes, signals, age_days, burst)
+
+    def suspects(self, since: float, limit: int) -> typing.List[Suspect]:
+        """Rank the joins since a given time by risk.
+
+        Args:
+            since (float): The earliest join ranked, in seconds since the epoch.
+            limit (int): The number of suspects to return.
+
+        Returns:
+            list[Suspect]: The riskiest joins, highest score first.
+        """
+        scored = self.score(since)
+        if not len(scored.indexes):
+            return []
+
+        total = sum(WEIGHTS.values())
+        scores = (
+            sum(WEIGHTS[name] * values for name, values in scored.signals.items())
+            / total
+        )
+
+        # Only the top of the ranking is sorted
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            Suspect(
+                user_id=int(self.user_ids[index]),
+                name=self.names[index],
+                score=float(scores[position]),
+                account_age_days=float(scored.account_age_days[position]),
+                joined_at=float(self.joined_at[index]),
+                burst=int(scored.burst[position]),
+                signals={
+                    name: float(values[position])
+                    for name, values in scored.signals.items()
+                },
+            )
+            for position, index in zip(top, scored.indexes[top])
+        ]
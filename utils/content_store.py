@@ -0,0 +1,366 @@
+"""
+Message content store for the Discord bot.
+
+Keeps the edit history of messages in a local SQLite file. The first known
+revision of a message is stored in full; every later revision is stored as a
+word-level delta against the one before it, so keeping many revisions of a
+long message costs about the size of the edits rather than one full copy per
+revision. A full copy is stored again every ``KEYFRAME_INTERVAL`` revisions
+to bound the work needed to rebuild a revision.
+
+Edits are written in batches with ``add_edits``, from a worker thread, so
+an edit storm does not block the event loop on SQLite commits.
+"""
+
+import collections
+import difflib
+import json
+import re
+import sqlite3
+import time
+import typing
+
+# Store a full copy every this many revisions
+KEYFRAME_INTERVAL = 16
+
+# Number of latest revisions kept in memory for computing new deltas
+LATEST_CACHE_SIZE = 1024
+
+_TOKEN = re.compile(r"\s+|\S+")
+
+
+def tokenize(text: str) -> typing.List[str]:
+    """Split text into alternating word and whitespace tokens.
+
+    Joining the tokens gives back the original text.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        list[str]: The tokens.
+    """
+    return _TOKEN.findall(text)
+
+
+def make_delta(before: typing.List[str], after: typing.List[str]) -> list:
+    """Describe how to build a token list from a previous one.
+
+    The delta is a list of operations: ``[start, end]`` copies a range of the
+    previous tokens, and a string inserts new text.
+
+    Args:
+        before (list[str]): The tokens of the previous revision.
+        after (list[str]): The tokens of the new revision.
+
+    Returns:
+        list: The delta operations.
+    """
+    delta = []
+    matcher = difflib.SequenceMatcher(None, before, after, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            delta.append("".join(after[j1:j2]))
+    return delta
+
+
+def apply_delta(before: typing.List[str], delta: list) -> str:
+    """Rebuild a revision from the previous one and its delta.
+
+    Args:
+        before (list[str]): The tokens of the previous revision.
+        delta (list): The delta operations from :func:`make_delta`.
+
+    Returns:
+        str: The text of the revision.
+    """
+    return "".join(
+        op if isinstance(op, str) else "".join(before[op[0] : op[1]]) for op in delta
+    )
+
+
+class Edit(typing.NamedTuple):
+    """A message edit waiting to be stored."""
+
+    message_id: int
+    channel_id: int
+    author_id: int
+    # Content and creation time of the message, stored if it has no history yet
+    before: str
+    created_at: float
+    after: str
+    edited_at: float
+
+
+class Revision(typing.NamedTuple):
+    """Summary of a stored revision."""
+
+    number: int
+    edited_at: float
+    size: int
+
+
+class ContentStore:
+    """SQLite-backed edit history of messages."""
+
+    def __init__(self, path: str) -> None:
+        """Open the store.
+
+        Args:
+            path (str): The path of the SQLite file.
+        """
+        # Edits are written from a worker thread to keep the event loop free
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS revisions (
+                message_id INTEGER NOT NULL,
+                revision INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                edited_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                full_text TEXT,
+                delta TEXT,
+                PRIMARY KEY (message_id, revision)
+            )
+            """)
+        self.db.commit()
+
+        # message ID -> (revision number, tokens) of the latest revision
+        self.latest: typing.OrderedDict[int, typing.Tuple[int, typing.List[str]]] = (
+            collections.OrderedDict()
+        )
+
+    def close(self) -> None:
+        """Close the store."""
+        self.db.close()
+
+    def trim(self) -> None:
+        """Drop the cached latest revisions; they are read back from the file."""
+        self.latest.clear()
+
+    def has(self, message_id: int) -> bool:
+        """Return whether any revision of a message is stored.
+
+        Args:
+            message_id (int): The ID of the message.
+
+        Returns:
+            bool: Whether the message has stored revisions.
+        """
+        if message_id in self.latest:
+            return True
+        row = self.db.execute(
+            "SELECT 1 FROM revisions WHERE message_id = ? LIMIT 1", (message_id,)
+        ).fetchone()
+        return row is not None
+
+    def add(
+        self,
+        message_id: int,
+        channel_id: int,
+        author_id: int,
+        content: str,
+        edited_at: typing.Optional[float] = None,
+    ) -> int:
+        """Store a new revision of a message.
+
+        Args:
+            message_id (int): The ID of the message.
+            channel_id (int): The ID of the channel of the message.
+            author_id (int): The ID of the author of the message.
+            content (str): The content of the new revision.
+            edited_at (float | None): When the revision was made, defaults to now.
+
+        Returns:
+            int: The number of the new revision, starting at 0.
+        """
+        number = self.insert(message_id, channel_id, author_id, content, edited_at)
+        self.db.commit()
+        return number
+
+    def add_edits(self, edits: typing.List[Edit]) -> None:
+        """Store a batch of edits in one transaction, in order.
+
+        The content before an edit is stored first if the message has no
+        history yet.
+
+        Args:
+            edits (list[Edit]): The edits, oldest first.
+
+        Raises:
+            sqlite3.Error: If the batch could not be stored; none of it is.
+        """
+        try:
+            for edit in edits:
+                if not self.has(edit.message_id):
+                    self.insert(
+                        edit.message_id,
+                        edit.channel_id,
+                        edit.author_id,
+                        edit.before,
+                        edit.created_at,
+                    )
+                self.insert(
+                    edit.message_id,
+                    edit.channel_id,
+                    edit.author_id,
+                    edit.after,
+                    edit.edited_at,
+                )
+            self.db.commit()
+        except sqlite3.Error:
+            # The cached revisions may include rows that were rolled back
+            self.db.rollback()
+            self.latest.clear()
+            raise
+
+    def insert(
+        self,
+        message_id: int,
+        channel_id: int,
+        author_id: int,
+        content: str,
+        edited_at: typing.Optional[float] = None,
+    ) -> int:
+        """Insert a new revision of a message without committing it.
+
+        Args:
+            message_id (int): The ID of the message.
+            channel_id (int): The ID of the channel of the message.
+            author_id (int): The ID of the author of the message.
+            content (str): The content of the new revision.
+            edited_at (float | None): When the revision was made, defaults to now.
+
+        Returns:
+            int: The number of the new revision, starting at 0.
+        """
+        previous = self.latest_revision(message_id)
+        tokens = tokenize(content)
+        if previous is None:
+            number, full_text, delta = 0, content, None
+        else:
+            number = previous[0] + 1
+            if number % KEYFRAME_INTERVAL == 0:
+                full_text, delta = content, None
+            else:
+                full_text = None
+                delta = json.dumps(
+                    make_delta(previous[1], tokens), separators=(",", ":")
+                )
+
+        self.db.execute(
+            "INSERT INTO revisions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                message_id,
+                number,
+                channel_id,
+                author_id,
+                edited_at if edited_at is not None else time.time(),
+                len(content),
+                full_text,
+                delta,
+            ),
+        )
+        self.remember(message_id, number, tokens)
+        return number
+
+    def remember(self, message_id: int, number: int, tokens: typing.List[str]):
+        """Cache the latest revision of a message.
+
+        Args:
+            message_id (int): The ID of the message.
+            number (int): The number of the revision.
+            tokens (list[str]): The tokens of the revision.
+        """
+        self.latest[message_id] = (number, tokens)
+        self.latest.move_to_end(message_id)
+        if len(self.latest) > LATEST_CACHE_SIZE:
+            self.latest.popitem(last=False)
+
+    def latest_revision(
+        self, message_id: int
+    ) -> typing.Optional[typing.Tuple[int, typing.List[str]]]:
+        """Return the number and tokens of the latest revision of a message.
+
+        Args:
+            message_id (int): The ID of the message.
+
+        Returns:
+            tuple[int, list[str]] | None: The latest revision, if any is stored.
+        """
+        cached = self.latest.get(message_id)
+        if cached is not None:
+            return cached
+
+        row = self.db.execute(
+            "SELECT MAX(revision) FROM revisions WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return row[0], tokenize(self.get(message_id, row[0]))
+
+    def get(self, message_id: int, number: int) -> typing.Optional[str]:
+        """Rebuild the text of a revision.
+
+        Args:
+            message_id (int): The ID of the message.
+            number (int): The number of the revision.
+
+        Returns:
+            str | None: The text of the revision, if it is stored.
+        """
+        # Start from the closest full copy at or before the revision
+        rows = self.db.execute(
+            """
+            SELECT revision, full_text, delta FROM revisions
+            WHERE message_id = ? AND revision <= ? AND revision >= (
+                SELECT MAX(revision) FROM revisions
+                WHERE message_id = ? AND revision <= ? AND full_text IS NOT NULL
+            )
+            ORDER BY revision
+            """,
+            (message_id, number, message_id, number),
+        ).fetchall()
+        if not rows or rows[-1][0] != number:
+            return None
+
+        text = rows[0][1]
+        for _, _, delta in rows[1:]:
+            text = apply_delta(tokenize(text), json.loads(delta))
+        return text
+
+    def message_info(self, message_id: int) -> typing.Optional[typing.Tuple[int, int]]:
+        """Return the channel and author of a stored message.
+
+        Args:
+            message_id (int): The ID of the message.
+
+        Returns:
+            tuple[int, int] | None: The channel ID and author ID, if the message
+                is stored.
+        """
+        return self.db.execute(
+            "SELECT channel_id, author_id FROM revisions WHERE message_id = ? LIMIT 1",
+            (message_id,),
+        ).fetchone()
+
+    def revisions(self, message_id: int) -> typing.List[Revision]:
+        """List the stored revisions of a message.
+
+        Args:
+            message_id (int): The ID of the message.
+
+        Returns:
+            list[Revision]: The revisions, oldest first.
+        """
+        rows = self.db.execute(
+            "SELECT revision, edited_at, size FROM revisions "
+            "WHERE message_id = ? ORDER BY revision",
+            (message_id,),
+        ).fetchall()
+        return [Revision(*row) for row in rows]
@@ -0,0 +1,214 @@
+"""
+Embed templating utilities for the Discord bot.
+
+Every listener used to build its ``discord.Embed`` by hand, repeating the
+title, color and field names at each call site. This module declares the
+static part of every embed once (title, color, footer and field names),
+checks it against Discord's embed limits when the template is defined, and
+only fills in the variable parts when an event is rendered. Rendering goes
+through the public ``discord.Embed`` API and costs about the same as building
+the embed by hand; the point is one declaration per embed and consistent
+handling of values that are too long, not speed.
+"""
+
+import datetime
+import typing
+
+import discord
+
+# Discord embed limits
+TITLE_LIMIT = 256
+DESCRIPTION_LIMIT = 4096
+FIELD_COUNT_LIMIT = 25
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+FOOTER_LIMIT = 2048
+TOTAL_LIMIT = 6000
+
+# Format used for every date shown in an embed
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def truncate(value: str, limit: int) -> str:
+    """Clip a string to a Discord limit, marking the cut with an ellipsis.
+
+    Args:
+        value (str): The string to clip.
+        limit (int): The maximum number of characters allowed.
+
+    Returns:
+        str: The original string, or a clipped copy ending with an ellipsis.
+    """
+    if len(value) <= limit:
+        return value
+    return value[: limit - 1] + "…"
+
+
+def split_value(value: str, limit: int = FIELD_VALUE_LIMIT) -> typing.List[str]:
+    """Split a string into chunks that each fit in a field value.
+
+    Chunks are cut on line breaks where possible.
+
+    Args:
+        value (str): The string to split.
+        limit (int): The maximum length of a chunk.
+
+    Returns:
+        list[str]: The chunks, in order.
+    """
+    chunks = []
+    while len(value) > limit:
+        cut = value.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(value[:cut])
+        value = value[cut:].lstrip("\n")
+    chunks.append(value)
+    return chunks
+
+
+def format_time(moment: typing.Optional[datetime.datetime]) -> str:
+    """Format a datetime the way every embed displays it.
+
+    Args:
+        moment (datetime.datetime | None): The datetime to format.
+
+    Returns:
+        str: The formatted datetime, or "None" if no datetime was given.
+    """
+    return moment.strftime(TIME_FORMAT) if moment else "None"
+
+
+def _overflow_fields(name: str, value: str, inline: bool) -> typing.List[dict]:
+    """Spread a value longer than a field over consecutive fields.
+
+    Args:
+        name (str): The name of the first field.
+        value (str): The value to spread.
+        inline (bool): Whether the fields are displayed inline.
+
+    Returns:
+        list[dict]: The fields, in Discord's dict format.
+    """
+    return [
+        {
+            "name": (
+                name
+                if index == 0
+                else truncate(f"{name} (continued)", FIELD_NAME_LIMIT)
+            ),
+            "value": chunk,
+            "inline": inline,
+        }
+        for index, chunk in enumerate(split_value(value))
+    ]
+
+
+class EmbedTemplate:
+    """Embed layout for a single event type.
+
+    The static parts of the embed are validated once, when the template is
+    defined. Rendering builds the embed through the public ``discord.Embed``
+    API and only fills in the description and field values.
+    """
+
+    __slots__ = ("_title", "_color", "_footer", "_field_names", "_inline", "_timestamp")
+
+    def __init__(
+        self,
+        title: str,
+        color: discord.Color,
+        fields: typing.Sequence[str] = (),
+        *,
+        footer: typing.Optional[str] = None,
+        timestamp: bool = False,
+        inline: bool = False,
+    ) -> None:
+        """Initialize and validate the template.
+
+        Args:
+            title (str): The embed title.
+            color (discord.Color): The embed color.
+            fields (Sequence[str]): Names of the fields filled on every render.
+            footer (str | None): Static footer text, if any.
+            timestamp (bool): Whether to stamp the embed with the render time.
+            inline (bool): Whether the template fields are displayed inline.
+
+        Raises:
+            ValueError: If the static parts exceed Discord's embed limits.
+        """
+        if len(title) > TITLE_LIMIT:
+            raise ValueError(f"Embed title exceeds {TITLE_LIMIT} characters.")
+        if len(fields) > FIELD_COUNT_LIMIT:
+            raise ValueError(f"Embed has more than {FIELD_COUNT_LIMIT} fields.")
+        if any(len(name) > FIELD_NAME_LIMIT for name in fields):
+            raise ValueError(f"Embed field name exceeds {FIELD_NAME_LIMIT} characters.")
+        if footer and len(footer) > FOOTER_LIMIT:
+            raise ValueError(f"Embed footer exceeds {FOOTER_LIMIT} characters.")
+
+        self._title = title
+        self._color = color
+        self._footer = footer
+        self._field_names = tuple(fields)
+        self._inline = inline
+        self._timestamp = timestamp
+
+    def render(
+        self,
+        description: typing.Optional[str] = None,
+        *values: typing.Any,
+        extra: typing.Iterable[typing.Tuple[str, typing.Any]] = (),
+        thumbnail: typing.Optional[str] = None,
+        footer: typing.Optional[str] = None,
+    ) -> discord.Embed:
+        """Build an embed from the template.
+
+        Values longer than a field are continued in the following fields. The
+        embed may then exceed Discord's field count or total length; the outbox
+        reshapes such embeds before sending them (see ``utils.rendering``).
+
+        Args:
+            description (str | None): The embed description.
+            *values: Values for the template fields, in the order they were declared.
+            extra (Iterable[tuple[str, Any]]): Additional (name, value) fields
+                appended after the template fields.
+            thumbnail (str | None): Thumbnail URL, if any.
+            footer (str | None): Footer text overriding the template footer.
+
+        Returns:
+            discord.Embed: The rendered embed.
+        """
+        embed = discord.Embed(
+            title=self._title,
+            color=self._color,
+            description=(
+                truncate(description, DESCRIPTION_LIMIT)
+                if description is not None
+                else None
+            ),
+            timestamp=discord.utils.utcnow() if self._timestamp else None,
+        )
+
+        inline = self._inline
+        for name, value in zip(self._field_names, values):
+            value = str(value)
+            if len(value) > FIELD_VALUE_LIMIT:
+                for field in _overflow_fields(name, value, inline):
+                    embed.add_field(**field)
+            else:
+                embed.add_field(name=name, value=value, inline=inline)
+        for name, value in extra:
+            name = truncate(name, FIELD_NAME_LIMIT)
+            value = str(value)
+            if len(value) > FIELD_VALUE_LIMIT:
+                for field in _overflow_fields(name, value, False):
+                    embed.add_field(**field)
+            else:
+                embed.add_field(name=name, value=value, inline=False)
+
+        if thumbnail:
+            embed.set_thumbnail(url=thumbnail)
+        footer = truncate(footer, FOOTER_LIMIT) if footer else self._footer
+        if footer:
+            embed.set_footer(text=footer)
+        return embed
@@ -0,0 +1,169 @@
+"""
+Memory accounting for the Discord bot.
+
+The bot runs for weeks, so anything that grows without bound (discord.py's
+caches, or state kept by the cogs) eventually gets it killed. These helpers
+measure the resident set size, the most common object types, the sizes of
+the discord.py caches, and the sizes of the caches the bot owns. The
+``MemoryEvents`` cog uses them for the ``!memory`` report and the periodic
+leak watchdog.
+
+Bot-owned caches are found by looking at the containers held by every cog
+and by the shared objects attached to the bot (``bot.names``, ``bot.outbox``,
+...), one level deep into the helper objects of this package. New caches
+show up in the report without registering them anywhere.
+"""
+
+import collections
+import ctypes
+import ctypes.util
+import gc
+import os
+import resource
+import typing
+
+import discord
+
+MIB = 1024 * 1024
+
+# Containers whose length is reported as the size of a cache
+SIZED = (dict, list, set, frozenset, collections.deque)
+
+# Shared objects attached to the bot that may hold caches
+BOT_OWNED = ("names", "outbox", "pipeline", "metrics", "rules")
+
+
+def rss_bytes() -> int:
+    """Return the resident set size of the process.
+
+    Returns:
+        int: The RSS in bytes, or the peak RSS where the current one is unknown.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def count_objects() -> typing.Counter[str]:
+    """Count the objects tracked by the garbage collector, by type.
+
+    This walks every tracked object, so it is meant for reports and periodic
+    checks, not hot paths.
+
+    Returns:
+        Counter[str]: The number of objects of every type name.
+    """
+    return collections.Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def library_caches(bot: discord.Client) -> typing.Dict[str, int]:
+    """Return the sizes of discord.py's caches.
+
+    Args:
+        bot (discord.Client): The instance of the Discord bot.
+
+    Returns:
+        dict[str, int]: The number of cached objects of each kind.
+    """
+    return {
+        "guilds": len(bot.guilds),
+        "channels": sum(len(guild.channels) for guild in bot.guilds),
+        "roles": sum(len(guild.roles) for guild in bot.guilds),
+        "members": sum(len(guild.members) for guild in bot.guilds),
+        "users": len(bot.users),
+        "messages": len(bot.cached_messages),
+    }
+
+
+def size_of(value: typing.Any) -> typing.Optional[int]:
+    """Return the size of a cache-like container.
+
+    Mappings of containers, such as ``guild ID -> invite code -> invite``,
+    count their inner entries.
+
+    Args:
+        value (Any): The value to measure.
+
+    Returns:
+        int | None: The number of entries, or None if the value is not a container.
+    """
+    if not isinstance(value, SIZED):
+        return None
+    if isinstance(value, dict) and value:
+        first = next(iter(value.values()))
+        if isinstance(first, SIZED):
+            return sum(len(inner) for inner in value.values() if inner is not None)
+    return len(value)
+
+
+def owned_caches(bot: discord.Client) -> typing.Dict[str, int]:
+    """Return the sizes of the caches held by the cogs and the bot's helpers.
+
+    Args:
+        bot (discord.Client): The instance of the Discord bot.
+
+    Returns:
+        dict[str, int]: The number of entries of every cache, by ``owner.attribute``.
+    """
+    owners = dict(getattr(bot, "cogs", {}))
+    owners.update(
+        (name, getattr(bot, name)) for name in BOT_OWNED if hasattr(bot, name)
+    )
+
+    sizes = {}
+    for owner_name, owner in owners.items():
+        for name, value in vars(owner).items():
+            if name.startswith("_"):
+                continue
+            size = size_of(value)
+            if size is not None:
+                sizes[f"{owner_name}.{name}"] = size
+            elif type(value).__module__.startswith("utils."):
+                # Helper objects of this package, e.g. a cog's store or index
+                for inner_name, inner in vars(value).items():
+                    size = size_of(inner)
+                    if size is not None and not inner_name.startswith("_"):
+                        sizes[f"{owner_name}.{name}.{inner_name}"] = size
+    return sizes
+
+
+def trim(bot: discord.Client) -> int:
+    """Release memory that can be rebuilt or is no longer needed.
+
+    Cogs, their helper objects and the shared objects on the bot that have a
+    ``trim()`` method drop such state: the content store its cached
+    revisions, the polls cog the tallies of finished polls, and the snapshot
+    cog the snapshots of guilds the bot left. Then the garbage collector
+    runs, and on glibc freed memory is handed back to the system.
+
+    The name cache and pending digests are not trimmed, since they hold the
+    only copy of what they record, and neither is discord.py's message cache,
+    since edit and delete events rely on it.
+
+    Args:
+        bot (discord.Client): The instance of the Discord bot.
+
+    Returns:
+        int: The number of unreachable objects the garbage collector found.
+    """
+    owners = list(getattr(bot, "cogs", {}).values())
+    owners.extend(getattr(bot, name) for name in BOT_OWNED if hasattr(bot, name))
+    for owner in owners:
+        if hasattr(owner, "trim"):
+            owner.trim()
+        for value in vars(owner).values():
+            if type(value).__module__.startswith("utils.") and hasattr(value, "trim"):
+                value.trim()
+
+    collected = gc.collect()
+    libc = ctypes.util.find_library("c")
+    if libc:
+        try:
+            ctypes.CDLL(libc).malloc_trim(0)
+        except (OSError, AttributeError):
+            # Not glibc
+            pass
+    return collected
@@ -0,0 +1,149 @@
+"""
+Name cache for the Discord bot.
+
+Historical reports (the edit history, the event history) only keep the IDs of
+channels, roles and users, and those may have been deleted or renamed since.
+The name cache remembers the last known name of every ID. Cogs keep it
+current incrementally from their create, update and delete listeners, and
+it is persisted to the data directory, so old events resolve to a readable
+name without any API fetches.
+"""
+
+import asyncio
+import typing
+
+import config
+from logger_init import logger
+from utils.storage import load_json, save_json
+
+CHANNEL = "channel"
+ROLE = "role"
+USER = "user"
+KINDS = (CHANNEL, ROLE, USER)
+
+# Mention syntax of each kind, used for IDs that still exist
+MENTIONS = {CHANNEL: "<#{}>", ROLE: "<@&{}>", USER: "<@{}>"}
+
+
+class NameCache:
+    """Last known names of channels, roles and users, by ID."""
+
+    def __init__(self, path: str) -> None:
+        """Load the persisted names.
+
+        Args:
+            path (str): The path of the JSON file the names are persisted to.
+        """
+        self.path = path
+        # kind -> ID -> (name, deleted)
+        self.names: typing.Dict[str, typing.Dict[int, typing.Tuple[str, bool]]] = {
+            kind: {} for kind in KINDS
+        }
+        for kind, entries in load_json(path, {}).items():
+            if kind in self.names:
+                self.names[kind] = {
+                    int(object_id): (name, deleted)
+                    for object_id, (name, deleted) in entries.items()
+                }
+        self.dirty = False
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def remember(self, kind: str, object_id: int, name: str) -> None:
+        """Record the current name of an ID.
+
+        Args:
+            kind (str): One of ``channel``, ``role`` or ``user``.
+            object_id (int): The ID.
+            name (str): Its current name.
+        """
+        entry = (name, False)
+        table = self.names[kind]
+        if table.get(object_id) != entry:
+            table[object_id] = entry
+            self.dirty = True
+
+    def forget(self, kind: str, object_id: int) -> None:
+        """Mark an ID as deleted, keeping its last known name.
+
+        Args:
+            kind (str): One of ``channel``, ``role`` or ``user``.
+            object_id (int): The ID.
+        """
+        entry = self.names[kind].get(object_id)
+        if entry and not entry[1]:
+            self.names[kind][object_id] = (entry[0], True)
+            self.dirty = True
+
+    def name(
+        self, kind: str, object_id: typing.Optional[int], default: str = ""
+    ) -> str:
+        """Return the last known name of an ID.
+
+        Args:
+            kind (str): One of ``channel``, ``role`` or ``user``.
+            object_id (int | None): The ID.
+            default (str): The name of unknown IDs, defaults to ``Unknown (<id>)``.
+
+        Returns:
+            str: The name, marked as deleted if the ID no longer exists.
+        """
+        entry = self.names[kind].get(object_id) if object_id is not None else None
+        if entry is None:
+            return default or f"Unknown ({object_id})"
+        name, deleted = entry
+        return f"{name} (deleted)" if deleted else name
+
+    def mention(self, kind: str, object_id: int) -> str:
+        """Render an ID for an embed.
+
+        IDs that still exist are mentioned, so Discord shows their current
+        name. Deleted IDs are shown by their last known name.
+
+        Args:
+            kind (str): One of ``channel``, ``role`` or ``user``.
+            object_id (int): The ID.
+
+        Returns:
+            str: The mention or name.
+        """
+        entry = self.names[kind].get(object_id)
+        if entry is not None and entry[1]:
+            return self.name(kind, object_id)
+        return MENTIONS[kind].format(object_id)
+
+    def snapshot(self) -> dict:
+        """Return the names in their JSON form and mark them as saved.
+
+        Returns:
+            dict: The names, keyed by kind and then by ID.
+        """
+        self.dirty = False
+        return {
+            kind: {str(object_id): entry for object_id, entry in table.items()}
+            for kind, table in self.names.items()
+        }
+
+    def start(self) -> None:
+        """Start persisting the names periodically."""
+        self.task = asyncio.create_task(self.persist())
+
+    async def persist(self) -> None:
+        """Persist the names every ``NAMES_PERSIST_SECONDS``, forever."""
+        while True:
+            await asyncio.sleep(config.NAMES_PERSIST_SECONDS)
+            if not self.dirty:
+                continue
+            try:
+                # Copy on the event loop, write in a thread
+                await asyncio.to_thread(save_json, self.path, self.snapshot())
+            except OSError as error:
+                self.dirty = True
+                logger.warning("Could not persist names: %s", error)
+
+    async def close(self) -> None:
+        """Stop the periodic persistence and persist the names one last time."""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        if self.dirty:
+            save_json(self.path, self.snapshot())
@@ -0,0 +1,356 @@
+"""
+Outbound delivery layer for the Discord bot.
+
+Notifications used to be sent straight from each listener, so a failed send
+(a 5xx from Discord, a network error, a channel that is not cached yet) lost
+the notification. Cogs now hand their messages to the outbox instead, which
+journals them to a local SQLite file before delivery and removes them only
+once Discord has accepted them.
+
+Each destination channel has its own worker that delivers messages in the
+order they were queued. Failures are retried with exponential backoff and
+jitter, and consecutive sends are spaced by a minimum interval, so a backlog
+built up during an outage drains at a controlled rate once Discord recovers.
+Only one batch of messages per channel is ever held in memory.
+
+Messages are reshaped to fit Discord's embed limits before they are journaled
+(see ``utils.rendering``), so a message that is too large is split or sent
+with a text attachment instead of being rejected on every retry.
+
+A message can be given a key to make it replace the last message sent with
+the same key, such as the live summary of a poll. Only the newest queued
+message of a key is delivered, and it edits the message sent before, whose
+ID is remembered in the journal, rather than posting a new one.
+"""
+
+import asyncio
+import json
+import random
+import sqlite3
+import time
+import typing
+
+import aiohttp
+import discord
+from discord.ext import commands
+
+import config
+from logger_init import logger
+from utils.rendering import fit_message, message_kwargs
+
+# Number of journaled messages loaded per channel at a time
+BATCH_SIZE = 20
+
+# How often ``drain`` checks whether the journal is empty, in seconds
+DRAIN_POLL_SECONDS = 0.1
+
+# How long ``close`` waits for sends already on the wire, in seconds
+CLOSE_GRACE_SECONDS = 5
+
+# How long the message sent for a key is remembered, in seconds; longer than
+# the 32 days a poll can last
+POSTED_RETENTION_SECONDS = 35 * 24 * 60 * 60
+
+
+class ChannelUnavailable(Exception):
+    """Raised when a destination channel is not in the bot's cache."""
+
+
+class Outbox:
+    """Durable, ordered, rate-controlled delivery of messages to channels."""
+
+    def __init__(self, bot: commands.Bot, path: str) -> None:
+        """Open the journal and prepare the outbox.
+
+        Args:
+            bot (commands.Bot): The instance of the Discord bot.
+            path (str): The path of the SQLite journal.
+        """
+        self.bot = bot
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                queued_at REAL NOT NULL
+            )
+            """)
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_channel ON outbox (channel_id, id)"
+        )
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS posted (
+                key TEXT PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                posted_at REAL NOT NULL
+            )
+            """)
+        self.db.commit()
+
+        # channel ID -> worker task and its wake-up event
+        self.workers: typing.Dict[int, asyncio.Task] = {}
+        self.wakeups: typing.Dict[int, asyncio.Event] = {}
+        # Channels with a send on the wire, which close lets finish
+        self.sending: typing.Set[int] = set()
+        self.closing = False
+
+    def start(self) -> None:
+        """Resume delivery of every message left in the journal."""
+        self.db.execute(
+            "DELETE FROM posted WHERE posted_at < ?",
+            (time.time() - POSTED_RETENTION_SECONDS,),
+        )
+        self.db.commit()
+        rows = self.db.execute("SELECT DISTINCT channel_id FROM outbox").fetchall()
+        for (channel_id,) in rows:
+            self.wake(channel_id)
+        if rows:
+            logger.info("Resuming delivery to %d channel(s).", len(rows))
+
+    async def drain(self, timeout: float) -> int:
+        """Keep delivering until the journal is empty or the time is up.
+
+        Args:
+            timeout (float): The longest time to wait, in seconds.
+
+        Returns:
+            int: The number of messages still waiting to be delivered.
+        """
+        deadline = time.monotonic() + timeout
+        pending = self.pending()
+        # Workers only deliver once the bot is ready
+        while pending and self.bot.is_ready() and time.monotonic() < deadline:
+            await asyncio.sleep(DRAIN_POLL_SECONDS)
+            pending = self.pending()
+        return pending
+
+    async def close(self) -> None:
+        """Stop the workers and close the journal.
+
+        Undelivered messages stay in the journal and are resumed on the next start.
+        Sends already on the wire get ``CLOSE_GRACE_SECONDS`` to finish; a send
+        interrupted after that may be delivered twice, but is never lost.
+        """
+        self.closing = True
+        for channel_id, worker in self.workers.items():
+            if channel_id not in self.sending:
+                worker.cancel()
+        if self.sending:
+            await asyncio.wait(self.workers.values(), timeout=CLOSE_GRACE_SECONDS)
+        for worker in self.workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+        self.db.close()
+
+    def pending(self) -> int:
+        """Return the number of messages waiting to be delivered.
+
+        Returns:
+            int: The number of journaled messages.
+        """
+        return self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    async def send(
+        self,
+        channel_id: int,
+        *,
+        embed: typing.Optional[discord.Embed] = None,
+        content: typing.Optional[str] = None,
+        key: typing.Optional[str] = None,
+    ) -> None:
+        """Queue a message for delivery to a channel.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+            embed (discord.Embed | None): The embed to send.
+            content (str | None): The text content to send.
+            key (str | None): Set to replace the last message sent to the
+                channel with the same key instead of sending a new one.
+        """
+        embeds, attachment = fit_message(embed.to_dict()) if embed else ([], None)
+        payload = {"content": content, "embeds": embeds, "attachment": attachment}
+        if key:
+            payload["key"] = key
+        self.db.execute(
+            "INSERT INTO outbox (channel_id, payload, queued_at) VALUES (?, ?, ?)",
+            (channel_id, json.dumps(payload), time.time()),
+        )
+        self.db.commit()
+        self.wake(channel_id)
+
+    def wake(self, channel_id: int) -> None:
+        """Make sure the worker of a channel is running and looking for messages.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+        """
+        wakeup = self.wakeups.get(channel_id)
+        if wakeup is None:
+            wakeup = self.wakeups[channel_id] = asyncio.Event()
+        wakeup.set()
+
+        worker = self.workers.get(channel_id)
+        if worker is None or worker.done():
+            self.workers[channel_id] = asyncio.create_task(self.work(channel_id))
+
+    async def work(self, channel_id: int) -> None:
+        """Deliver the journaled messages of a channel in order, forever.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+        """
+        await self.bot.wait_until_ready()
+        wakeup = self.wakeups[channel_id]
+
+        while True:
+            wakeup.clear()
+            rows = self.db.execute(
+                "SELECT id, payload FROM outbox WHERE channel_id = ? ORDER BY id LIMIT ?",
+                (channel_id, BATCH_SIZE),
+            ).fetchall()
+            if not rows:
+                await wakeup.wait()
+                continue
+
+            for row_id, payload in rows:
+                payload = json.loads(payload)
+                if self.superseded(channel_id, row_id, payload.get("key")):
+                    self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                    self.db.commit()
+                    continue
+
+                await self.deliver(channel_id, payload)
+                self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                self.db.commit()
+                if self.closing:
+                    return
+                await asyncio.sleep(config.OUTBOX_SEND_INTERVAL)
+
+    def superseded(
+        self, channel_id: int, row_id: int, key: typing.Optional[str]
+    ) -> bool:
+        """Check whether a newer message with the same key is queued.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+            row_id (int): The journal ID of the message.
+            key (str | None): The key of the message.
+
+        Returns:
+            bool: True if the message does not need to be delivered.
+        """
+        if not key:
+            return False
+        row = self.db.execute(
+            "SELECT 1 FROM outbox WHERE channel_id = ? AND id > ?"
+            " AND json_extract(payload, '$.key') = ? LIMIT 1",
+            (channel_id, row_id, key),
+        ).fetchone()
+        return row is not None
+
+    async def deliver(self, channel_id: int, payload: dict) -> None:
+        """Send a single message, retrying until it is delivered or rejected.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+            payload (dict): The journaled message.
+        """
+        delay = config.OUTBOX_RETRY_BASE_SECONDS
+        while True:
+            self.sending.add(channel_id)
+            try:
+                await self.send_now(channel_id, payload)
+                return
+            except discord.HTTPException as error:
+                # Client errors other than rate limits will fail again on retry
+                if 400 <= error.status < 500 and error.status != 429:
+                    logger.error(
+                        "Dropping message for channel %s rejected by Discord: %s",
+                        channel_id,
+                        error,
+                    )
+                    return
+                reason = error
+            except (
+                ChannelUnavailable,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                OSError,
+            ) as error:
+                reason = error
+            finally:
+                self.sending.discard(channel_id)
+
+            # Full jitter keeps workers from retrying in lockstep
+            wait = random.uniform(0, min(delay, config.OUTBOX_RETRY_MAX_SECONDS))
+            logger.warning(
+                "Delivery to channel %s failed (%s), retrying in %.1fs.",
+                channel_id,
+                reason,
+                wait,
+            )
+            await asyncio.sleep(wait)
+            delay *= 2
+
+    async def send_now(self, channel_id: int, payload: dict) -> discord.Message:
+        """Send a journaled message to its channel, or edit the one it replaces.
+
+        Args:
+            channel_id (int): The ID of the destination channel.
+            payload (dict): The journaled message.
+
+        Raises:
+            ChannelUnavailable: If the channel is not in the bot's cache.
+
+        Returns:
+            discord.Message: The message that was sent.
+        """
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            raise ChannelUnavailable(f"Channel with ID {channel_id} not found.")
+
+        kwargs = message_kwargs(payload["embeds"], payload.get("attachment"))
+        key = payload.get("key")
+        if key:
+            row = self.db.execute(
+                "SELECT message_id FROM posted WHERE key = ? AND channel_id = ?",
+                (key, channel_id),
+            ).fetchone()
+            if row:
+                try:
+                    message = await channel.get_partial_message(row[0]).edit(
+                        content=payload["content"],
+                        embeds=kwargs["embeds"],
+                        attachments=kwargs["files"],
+                    )
+                except discord.NotFound:
+                    # The message was deleted, send a new one
+                    pass
+                else:
+                    self.remember(key, channel_id, message.id)
+                    return message
+
+        message = await channel.send(content=payload["content"], **kwargs)
+        if key:
+            self.remember(key, channel_id, message.id)
+        return message
+
+    def remember(self, key: str, channel_id: int, message_id: int) -> None:
+        """Record the message sent for a key, for the next message to replace.
+
+        Args:
+            key (str): The key of the message.
+            channel_id (int): The ID of the channel it was sent to.
+            message_id (int): The ID of the message.
+        """
+        self.db.execute(
+            "INSERT OR REPLACE INTO posted (key, channel_id, message_id, posted_at)"
+            " VALUES (?, ?, ?, ?)",
+            (key, channel_id, message_id, time.time()),
+        )
+        self.db.commit()
@@ -0,0 +1,245 @@
+"""
+Permission helpers for the Discord bot.
+
+Permissions are bitfields, and printing them as integers tells a moderator
+nothing. These helpers diff two bitfields with a few integer operations and
+name exactly which permissions were granted, revoked, or set in a channel
+overwrite. ``RoleMemberIndex`` keeps the members of every role without
+iterating over the members of the guild, and works out who actually gains a
+dangerous permission by checking only the members of the role, leaving out
+the ones who already had it through another role.
+"""
+
+import collections
+import typing
+
+import discord
+
+# Bit -> readable name of every permission known to discord.py
+FLAG_NAMES: typing.Dict[int, str] = {
+    value: name.replace("_", " ").title().replace("Tts", "TTS")
+    for name, value in discord.Permissions.VALID_FLAGS.items()
+}
+
+# Permissions that hand over control of the guild
+DANGEROUS = discord.Permissions(
+    administrator=True, manage_guild=True, ban_members=True
+).value
+
+
+def flag_bits(bits: int) -> typing.List[int]:
+    """Split a bitfield into its permissions.
+
+    Args:
+        bits (int): The bitfield.
+
+    Returns:
+        list[int]: The bit of every permission set, lowest first.
+    """
+    flags = []
+    while bits:
+        lowest = bits & -bits
+        flags.append(lowest)
+        bits ^= lowest
+    return flags
+
+
+def flag_name(bit: int) -> str:
+    """Name a single permission.
+
+    Args:
+        bit (int): The bit of the permission.
+
+    Returns:
+        str: The name of the permission.
+    """
+    return FLAG_NAMES.get(bit, f"Unknown ({bit})")
+
+
+def flag_names(bits: int) -> typing.List[str]:
+    """Name the permissions set in a bitfield.
+
+    Args:
+        bits (int): The bitfield.
+
+    Returns:
+        list[str]: The names of the permissions, lowest bit first.
+    """
+    return [flag_name(bit) for bit in flag_bits(bits)]
+
+
+def permission_diff(before: int, after: int) -> typing.Tuple[int, int]:
+    """Compare two permission bitfields.
+
+    Args:
+        before (int): The permissions before the change.
+        after (int): The permissions after the change.
+
+    Returns:
+        tuple[int, int]: The granted bits and the revoked bits.
+    """
+    changed = before ^ after
+    return changed & after, changed & before
+
+
+def describe_permissions(before: int, after: int) -> str:
+    """Describe the permissions granted and revoked by a change.
+
+    Args:
+        before (int): The permissions before the change.
+        after (int): The permissions after the change.
+
+    Returns:
+        str: One line for the granted and one for the revoked permissions.
+    """
+    granted, revoked = permission_diff(before, after)
+    lines = []
+    if granted:
+        lines.append(f"Granted: {', '.join(flag_names(granted))}")
+    if revoked:
+        lines.append(f"Revoked: {', '.join(flag_names(revoked))}")
+    return "\n".join(lines)
+
+
+def describe_overwrite(
+    before: typing.Optional[typing.Tuple[int, int]],
+    after: typing.Optional[typing.Tuple[int, int]],
+) -> str:
+    """Describe the change of a channel permission overwrite.
+
+    Args:
+        before (tuple[int, int] | None): The allowed and denied bits before.
+        after (tuple[int, int] | None): The allowed and denied bits after.
+
+    Returns:
+        str: The permissions newly allowed, denied and reset to neutral.
+    """
+    before_allow, before_deny = before or (0, 0)
+    after_allow, after_deny = after or (0, 0)
+    allowed = after_allow & ~before_allow
+    denied = after_deny & ~before_deny
+    reset = (before_allow | before_deny) & ~(after_allow | after_deny)
+
+    parts = []
+    if allowed:
+        parts.append(f"allowed {', '.join(flag_names(allowed))}")
+    if denied:
+        parts.append(f"denied {', '.join(flag_names(denied))}")
+    if reset:
+        parts.append(f"reset {', '.join(flag_names(reset))}")
+    return "; ".join(parts) or "no effective change"
+
+
+class RoleMemberIndex:
+    """Members holding each role, kept current incrementally."""
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        # role ID -> IDs of the members with the role
+        self.holders: typing.Dict[int, typing.Set[int]] = {}
+
+    def seed(self, guild: discord.Guild) -> None:
+        """Index the roles of every cached member of a guild.
+
+        Args:
+            guild (discord.Guild): The guild.
+        """
+        for member in guild.members:
+            self.add(member)
+
+    @staticmethod
+    def role_ids(member: discord.Member) -> typing.Set[int]:
+        """Return the IDs of the roles of a member, without @everyone.
+
+        Args:
+            member (discord.Member): The member.
+
+        Returns:
+            set[int]: The role IDs.
+        """
+        return {role.id for role in member.roles if not role.is_default()}
+
+    def add(self, member: discord.Member) -> None:
+        """Index a member that joined.
+
+        Args:
+            member (discord.Member): The member.
+        """
+        for role_id in self.role_ids(member):
+            self.holders.setdefault(role_id, set()).add(member.id)
+
+    def remove(self, member: discord.Member) -> None:
+        """Stop indexing a member that left.
+
+        Args:
+            member (discord.Member): The member.
+        """
+        for role_id in self.role_ids(member):
+            self.holders.get(role_id, set()).discard(member.id)
+
+    def update(self, before: discord.Member, after: discord.Member) -> None:
+        """Apply the role changes of a member.
+
+        Args:
+            before (discord.Member): The member before the update.
+            after (discord.Member): The member after the update.
+        """
+        before_ids, after_ids = self.role_ids(before), self.role_ids(after)
+        for role_id in after_ids - before_ids:
+            self.holders.setdefault(role_id, set()).add(after.id)
+        for role_id in before_ids - after_ids:
+            self.holders.get(role_id, set()).discard(after.id)
+
+    def drop(self, role: discord.Role) -> None:
+        """Forget a deleted role.
+
+        Args:
+            role (discord.Role): The role.
+        """
+        self.holders.pop(role.id, None)
+
+    def count(self, role: discord.Role) -> int:
+        """Return the number of members with a role.
+
+        Args:
+            role (discord.Role): The role.
+
+        Returns:
+            int: The number of members.
+        """
+        if role.is_default():
+            return role.guild.member_count or 0
+        return len(self.holders.get(role.id, ()))
+
+    def gaining(self, role: discord.Role, granted: int) -> typing.Counter[int]:
+        """Count the members of a role who gain permissions they did not have.
+
+        Only the members of the role are checked, against their other roles.
+        A grant to @everyone concerns every member, so it walks the guild.
+
+        Args:
+            role (discord.Role): The role, after the update.
+            granted (int): The bitfield of the permissions the role was granted.
+
+        Returns:
+            Counter[int]: Permission bit -> members who did not have it before.
+        """
+        guild = role.guild
+        if role.is_default():
+            members = guild.members
+        else:
+            members = filter(None, map(guild.get_member, self.holders.get(role.id, ())))
+
+        administrator = discord.Permissions(administrator=True).value
+        gains: typing.Counter[int] = collections.Counter()
+        for member in members:
+            if member.id == guild.owner_id:
+                continue
+            held = 0
+            for other in member.roles:
+                if other.id != role.id:
+                    held |= other.permissions.value
+            if held & administrator:
+                continue
+            gains.update(flag_bits(granted & ~held))
+        return gains
@@ -0,0 +1,264 @@
+"""
+Event pipeline for the Discord bot.
+
+Listeners used to detect a change, log it and build and send its embed all
+in the gateway dispatch path, so a slow consumer delayed every later event.
+Now a listener only describes what happened as an ``Event`` and hands it to
+``Pipeline.emit``, which returns immediately. Each sink (see ``utils.sinks``)
+has its own bounded queue and worker task and consumes events at its own
+pace, so a slow sink only fills its own queue. When a queue is full, its
+sink misses the event and the drop is counted. The gateway is never blocked.
+
+Adding a sink only means registering it with ``Pipeline.add_sink``. The cogs
+do not change.
+"""
+
+import asyncio
+import collections
+import logging
+import time
+import typing
+
+import discord
+
+import config
+from logger_init import logger
+
+
+class Event:
+    """A change observed by a listener.
+
+    The log line is kept as a format string and its arguments, so sinks that
+    do not need the text never pay for formatting it.
+    """
+
+    __slots__ = (
+        "kind",
+        "message",
+        "args",
+        "guild_id",
+        "actor_id",
+        "channel_id",
+        "embed",
+        "key",
+        "level",
+        "created_at",
+    )
+
+    def __init__(
+        self,
+        kind: str,
+        message: str,
+        *args: typing.Any,
+        guild_id: typing.Optional[int] = None,
+        actor_id: typing.Optional[int] = None,
+        channel_id: typing.Optional[int] = None,
+        embed: typing.Optional[discord.Embed] = None,
+        key: typing.Optional[str] = None,
+        level: int = logging.INFO,
+    ) -> None:
+        """Describe an event.
+
+        Args:
+            kind (str): The type of event, e.g. ``role.update``.
+            message (str): The log line, as a ``%``-style format string.
+            *args: The arguments of the log line.
+            guild_id (int | None): The ID of the guild the event happened in.
+            actor_id (int | None): The ID of the user behind the event, if known.
+            channel_id (int | None): The channel to notify, if any.
+            embed (discord.Embed | None): The notification to send, if any.
+            key (str | None): Set to make the notification replace the last
+                one sent with the same key, by editing it, instead of adding
+                a new message.
+            level (int): The logging level of the event.
+        """
+        self.kind = kind
+        self.message = message
+        self.args = args
+        self.guild_id = guild_id
+        self.actor_id = actor_id
+        self.channel_id = channel_id
+        self.embed = embed
+        self.key = key
+        self.level = level
+        self.created_at = time.time()
+
+    def summary(self) -> str:
+        """Format the log line of the event.
+
+        Returns:
+            str: The formatted log line.
+        """
+        return self.message % self.args if self.args else self.message
+
+
+class Sink:
+    """Base class of the consumers of the pipeline."""
+
+    # Name used in logs and statistics
+    name = "sink"
+
+    # Largest number of events handed to ``handle`` at once
+    batch_size = 1
+
+    # Whether events still queued when the pipeline closes are handled anyway,
+    # after the deadline; only for sinks whose ``handle`` is local and quick
+    keep_at_shutdown = False
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Consume a batch of events.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        raise NotImplementedError
+
+    def start(self) -> None:
+        """Start the background work of the sink, if it has any."""
+
+    async def close(self) -> None:
+        """Release the resources of the sink."""
+
+
+class Pipeline:
+    """Fan-out of events to sinks, each with its own queue and worker."""
+
+    def __init__(self, queue_size: int = config.PIPELINE_QUEUE_SIZE) -> None:
+        """Initialize an empty pipeline.
+
+        Args:
+            queue_size (int): The number of events each sink may fall behind by.
+        """
+        self.queue_size = queue_size
+        self.sinks: typing.List[typing.Tuple[Sink, asyncio.Queue]] = []
+        self.workers: typing.List[asyncio.Task] = []
+        # sink name -> number of events the sink missed because it was full
+        self.dropped: typing.Counter[str] = collections.Counter()
+        # sink name -> batch being handled
+        self.handling: typing.Dict[str, typing.List[Event]] = {}
+        # Set once the workers are stopped; events emitted later would be lost
+        self.closed = False
+
+    def add_sink(self, sink: Sink) -> None:
+        """Register a sink. Sinks added after ``start`` are started at once.
+
+        Args:
+            sink (Sink): The sink to register.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.sinks.append((sink, queue))
+        if self.workers:
+            sink.start()
+            self.workers.append(asyncio.create_task(self.run(sink, queue)))
+
+    def start(self) -> None:
+        """Start one worker per sink."""
+        for sink, _ in self.sinks:
+            sink.start()
+        self.workers = [
+            asyncio.create_task(self.run(sink, queue)) for sink, queue in self.sinks
+        ]
+
+    def emit(self, event: Event) -> None:
+        """Hand an event to every sink without waiting for any of them.
+
+        Args:
+            event (Event): The event to publish.
+        """
+        if self.closed:
+            logger.warning("Event emitted after shutdown: %s", event.summary())
+            return
+        for sink, queue in self.sinks:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped[sink.name] += 1
+                # Warn on the first drop and then every thousand, not every time
+                count = self.dropped[sink.name]
+                if count == 1 or count % 1000 == 0:
+                    logger.warning(
+                        "Sink %s is falling behind, %d event(s) dropped.",
+                        sink.name,
+                        count,
+                    )
+
+    async def run(self, sink: Sink, queue: asyncio.Queue) -> None:
+        """Feed the events of a queue to its sink, forever.
+
+        Args:
+            sink (Sink): The sink to feed.
+            queue (asyncio.Queue): The queue of the sink.
+        """
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < sink.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            # Left in place if the worker is cancelled, for ``close`` to keep
+            self.handling[sink.name] = batch
+            try:
+                await sink.handle(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception(
+                    "Sink %s failed to handle %d event(s).", sink.name, len(batch)
+                )
+            finally:
+                for _ in batch:
+                    queue.task_done()
+            del self.handling[sink.name]
+
+    def stats(self) -> typing.Dict[str, typing.Tuple[int, int]]:
+        """Return the backlog and drop count of every sink.
+
+        Returns:
+            dict[str, tuple[int, int]]: Queued and dropped events per sink name.
+        """
+        return {
+            sink.name: (queue.qsize(), self.dropped[sink.name])
+            for sink, queue in self.sinks
+        }
+
+    async def close(self, timeout: float = 10) -> None:
+        """Let the sinks catch up, then stop the workers and close the sinks.
+
+        Events still queued after ``timeout``, and the batches interrupted by
+        stopping the workers, are handed to the sinks marked
+        ``keep_at_shutdown`` in one batch (the outbox journals them for the
+        next start) and dropped for the others. An interrupted batch may be
+        handled twice, but is not lost.
+
+        Args:
+            timeout (float): The longest time to wait for the sinks, in seconds.
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for _, queue in self.sinks)), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Sinks did not catch up before the deadline: %s", self.stats()
+            )
+
+        self.closed = True
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+
+        for sink, queue in self.sinks:
+            leftover = self.handling.pop(sink.name, [])
+            leftover.extend(queue.get_nowait() for _ in range(queue.qsize()))
+            if leftover and sink.keep_at_shutdown:
+                try:
+                    await sink.handle(leftover)
+                except Exception:  # pylint: disable=broad-except
+                    logger.exception(
+                        "Sink %s failed to keep %d event(s) at shutdown.",
+                        sink.name,
+                        len(leftover),
+                    )
+            elif leftover:
+                logger.warning(
+                    "Sink %s dropped %d event(s) at shutdown.", sink.name, len(leftover)
+                )
+            await sink.close()
@@ -0,0 +1,105 @@
+"""
+Redaction stage for message content.
+
+Message content used to flow unfiltered into the log file, the content store
+and the notification embeds. ``redact`` masks credentials and personal
+details before any of them see the text. It runs once per event and its
+result is shared by all three, so the cost is paid once.
+
+The patterns are compiled at import time, and each one only runs when a
+cheap substring check shows the message could contain a match, so ordinary
+chat messages are returned after a few scans in C.
+"""
+
+import re
+import typing
+
+# Placeholder written in place of each kind of redacted content
+PLACEHOLDERS: typing.Dict[str, str] = {
+    "token": "[redacted token]",
+    "invite": "[redacted invite]",
+    "email": "[redacted email]",
+    "phone": "[redacted phone]",
+}
+
+# Phone numbers have at most 15 digits (E.164); longer runs are Discord IDs
+PHONE_DIGITS = range(9, 16)
+
+# Discord bot and user tokens: base64 user ID, timestamp and HMAC
+TOKEN = re.compile(r"[\w-]{23,28}\.[\w-]{6,7}\.[\w-]{27,40}")
+# The timestamp part between two dots, which ordinary text rarely has
+TOKEN_HINT = re.compile(r"\.[\w-]{6,7}\.")
+
+INVITE = re.compile(
+    r"(?:https?://)?(?:www\.)?(?:discord(?:app)?\.com/invite|discord\.gg)/[\w-]+",
+    re.IGNORECASE,
+)
+
+EMAIL = re.compile(r"[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+# An "@" with an address character before it, unlike "<@id>" mentions
+EMAIL_HINT = re.compile(r"[\w.%+-]@")
+
+# Runs of digits and separators long enough to hold a phone number, checked
+# against PHONE one at a time
+PHONE_RUN = re.compile(r"[+(\d][\d ().+-]{7,}\d")
+# A number with a country code, or an area code (in parentheses or followed
+# by a separator) and two groups of 3 or 4 digits. Bare digit runs, dates such
+# as "2024 01 15" and dotted quads such as IPv4 addresses do not fit either.
+PHONE = re.compile(
+    r"\+\d{1,3}(?:[ .-]?\(\d{1,4}\))?(?:[ .-]?\d{1,4}){2,6}"
+    r"|(?:\(\d{2,5}\) ?|\d{2,5}[ .-])\d{3,4}[ .-]?\d{3,4}"
+)
+
+# Characters that mark a digit run as part of a mention, emoji, URL or word
+_NOT_BEFORE_PHONE = frozenset("<@#&:/_")
+_NOT_AFTER_PHONE = frozenset(">_")
+
+
+def _phone(match: re.Match) -> str:
+    """Redact a digit run if it is a phone number.
+
+    Args:
+        match (re.Match): A match of ``PHONE_RUN``.
+
+    Returns:
+        str: The placeholder, or the original text if it is not a phone number.
+    """
+    text, string = match.group(), match.string
+    start, end = match.span()
+    before = string[start - 1] if start else " "
+    after = string[end] if end < len(string) else " "
+    if (
+        before.isalnum()
+        or before in _NOT_BEFORE_PHONE
+        or after.isalnum()
+        or after in _NOT_AFTER_PHONE
+    ):
+        return text
+
+    if (
+        sum(char.isdigit() for char in text) not in PHONE_DIGITS
+        or PHONE.fullmatch(text) is None
+    ):
+        return text
+    return PLACEHOLDERS["phone"]
+
+
+def redact(text: str) -> str:
+    """Mask tokens, invite links, email addresses and phone numbers in text.
+
+    Args:
+        text (str): The text to redact.
+
+    Returns:
+        str: The redacted text.
+    """
+    if not text:
+        return text
+
+    if "." in text and TOKEN_HINT.search(text):
+        text = TOKEN.sub(PLACEHOLDERS["token"], text)
+    if "/" in text and "discord" in text.lower():
+        text = INVITE.sub(PLACEHOLDERS["invite"], text)
+    if "@" in text and EMAIL_HINT.search(text):
+        text = EMAIL.sub(PLACEHOLDERS["email"], text)
+    return PHONE_RUN.sub(_phone, text)
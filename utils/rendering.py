@@ -0,0 +1,249 @@
+"""
+Message rendering stage for the Discord bot.
+
+Embeds built by the cogs can outgrow Discord's limits: a long message edit
+does not fit in a 1024-character field, and a channel update with many
+changed attributes can exceed 25 fields or 6000 characters. Such messages
+used to be rejected by Discord. This module measures a message once before
+it is queued and reshapes it to fit in a single request, either by spreading
+the fields over several embeds or, when the content is too large for any
+embed, by attaching the full text as a file next to a shortened embed.
+"""
+
+import difflib
+import io
+import typing
+
+import discord
+from discord.utils import escape_markdown
+
+from utils.content_store import tokenize
+from utils.embeds import (
+    FIELD_COUNT_LIMIT,
+    TITLE_LIMIT,
+    TOTAL_LIMIT,
+    truncate,
+)
+
+# Discord accepts at most this many embeds in one message
+EMBEDS_PER_MESSAGE = 10
+
+# Name of the attachment used when a message does not fit in embeds
+ATTACHMENT_NAME = "details.txt"
+
+# Field added to a shortened embed whose full text is attached
+ATTACHMENT_FIELD = "Attachment"
+ATTACHMENT_NOTICE = "The full details are attached as a file."
+
+
+def embed_length(data: dict) -> int:
+    """Count the characters of an embed the way Discord does.
+
+    Args:
+        data (dict): The embed, in Discord's dict format.
+
+    Returns:
+        int: The number of characters counted against the total limit.
+    """
+    total = len(data.get("title", "")) + len(data.get("description", ""))
+    for field in data.get("fields", ()):
+        total += len(field["name"]) + len(field["value"])
+    total += len(data.get("footer", {}).get("text", ""))
+    total += len(data.get("author", {}).get("name", ""))
+    return total
+
+
+def _mark(text: str, marker: str) -> str:
+    """Wrap text in a Markdown marker, keeping surrounding whitespace outside it.
+
+    Args:
+        text (str): The text to wrap.
+        marker (str): The Markdown marker, e.g. ``**``.
+
+    Returns:
+        str: The wrapped text.
+    """
+    core = text.strip()
+    if not core:
+        return text
+    start = text.index(core)
+    return (
+        f"{text[:start]}{marker}{escape_markdown(core)}{marker}"
+        f"{text[start + len(core):]}"
+    )
+
+
+def word_diff(before: str, after: str, context: int = 4) -> str:
+    """Render the word-level changes between two texts as Markdown.
+
+    Removed words are struck through and added words are bolded. Unchanged
+    runs longer than the context are shortened to an ellipsis.
+
+    Args:
+        before (str): The original text.
+        after (str): The new text.
+        context (int): The number of unchanged words kept around each change.
+
+    Returns:
+        str: The rendered changes.
+    """
+    old, new = tokenize(before), tokenize(after)
+    opcodes = difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes()
+    # Tokens alternate between words and whitespace
+    keep = context * 2
+
+    parts = []
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            tokens = old[i1:i2]
+            head = tokens[:keep] if index > 0 else []
+            tail = tokens[-keep:] if index < len(opcodes) - 1 else []
+            if len(tokens) > len(head) + len(tail):
+                parts.append(escape_markdown("".join(head)))
+                parts.append(" … " if head and tail else "… " if tail else " …")
+                parts.append(escape_markdown("".join(tail)))
+            else:
+                parts.append(escape_markdown("".join(tokens)))
+            continue
+        if i2 > i1:
+            parts.append(_mark("".join(old[i1:i2]), "~~"))
+        if j2 > j1:
+            parts.append(_mark("".join(new[j1:j2]), "**"))
+    return "".join(parts)
+
+
+def to_text(data: dict) -> str:
+    """Render an embed as plain text.
+
+    Args:
+        data (dict): The embed, in Discord's dict format.
+
+    Returns:
+        str: The embed content as plain text.
+    """
+    parts = [data.get("title", ""), data.get("description", "")]
+    for field in data.get("fields", ()):
+        parts.append(f"{field['name']}:\n{field['value']}")
+    return "\n\n".join(part for part in parts if part) + "\n"
+
+
+def _cut(text: str, limit: int) -> str:
+    """Clip text to a length, or drop it if no room is left.
+
+    Args:
+        text (str): The text to clip.
+        limit (int): The number of characters left for it.
+
+    Returns:
+        str: The clipped text, empty if ``limit`` is not positive.
+    """
+    return truncate(text, limit) if limit > 0 else ""
+
+
+def fit_message(
+    data: dict,
+) -> typing.Tuple[typing.List[dict], typing.Optional[typing.Tuple[str, str]]]:
+    """Reshape an embed so it can be sent in a single message.
+
+    Args:
+        data (dict): The embed, in Discord's dict format.
+
+    Returns:
+        tuple[list[dict], tuple[str, str] | None]: The embeds to send, and the
+            name and content of a text attachment if one is needed.
+
+    Examples:
+        A full description and footer leave no room for the notice of the
+        attachment, so they are cut to fit the total limit:
+
+        >>> embeds, attachment = fit_message(
+        ...     {
+        ...         "description": "d" * 4096,
+        ...         "footer": {"text": "f" * 2048},
+        ...         "fields": [{"name": "n", "value": "v" * 1024}] * 30,
+        ...     }
+        ... )
+        >>> embed_length(embeds[0]) <= TOTAL_LIMIT, attachment[0]
+        (True, 'details.txt')
+    """
+    fields = data.get("fields", [])
+    length = embed_length(data)
+    if len(fields) <= FIELD_COUNT_LIMIT and length <= TOTAL_LIMIT:
+        return [data], None
+
+    if length <= TOTAL_LIMIT:
+        # Only the field count is too high: continue the fields in more embeds
+        title = truncate(f"{data.get('title', '')} (continued)", TITLE_LIMIT)
+        embeds = []
+        for start in range(0, len(fields), FIELD_COUNT_LIMIT):
+            chunk = fields[start : start + FIELD_COUNT_LIMIT]
+            if start == 0:
+                embeds.append({**data, "fields": chunk})
+            else:
+                embeds.append(
+                    {
+                        "type": "rich",
+                        "title": title,
+                        "color": data.get("color"),
+                        "fields": chunk,
+                    }
+                )
+        # The title repeated on each continuation counts against the limit too
+        if (
+            len(embeds) <= EMBEDS_PER_MESSAGE
+            and sum(map(embed_length, embeds)) <= TOTAL_LIMIT
+        ):
+            return embeds, None
+
+    # Too large for embeds: keep what fits and attach the full text
+    shortened = {**data, "fields": []}
+    notice = len(ATTACHMENT_FIELD) + len(ATTACHMENT_NOTICE)
+    # The description and footer alone may leave no room for the notice;
+    # cut the footer first, then the description
+    excess = embed_length(shortened) + notice - TOTAL_LIMIT
+    if excess > 0 and "footer" in shortened:
+        text = shortened["footer"].get("text", "")
+        excess -= len(text)
+        shortened["footer"] = {**shortened["footer"], "text": _cut(text, -excess)}
+        if not shortened["footer"]["text"]:
+            del shortened["footer"]
+        excess = max(excess, 0)
+    if excess > 0 and "description" in shortened:
+        text = shortened["description"]
+        shortened["description"] = _cut(text, len(text) - excess)
+        if not shortened["description"]:
+            del shortened["description"]
+
+    budget = TOTAL_LIMIT - embed_length(shortened) - notice
+    for field in fields:
+        budget -= len(field["name"]) + len(field["value"])
+        if budget < 0 or len(shortened["fields"]) == FIELD_COUNT_LIMIT - 1:
+            break
+        shortened["fields"].append(field)
+    shortened["fields"].append(
+        {"name": ATTACHMENT_FIELD, "value": ATTACHMENT_NOTICE, "inline": False}
+    )
+    return [shortened], (ATTACHMENT_NAME, to_text(data))
+
+
+def message_kwargs(
+    embeds: typing.List[dict], attachment: typing.Optional[typing.Tuple[str, str]]
+) -> dict:
+    """Build the keyword arguments to send a message reshaped by :func:`fit_message`.
+
+    Args:
+        embeds (list[dict]): The embeds, in Discord's dict format.
+        attachment (tuple[str, str] | None): The name and content of the text
+            attachment, if any.
+
+    Returns:
+        dict: The ``embeds`` and ``files`` arguments for ``Messageable.send``.
+    """
+    files = []
+    if attachment:
+        name, text = attachment
+        files.append(discord.File(io.BytesIO(text.encode("utf-8")), filename=name))
+    return {
+        "embeds": [discord.Embed.from_dict(embed) for embed in embeds],
+        "files": files,
+    }
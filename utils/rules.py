@@ -0,0 +1,247 @@
+"""
+Event filtering and sampling rules for the Discord bot.
+
+Busy servers do not want every reaction or nickname change reported. Rules
+are read from a JSON file (``config.RULES_FILE``) as a list of objects such as:
+
+    [
+        {"event": "reaction.summary", "channel": 123, "action": "ignore"},
+        {"event": "member.update", "action": "sample", "every": 10},
+        {"event": "*", "user": 456, "action": "ignore"},
+        {"event": "message.delete", "role": 789, "action": "route", "to": 111},
+        {"event": "invite.create", "action": "digest", "period": "hourly"}
+    ]
+
+``event`` is an event kind (see ``utils.pipeline``) or ``*`` for all of them,
+and at most one of ``user``, ``role`` or ``channel`` narrows the rule. The
+actions are ``ignore``, ``sample`` (keep one event in ``every``) and
+``route`` (notify channel ``to`` instead of the default one).
+
+A ``digest`` rule applies to a whole kind. Its events are still logged and
+stored, but instead of one notification each they are summed up in one
+``hourly`` or ``daily`` digest per channel (see ``utils.sinks.DigestSink``).
+
+The rules are compiled into a hash table keyed by kind, scope and ID, so
+checking an event costs a fixed number of dictionary lookups however many
+rules there are (plus one per role of the member, for kinds with role
+rules). Kinds without any rule return after a single set lookup.
+Listeners check the rules before building embeds or log lines, so ignored
+events cost almost nothing.
+"""
+
+import typing
+
+import discord
+
+from utils.storage import load_json
+
+IGNORE = "ignore"
+SAMPLE = "sample"
+ROUTE = "route"
+DIGEST = "digest"
+
+# Length of each digest period, in seconds
+PERIODS = {"hourly": 3600, "daily": 86400}
+
+# Scopes from the most to the least specific; None matches the whole kind
+SCOPES = ("user", "role", "channel", None)
+
+ANY_KIND = "*"
+
+
+class Decision:
+    """The compiled action of a single rule."""
+
+    __slots__ = ("action", "every", "channel_id", "seen")
+
+    def __init__(
+        self, action: str, every: int = 1, channel_id: typing.Optional[int] = None
+    ) -> None:
+        """Initialize a decision.
+
+        Args:
+            action (str): One of ``ignore``, ``sample`` or ``route``.
+            every (int): For ``sample``, keep one event in this many.
+            channel_id (int | None): For ``route``, the channel to notify.
+        """
+        self.action = action
+        self.every = every
+        self.channel_id = channel_id
+        self.seen = 0
+
+    def apply(self, default: int) -> typing.Optional[int]:
+        """Decide where an event goes.
+
+        Args:
+            default (int): The channel the event is normally sent to.
+
+        Returns:
+            int | None: The channel to notify, or None to drop the event.
+        """
+        if self.action == IGNORE:
+            return None
+        if self.action == ROUTE:
+            return self.channel_id
+
+        # Keep the first event and then one in every N
+        keep = self.seen % self.every == 0
+        self.seen += 1
+        return default if keep else None
+
+
+def compile_rule(rule: dict) -> typing.Tuple[tuple, Decision]:
+    """Compile a rule from the rules file.
+
+    Args:
+        rule (dict): The rule as written in the rules file.
+
+    Raises:
+        ValueError: If the rule is malformed.
+
+    Returns:
+        tuple[tuple, Decision]: The lookup key and the decision of the rule.
+    """
+    scopes = [scope for scope in SCOPES if scope and scope in rule]
+    if len(scopes) > 1:
+        raise ValueError(f"Rule {rule} has more than one of user, role and channel.")
+    scope = scopes[0] if scopes else None
+    key = (rule.get("event", ANY_KIND), scope, int(rule[scope]) if scope else None)
+
+    action = rule.get("action")
+    if action == IGNORE:
+        decision = Decision(IGNORE)
+    elif action == SAMPLE:
+        every = int(rule.get("every", 0))
+        if every < 1:
+            raise ValueError(f"Rule {rule} needs a positive 'every'.")
+        decision = Decision(SAMPLE, every=every)
+    elif action == ROUTE:
+        if "to" not in rule:
+            raise ValueError(f"Rule {rule} needs a destination channel 'to'.")
+        decision = Decision(ROUTE, channel_id=int(rule["to"]))
+    else:
+        raise ValueError(f"Rule {rule} has an unknown action {action!r}.")
+    return key, decision
+
+
+def compile_digest(rule: dict) -> typing.Tuple[str, int]:
+    """Compile a digest rule from the rules file.
+
+    Args:
+        rule (dict): The rule as written in the rules file.
+
+    Raises:
+        ValueError: If the rule is malformed.
+
+    Returns:
+        tuple[str, int]: The event kind and the digest period in seconds.
+    """
+    if any(scope in rule for scope in SCOPES if scope):
+        raise ValueError(f"Digest rule {rule} cannot have a user, role or channel.")
+    period = rule.get("period", "hourly")
+    if period not in PERIODS:
+        raise ValueError(f"Digest rule {rule} needs a period of {', '.join(PERIODS)}.")
+    return rule.get("event", ANY_KIND), PERIODS[period]
+
+
+class Rules:
+    """Compiled lookup tables of the filtering rules."""
+
+    def __init__(self, rules: typing.Iterable[dict] = ()) -> None:
+        """Compile a list of rules. Later rules replace earlier ones with the same key.
+
+        Args:
+            rules (Iterable[dict]): The rules, as written in the rules file.
+
+        Raises:
+            ValueError: If a rule is malformed.
+        """
+        rules = list(rules)
+        # (kind, scope, ID) -> decision
+        self.table: typing.Dict[tuple, Decision] = dict(
+            compile_rule(rule) for rule in rules if rule.get("action") != DIGEST
+        )
+        # kind -> digest period in seconds
+        self.digests: typing.Dict[str, int] = dict(
+            compile_digest(rule) for rule in rules if rule.get("action") == DIGEST
+        )
+        self.kinds = {kind for kind, _, _ in self.table}
+        # Kinds with role rules, the only ones that need the roles of a member
+        self.role_kinds = {kind for kind, scope, _ in self.table if scope == "role"}
+
+    @classmethod
+    def load(cls, path: str) -> "Rules":
+        """Load the rules file. A missing file means no rules.
+
+        Args:
+            path (str): The path of the rules file.
+
+        Returns:
+            Rules: The compiled rules.
+        """
+        return cls(load_json(path, []))
+
+    def route(
+        self,
+        kind: str,
+        default: int,
+        *,
+        channel_id: typing.Optional[int] = None,
+        user: typing.Optional[typing.Union[discord.User, discord.Member]] = None,
+    ) -> typing.Optional[int]:
+        """Decide whether and where to report an event.
+
+        The most specific matching rule wins: user, then role, then channel,
+        then the whole kind. A rule for the exact kind wins over a ``*`` rule
+        of the same scope.
+
+        Args:
+            kind (str): The kind of the event.
+            default (int): The channel the event is normally sent to.
+            channel_id (int | None): The channel the event happened in.
+            user (discord.User | discord.Member | None): The user behind the event.
+
+        Returns:
+            int | None: The channel to notify, or None to drop the event.
+        """
+        if kind not in self.kinds and ANY_KIND not in self.kinds:
+            return default
+
+        table = self.table
+        kinds = (kind, ANY_KIND)
+        if user is not None:
+            for key_kind in kinds:
+                decision = table.get((key_kind, "user", user.id))
+                if decision is not None:
+                    return decision.apply(default)
+
+            if kind in self.role_kinds or ANY_KIND in self.role_kinds:
+                for role in getattr(user, "roles", ()):
+                    for key_kind in kinds:
+                        decision = table.get((key_kind, "role", role.id))
+                        if decision is not None:
+                            return decision.apply(default)
+
+        if channel_id is not None:
+            for key_kind in kinds:
+                decision = table.get((key_kind, "channel", channel_id))
+                if decision is not None:
+                    return decision.apply(default)
+
+        for key_kind in kinds:
+            decision = table.get((key_kind, None, None))
+            if decision is not None:
+                return decision.apply(default)
+        return default
+
+    def digest_period(self, kind: str) -> typing.Optional[int]:
+        """Return the digest period of an event kind.
+
+        Args:
+            kind (str): The kind of the event.
+
+        Returns:
+            int | None: The period in seconds, or None to notify every event.
+        """
+        period = self.digests.get(kind)
+        return period if period is not None else self.digests.get(ANY_KIND)
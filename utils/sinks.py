@@ -0,0 +1,302 @@
+"""
+Sinks of the event pipeline.
+
+Each sink consumes the events emitted by the cogs through ``utils.pipeline``
+in its own worker task:
+
+- ``LogSink`` writes the log line of each event to the bot's logger.
+- ``DiscordSink`` queues the notification embed of each event in the outbox.
+- ``DigestSink`` sums up the events of the kinds with a ``digest`` rule and
+  sends one digest per channel every hour or day instead.
+- ``SQLiteSink`` keeps a searchable history of events in a local file.
+- ``MetricsSink`` counts events per kind.
+"""
+
+import asyncio
+import collections
+import sqlite3
+import time
+import typing
+
+import discord
+
+from logger_init import logger
+from utils.embeds import EmbedTemplate
+from utils.outbox import Outbox
+from utils.pipeline import Event, Sink
+from utils.rules import Rules
+
+DIGEST = EmbedTemplate("Digest", discord.Color.light_grey(), timestamp=True)
+
+# Bounds of the memory a digest holds, however many events it sums up
+DIGEST_ACTORS = 100
+DIGEST_TOP_ACTORS = 5
+DIGEST_SAMPLES = 10
+
+# How often pending digests are checked for being due, in seconds
+DIGEST_CHECK_SECONDS = 60
+
+
+class LogSink(Sink):
+    """Write events to the bot's log."""
+
+    name = "log"
+    batch_size = 50
+    keep_at_shutdown = True
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Log a batch of events.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        for event in events:
+            logger.log(event.level, event.message, *event.args)
+
+
+class DiscordSink(Sink):
+    """Send the notification of each event to its channel through the outbox."""
+
+    name = "discord"
+    keep_at_shutdown = True
+
+    def __init__(self, outbox: Outbox, rules: typing.Optional[Rules] = None) -> None:
+        """Initialize the sink.
+
+        Args:
+            outbox (Outbox): The outbox that delivers the notifications.
+            rules (Rules | None): The rules, whose digested kinds are left to
+                the ``DigestSink``.
+        """
+        self.outbox = outbox
+        self.rules = rules
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Queue the notifications of a batch of events.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        for event in events:
+            if event.embed is None or event.channel_id is None:
+                continue
+            if self.rules and self.rules.digest_period(event.kind):
+                continue
+            await self.outbox.send(event.channel_id, embed=event.embed, key=event.key)
+
+
+class Digest:
+    """The events of one channel and period, summed up in bounded memory."""
+
+    __slots__ = ("started_at", "due_at", "counts", "actors", "others", "samples")
+
+    def __init__(self, period: int) -> None:
+        """Start an empty digest.
+
+        Args:
+            period (int): The length of the period, in seconds.
+        """
+        now = time.time()
+        self.started_at = now
+        # Aligned to the clock, e.g. on the hour for hourly digests
+        self.due_at = (now // period + 1) * period
+        self.counts: typing.Counter[str] = collections.Counter()
+        # kind -> actor ID -> events; at most DIGEST_ACTORS actors per kind
+        self.actors: typing.Dict[str, typing.Counter[int]] = {}
+        # kind -> events by actors beyond DIGEST_ACTORS
+        self.others: typing.Counter[str] = collections.Counter()
+        self.samples: typing.Deque[str] = collections.deque(maxlen=DIGEST_SAMPLES)
+
+    def add(self, event: Event) -> None:
+        """Count an event.
+
+        Args:
+            event (Event): The event.
+        """
+        self.counts[event.kind] += 1
+        if event.actor_id is not None:
+            actors = self.actors.get(event.kind)
+            if actors is None:
+                actors = self.actors[event.kind] = collections.Counter()
+            if event.actor_id in actors or len(actors) < DIGEST_ACTORS:
+                actors[event.actor_id] += 1
+            else:
+                self.others[event.kind] += 1
+        self.samples.append(event.summary())
+
+    def render(self) -> discord.Embed:
+        """Build the digest message.
+
+        Returns:
+            discord.Embed: The digest.
+        """
+        fields = []
+        for kind, count in self.counts.most_common():
+            lines = [
+                f"<@{actor_id}>: {events}"
+                for actor_id, events in self.actors.get(kind, {}).most_common(
+                    DIGEST_TOP_ACTORS
+                )
+            ]
+            if self.others[kind]:
+                lines.append(f"Others: {self.others[kind]}")
+            fields.append((f"{kind}: {count}", "\n".join(lines) or "No actors known"))
+        fields.append(("Latest", "\n".join(self.samples)))
+
+        return DIGEST.render(
+            f"{sum(self.counts.values())} event(s) between "
+            f"<t:{int(self.started_at)}:f> and <t:{int(time.time())}:f>.",
+            extra=fields,
+        )
+
+
+class DigestSink(Sink):
+    """Sum up the events of digested kinds and send one digest per period."""
+
+    name = "digest"
+    batch_size = 200
+    keep_at_shutdown = True
+
+    def __init__(self, outbox: Outbox, rules: Rules) -> None:
+        """Initialize the sink.
+
+        Args:
+            outbox (Outbox): The outbox that delivers the digests.
+            rules (Rules): The rules that name the digested kinds.
+        """
+        self.outbox = outbox
+        self.rules = rules
+        # (channel ID, period) -> events since the last digest
+        self.digests: typing.Dict[typing.Tuple[int, int], Digest] = {}
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sending digests when they are due."""
+        if self.rules.digests:
+            self.task = asyncio.create_task(self.run())
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Add a batch of events to their digests.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        for event in events:
+            if event.embed is None or event.channel_id is None:
+                continue
+            period = self.rules.digest_period(event.kind)
+            if not period:
+                continue
+            digest = self.digests.get((event.channel_id, period))
+            if digest is None:
+                digest = self.digests[(event.channel_id, period)] = Digest(period)
+            digest.add(event)
+
+    async def flush(self, everything: bool = False) -> None:
+        """Send the digests that are due.
+
+        Args:
+            everything (bool): Send every pending digest, due or not.
+        """
+        now = time.time()
+        due = [
+            key
+            for key, digest in self.digests.items()
+            if everything or digest.due_at <= now
+        ]
+        for key in due:
+            digest = self.digests.pop(key)
+            await self.outbox.send(key[0], embed=digest.render())
+
+    async def run(self) -> None:
+        """Send the digests when they are due, forever."""
+        while True:
+            await asyncio.sleep(DIGEST_CHECK_SECONDS)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop the schedule and send every pending digest."""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        await self.flush(everything=True)
+
+
+class SQLiteSink(Sink):
+    """Keep the history of events in a local SQLite file."""
+
+    name = "sqlite"
+    batch_size = 200
+    keep_at_shutdown = True
+
+    def __init__(self, path: str) -> None:
+        """Open the event history.
+
+        Args:
+            path (str): The path of the SQLite file.
+        """
+        # Batches are written from a worker thread to keep the event loop free
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                kind TEXT NOT NULL,
+                guild_id INTEGER,
+                summary TEXT NOT NULL
+            )
+            """)
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS events_kind ON events (kind, created_at)"
+        )
+        self.db.commit()
+
+    def write(self, rows: typing.List[tuple]) -> None:
+        """Insert a batch of rows in one transaction.
+
+        Args:
+            rows (list[tuple]): The rows to insert.
+        """
+        self.db.executemany(
+            "INSERT INTO events (created_at, kind, guild_id, summary) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self.db.commit()
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Store a batch of events.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        rows = [
+            (event.created_at, event.kind, event.guild_id, event.summary())
+            for event in events
+        ]
+        await asyncio.to_thread(self.write, rows)
+
+    async def close(self) -> None:
+        """Close the event history."""
+        self.db.close()
+
+
+class MetricsSink(Sink):
+    """Count events per kind."""
+
+    name = "metrics"
+    batch_size = 200
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.counts: typing.Counter[str] = collections.Counter()
+
+    async def handle(self, events: typing.List[Event]) -> None:
+        """Count a batch of events.
+
+        Args:
+            events (list[Event]): The events, oldest first.
+        """
+        self.counts.update(event.kind for event in events)
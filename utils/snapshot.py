@@ -0,0 +1,345 @@
+"""
+Server snapshots for the Discord bot.
+
+The channel and role listeners only see changes made while the bot is
+connected. A snapshot records the structure of a guild (the channel tree,
+permission overwrites and role permissions) so that anything that changed
+while the bot was offline can be found by comparing it with the live guild.
+
+Every channel and role is stored as a compact JSON record with a short
+content hash. Comparing two snapshots only looks inside the objects whose
+hashes differ. Saving a new snapshot only rewrites the rows whose hash
+changed, so re-snapshotting a large, mostly unchanged guild costs little.
+"""
+
+import hashlib
+import json
+import sqlite3
+import typing
+
+import discord
+
+CHANNELS = "channels"
+ROLES = "roles"
+KINDS = (CHANNELS, ROLES)
+
+# Overwrite target types, as in Discord's API
+ROLE_TARGET = 0
+MEMBER_TARGET = 1
+
+# kind -> object ID -> (hash, record)
+Snapshot = typing.Dict[str, typing.Dict[int, typing.Tuple[str, dict]]]
+
+
+class ObjectChange(typing.NamedTuple):
+    """The changed fields of a single channel or role."""
+
+    object_id: int
+    # field -> (old value, new value)
+    fields: typing.Dict[str, typing.Tuple[typing.Any, typing.Any]]
+
+
+class Drift(typing.NamedTuple):
+    """The differences between two snapshots of one kind of object."""
+
+    added: typing.Dict[int, dict]
+    removed: typing.Dict[int, dict]
+    changed: typing.List[ObjectChange]
+
+    def __bool__(self) -> bool:
+        """Return whether anything changed."""
+        return bool(self.added or self.removed or self.changed)
+
+
+def digest(record: dict) -> str:
+    """Hash a record.
+
+    Args:
+        record (dict): The record to hash.
+
+    Returns:
+        str: A short, stable hash of the record's content.
+    """
+    data = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def channel_record(channel: discord.abc.GuildChannel) -> dict:
+    """Serialize the structure of a channel.
+
+    Args:
+        channel (discord.abc.GuildChannel): The channel.
+
+    Returns:
+        dict: The record of the channel.
+    """
+    overwrites = {}
+    for target, overwrite in channel.overwrites.items():
+        allow, deny = overwrite.pair()
+        target_type = ROLE_TARGET if isinstance(target, discord.Role) else MEMBER_TARGET
+        overwrites[str(target.id)] = [target_type, allow.value, deny.value]
+
+    return {
+        "name": channel.name,
+        "type": str(channel.type),
+        "category": channel.category_id,
+        "position": channel.position,
+        "topic": getattr(channel, "topic", None),
+        "nsfw": getattr(channel, "nsfw", False),
+        "slowmode": getattr(channel, "slowmode_delay", 0),
+        "overwrites": overwrites,
+    }
+
+
+def role_record(role: discord.Role) -> dict:
+    """Serialize the structure of a role.
+
+    Args:
+        role (discord.Role): The role.
+
+    Returns:
+        dict: The record of the role.
+    """
+    return {
+        "name": role.name,
+        "permissions": role.permissions.value,
+        "position": role.position,
+        "color": role.color.value,
+        "hoist": role.hoist,
+        "mentionable": role.mentionable,
+    }
+
+
+def entry(record: dict) -> typing.Tuple[str, dict]:
+    """Pair a record with its hash.
+
+    Args:
+        record (dict): The record.
+
+    Returns:
+        tuple[str, dict]: The hash and the record.
+    """
+    return digest(record), record
+
+
+def take_snapshot(guild: discord.Guild) -> Snapshot:
+    """Snapshot the structure of a guild.
+
+    Args:
+        guild (discord.Guild): The guild.
+
+    Returns:
+        Snapshot: The records of its channels and roles.
+    """
+    return {
+        CHANNELS: {
+            channel.id: entry(channel_record(channel)) for channel in guild.channels
+        },
+        ROLES: {role.id: entry(role_record(role)) for role in guild.roles},
+    }
+
+
+def root_hash(snapshot: Snapshot) -> str:
+    """Hash a whole snapshot from the hashes of its objects.
+
+    Args:
+        snapshot (Snapshot): The snapshot.
+
+    Returns:
+        str: The hash of the snapshot.
+    """
+    hasher = hashlib.blake2b(digest_size=8)
+    for kind in KINDS:
+        for object_id, (object_hash, _) in sorted(snapshot.get(kind, {}).items()):
+            hasher.update(f"{kind}:{object_id}:{object_hash};".encode("ascii"))
+    return hasher.hexdigest()
+
+
+def diff_records(old: dict, new: dict) -> typing.Dict[str, typing.Tuple]:
+    """List the fields that differ between two records of the same object.
+
+    Permission overwrites are compared per target, as ``overwrite:<id>``.
+
+    Args:
+        old (dict): The old record.
+        new (dict): The new record.
+
+    Returns:
+        dict[str, tuple]: The old and new value of every changed field.
+    """
+    fields = {}
+    for key in old.keys() | new.keys():
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if key == "overwrites":
+            before, after = before or {}, after or {}
+            for target in before.keys() | after.keys():
+                if before.get(target) != after.get(target):
+                    fields[f"overwrite:{target}"] = (
+                        before.get(target),
+                        after.get(target),
+                    )
+        else:
+            fields[key] = (before, after)
+    return fields
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> typing.Dict[str, Drift]:
+    """Compare two snapshots of the same guild.
+
+    Args:
+        old (Snapshot): The earlier snapshot.
+        new (Snapshot): The later snapshot.
+
+    Returns:
+        dict[str, Drift]: The differences for each kind of object.
+    """
+    drift = {}
+    for kind in KINDS:
+        before, after = old.get(kind, {}), new.get(kind, {})
+        changed = [
+            ObjectChange(object_id, diff_records(before[object_id][1], record))
+            for object_id, (object_hash, record) in after.items()
+            if object_id in before and before[object_id][0] != object_hash
+        ]
+        drift[kind] = Drift(
+            added={
+                object_id: record
+                for object_id, (_, record) in after.items()
+                if object_id not in before
+            },
+            removed={
+                object_id: record
+                for object_id, (_, record) in before.items()
+                if object_id not in after
+            },
+            changed=changed,
+        )
+    return drift
+
+
+class SnapshotStore:
+    """SQLite-backed storage of the latest snapshot of every guild."""
+
+    def __init__(self, path: str) -> None:
+        """Open the store.
+
+        Args:
+            path (str): The path of the SQLite file.
+        """
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                guild_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                object_id INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (guild_id, kind, object_id)
+            )
+            """)
+        self.db.commit()
+
+    def close(self) -> None:
+        """Close the store."""
+        self.db.close()
+
+    def load(self, guild_id: int) -> typing.Optional[Snapshot]:
+        """Load the stored snapshot of a guild.
+
+        Args:
+            guild_id (int): The ID of the guild.
+
+        Returns:
+            Snapshot | None: The snapshot, or None if the guild has none.
+        """
+        rows = self.db.execute(
+            "SELECT kind, object_id, hash, record FROM objects WHERE guild_id = ?",
+            (guild_id,),
+        ).fetchall()
+        if not rows:
+            return None
+
+        snapshot: Snapshot = {kind: {} for kind in KINDS}
+        for kind, object_id, object_hash, record in rows:
+            snapshot[kind][object_id] = (object_hash, json.loads(record))
+        return snapshot
+
+    def save(self, guild_id: int, old: typing.Optional[Snapshot], new: Snapshot) -> int:
+        """Replace the stored snapshot of a guild, writing only what changed.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            old (Snapshot | None): The snapshot currently stored.
+            new (Snapshot): The snapshot to store.
+
+        Returns:
+            int: The number of rows written or deleted.
+        """
+        old = old or {}
+        upserts, deletes = [], []
+        for kind in KINDS:
+            before, after = old.get(kind, {}), new.get(kind, {})
+            for object_id, (object_hash, record) in after.items():
+                if before.get(object_id, (None,))[0] != object_hash:
+                    upserts.append(
+                        (
+                            guild_id,
+                            kind,
+                            object_id,
+                            object_hash,
+                            json.dumps(record, separators=(",", ":")),
+                        )
+                    )
+            deletes.extend(
+                (guild_id, kind, object_id)
+                for object_id in before.keys() - after.keys()
+            )
+
+        self.db.executemany(
+            "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)", upserts
+        )
+        self.db.executemany(
+            "DELETE FROM objects WHERE guild_id = ? AND kind = ? AND object_id = ?",
+            deletes,
+        )
+        self.db.commit()
+        return len(upserts) + len(deletes)
+
+    def put(self, guild_id: int, kind: str, object_id: int, record: dict) -> None:
+        """Store the current record of a single object.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            kind (str): ``channels`` or ``roles``.
+            object_id (int): The ID of the object.
+            record (dict): The record of the object.
+        """
+        self.db.execute(
+            "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)",
+            (
+                guild_id,
+                kind,
+                object_id,
+                digest(record),
+                json.dumps(record, separators=(",", ":")),
+            ),
+        )
+        self.db.commit()
+
+    def delete(self, guild_id: int, kind: str, object_id: int) -> None:
+        """Remove a single object from the stored snapshot.
+
+        Args:
+            guild_id (int): The ID of the guild.
+            kind (str): ``channels`` or ``roles``.
+            object_id (int): The ID of the object.
+        """
+        self.db.execute(
+            "DELETE FROM objects WHERE guild_id = ? AND kind = ? AND object_id = ?",
+            (guild_id, kind, object_id),
+        )
+        self.db.commit()
@@ -0,0 +1,60 @@
+"""
+Local persistence helpers for the Discord bot.
+
+State that has to survive a restart (poll tallies, caches, snapshots) is kept
+as small JSON files in the data directory. Files are written to a temporary
+path first and then moved into place, so a crash mid-write never leaves a
+truncated file behind.
+"""
+
+import json
+import os
+import typing
+
+import config
+from logger_init import logger
+
+
+def data_path(name: str) -> str:
+    """Return the path of a file in the data directory.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        str: The path of the file inside ``config.DATA_DIR``.
+    """
+    return os.path.join(config.DATA_DIR, name)
+
+
+def load_json(path: str, default: typing.Any) -> typing.Any:
+    """Load a JSON file, falling back to a default if it is missing or corrupt.
+
+    Args:
+        path (str): The file to load.
+        default (Any): The value returned when the file cannot be read.
+
+    Returns:
+        Any: The decoded JSON content, or ``default``.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as error:
+        logger.warning("Could not read %s: %s", path, error)
+        return default
+
+
+def save_json(path: str, data: typing.Any) -> None:
+    """Atomically write data to a JSON file.
+
+    Args:
+        path (str): The file to write.
+        data (Any): The JSON-serializable data to write.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+    os.replace(temp_path, path)